@@ -11,12 +11,15 @@ Modelos registrados:
 - Category
 - Product
 - Inventory
+- StockMovement
 - Sale
 - SaleDetail
 '''
 
 from django.contrib import admin
-from .models import Role, Employee, Customer, Category, Product, Inventory, Sale, SaleDetail
+from .models import Role, Employee, Customer, Category, Product, Inventory, StockMovement, Sale, SaleDetail
+from .thumbnails import schedule_thumbnails
+from .services.sale_reversal import void_sales
 
 
 # Register your models here.
@@ -28,9 +31,9 @@ class RoleAdmin(admin.ModelAdmin):
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
-    list_display = ('employeeId', 'firstName', 'lastName', 'idNumber', 'phoneNumber', 'role')
+    list_display = ('employeeId', 'firstName', 'lastName', 'idNumber', 'phoneNumber', 'role', 'isActive')
     search_fields = ('firstName', 'lastName', 'idNumber')
-    list_filter = ('role',)
+    list_filter = ('role', 'isActive')
 
 
 @admin.register(Customer)
@@ -52,18 +55,60 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('status', 'category')
     readonly_fields = ('dateAdded', 'modificationDate')
 
+    def save_model(self, request, obj, form, change):
+        # Una imagen nueva invalida las miniaturas y las genera en segundo plano, como en la vista
+        if 'image' in form.changed_data:
+            obj.thumbnailSizes = ''
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            schedule_thumbnails(obj.image.name)
+
 
 @admin.register(Inventory)
 class InventoryAdmin(admin.ModelAdmin):
-    list_display = ('inventoryId', 'product', 'productQuantity', 'modificationDate')
+    list_display = ('inventoryId', 'product', 'productQuantity', 'snapshotMovementId', 'modificationDate')
     list_filter = ('modificationDate',)
+    # La foto solo cambia al compactar; los cambios de stock se registran como movimientos
+    readonly_fields = ('productQuantity', 'snapshotMovementId', 'modificationDate')
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('movementId', 'product', 'quantity', 'kind', 'sale', 'employee', 'createdAt')
+    list_filter = ('kind', 'createdAt')
+    search_fields = ('product__name', 'product__sku')
+    list_select_related = ('product', 'sale', 'employee')
+
+    # Historial de solo lectura: los movimientos no se crean, modifican ni eliminan desde el panel
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Sale)
 class SaleAdmin(admin.ModelAdmin):
-    list_display = ('saleId', 'customer', 'user', 'saleDate', 'discountPercentage', 'modificationDate')
-    list_filter = ('saleDate', 'user', 'modificationDate')
+    list_display = ('saleId', 'customer', 'user', 'saleDate', 'discountPercentage', 'subtotal', 'total',
+                    'modificationDate', 'voidedAt')
+    readonly_fields = ('subtotal', 'discountAmount', 'total', 'voidedAt', 'voidedBy')
+    list_filter = ('saleDate', 'user', 'modificationDate', ('voidedAt', admin.EmptyFieldListFilter))
     search_fields = ('customer__firstName', 'customer__lastName')
+    actions = ['void_selected']
+
+    def has_delete_permission(self, request, obj=None):
+        # Las ventas no se eliminan (quitaría también la acción delete_selected): se anulan con
+        # void_selected, que devuelve el inventario y conserva el registro
+        return False
+
+    @admin.action(description='Anular las ventas seleccionadas (devuelve sus productos al inventario)')
+    def void_selected(self, request, queryset):
+        employee_id = request.employee.id if getattr(request, 'employee', None) else None
+        voided, units = void_sales(queryset, employee_id)
+        self.message_user(request, f'{voided} ventas anuladas, {units} unidades devueltas al inventario')
 
 
 @admin.register(SaleDetail)
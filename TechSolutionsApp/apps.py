@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TechsolutionsappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'TechSolutionsApp'
+
+    def ready(self):
+        # Registra los receptores de señales
+        from TechSolutionsApp import signals  # noqa: F401
+        # Registra la verificación de que el middleware de permisos está instalado
+        from TechSolutionsApp import permissions  # noqa: F401
@@ -0,0 +1,428 @@
+"""
+benchmark.py
+
+Mide la latencia y la cantidad de consultas de cada URL del proyecto (TechSolutionsProject/urls.py)
+usando el cliente de pruebas de Django contra la base de datos configurada, normalmente
+después de generar datos con el comando seed_data.
+
+Cada petición se ejecuta dentro de una transacción que se revierte, por lo que las vistas que
+modifican datos (editar, eliminar, carrito) se pueden medir sin alterar la base de datos.
+La primera petición de cada escenario se reporta aparte (first_ms) porque incluye cachés vacías.
+
+El resultado es un diccionario serializable a JSON con una entrada por escenario, pensado para
+guardarse y compararse entre versiones (ver compare_reports). Con explain=True se agregan los
+planes de ejecución (EXPLAIN) de las consultas principales de los listados, para confirmar que
+usan los índices definidos en models.py.
+
+run_concurrency compara el rendimiento (peticiones por segundo) de las vistas de solo lectura
+con varias peticiones simultáneas atendidas por el manejador WSGI (un hilo por petición, como
+gunicorn con hilos) y por el ASGI (corrutinas en un hilo, como uvicorn), dentro del mismo proceso.
+"""
+
+import asyncio
+import json
+import platform
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from importlib import import_module
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, Sum
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.test.client import MULTIPART_CONTENT
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+
+from TechSolutionsApp.models import Category, Customer, Employee, Product, Sale, SaleDetail
+from TechSolutionsApp.permissions import ADMIN_ROLE_ID
+from TechSolutionsApp.services.customers import LOOKUP_LIMIT, NAME_ORDERING, sales_summary, search_customers
+
+
+# Contraseña de los empleados generados por seed_data (para medir el inicio de sesión)
+SEED_PASSWORD = 'Clave123'
+
+# Método y datos de las vistas que no se miden con un GET simple (solo aceptan POST)
+DEFAULT_REQUESTS = {
+    'cart_add': ('POST', lambda s: {'sku': s['sku'], 'quantity': 1}),
+    'cart_update': ('POST', lambda s: {'product_id': s['product'], 'quantity': 2}),
+    'cart_remove': ('POST', lambda s: {'product_id': s['product']}),
+    # Lote pequeño de ventas sin conexión con su clave; cada medición se revierte, por lo que la
+    # clave no queda registrada y se mide siempre el registro (no el descarte por duplicada)
+    'ingest_sales': ('POST', lambda s: [
+        {'key': 'benchmark-caja-000001', 'sold_at': s['month_ago_datetime'].isoformat(),
+         'customer': {'id_number': str(s['customer_id_number'] or '100000001'),
+                      'first_name': s['customer_name'], 'last_name': 'Benchmark'},
+         'lines': [{'sku': s['sku'], 'quantity': 1}]},
+        {'key': 'benchmark-caja-000002',
+         'customer': {'id_number': str(s['customer_id_number'] or '100000001'),
+                      'first_name': s['customer_name'], 'last_name': 'Benchmark'},
+         'lines': [{'product_id': s['product'], 'quantity': 2}]},
+    ]),
+}
+
+# Vistas que reciben el cuerpo en JSON (las demás reciben un formulario)
+JSON_VIEWS = {'ingest_sales'}
+
+# Escenarios adicionales: (etiqueta, nombre de la URL, método, datos)
+EXTRA_SCENARIOS = [
+    ('view_products?q', 'view_products', 'GET', lambda s: {'q': s['search']}),
+    ('view_products?page=2', 'view_products', 'GET', lambda s: {'page': 2}),
+    ('view_products?category', 'view_products', 'GET', lambda s: {'category': s['category']}),
+    ('view_sales?last_30_days', 'view_sales', 'GET', lambda s: {'date_from': s['month_ago']}),
+    ('view_sales?customer', 'view_sales', 'GET', lambda s: {'customer': s['customer_id_number']}),
+    ('sales_report?category&month', 'sales_report', 'GET', lambda s: {'dimension': 'category', 'period': 'month'}),
+    ('export_sales?last_30_days', 'export_sales', 'GET', lambda s: {'date_from': s['month_ago']}),
+    ('view_customers?q', 'view_customers', 'GET', lambda s: {'q': s['customer_name'][:3]}),
+    ('view_customers?stats', 'view_customers', 'GET', lambda s: {'stats': '1'}),
+    ('lookup_customer?id', 'lookup_customer', 'GET', lambda s: {'q': str(s['customer_id_number'])[:4]}),
+    ('lookup_customer?name', 'lookup_customer', 'GET', lambda s: {'q': s['customer_name'][:3]}),
+    ('login POST', 'login', 'POST', lambda s: s['credentials']),
+]
+
+# Vistas de solo lectura (asíncronas) para run_concurrency: (etiqueta, nombre de la URL, datos)
+CONCURRENCY_SCENARIOS = [
+    ('view_products', 'view_products', None),
+    ('view_products?q', 'view_products', lambda s: {'q': s['search']}),
+    ('view_sales', 'view_sales', None),
+    ('view_sales?last_30_days', 'view_sales', lambda s: {'date_from': s['month_ago']}),
+    ('view_customers', 'view_customers', None),
+    ('lookup_sku', 'lookup_sku', None),
+    ('view_customers?stats', 'view_customers', lambda s: {'stats': '1'}),
+    ('lookup_customer?name', 'lookup_customer', lambda s: {'q': s['customer_name'][:3]}),
+]
+
+# Consultas principales de los listados, construidas igual que en las vistas: (etiqueta, queryset)
+EXPLAIN_QUERIES = [
+    # La página se consulta sin stock (se guarda en caché); el stock de la página se lee aparte
+    ('view_products', lambda s: Product.objects.select_related('category')
+        .order_by('name', 'productId')[:settings.PRODUCTS_PAGE_SIZE]),
+    ('view_products?category', lambda s: Product.objects.select_related('category')
+        .filter(category__categoryId=s['category']).order_by('name', 'productId')[:settings.PRODUCTS_PAGE_SIZE]),
+    ('view_products stock', lambda s: Product.objects.filter(pk__in=s['page_products']).with_stock()
+        .values_list('pk', 'stock')),
+    ('add_sale products', lambda s: Product.objects.filter(status=True, inventory__available__gt=0)
+        .order_by('name', 'productId')[:settings.ADD_SALE_PRODUCTS_LIMIT + 1]),
+    ('lookup_sku', lambda s: Product.objects.filter(sku=s['sku'], status=True).with_stock()
+        .order_by('productId').values('productId', 'name', 'sku', 'price', 'stock')),
+    # view_sales lista también las ventas anuladas (marcadas), por eso no filtra por voidedAt
+    ('view_sales', lambda s: Sale.objects.select_related('user', 'customer', 'voidedBy')
+        .order_by('-saleDate', '-saleId')[:settings.SALES_PAGE_SIZE + 1]),
+    ('view_sales?last_30_days', lambda s: Sale.objects.select_related('user', 'customer', 'voidedBy')
+        .filter(saleDate__gte=s['month_ago_datetime']).order_by('-saleDate', '-saleId')[:settings.SALES_PAGE_SIZE + 1]),
+    ('view_sales?employee', lambda s: Sale.objects.select_related('user', 'customer', 'voidedBy')
+        .filter(user_id=s['employee']).order_by('-saleDate', '-saleId')[:settings.SALES_PAGE_SIZE + 1]),
+    # Ventas activas de un día (resúmenes diarios): rango de saleDate más voidedAt IS NULL
+    ('rollups day', lambda s: Sale.objects.active()
+        .filter(saleDate__gte=s['month_ago_datetime'], saleDate__lt=s['month_ago_datetime'] + timedelta(days=1))
+        .values('user_id').annotate(sale_count=Count('saleId'), amount=Sum('total'))),
+    ('view_customers', lambda s: Customer.objects.order_by(*NAME_ORDERING)[:settings.CUSTOMERS_PAGE_SIZE + 1]),
+    ('view_customers?stats', lambda s: sales_summary(Customer.objects.order_by(*NAME_ORDERING)
+        .values_list('pk', flat=True)[:settings.CUSTOMERS_PAGE_SIZE])),
+    ('lookup_customer?id', lambda s: search_customers(str(s['customer_id_number'])[:4])[:LOOKUP_LIMIT]),
+    ('lookup_customer?name', lambda s: search_customers(s['customer_name'][:3])[:LOOKUP_LIMIT]),
+    ('refresh_sales_rollups', lambda s: Sale.objects.filter(modificationDate__gt=s['month_ago_datetime'])
+        .values('saleDate')),
+]
+
+
+def run_benchmark(iterations=20, only=None, stdout=None, explain=False):
+    '''
+    Ejecuta todos los escenarios y retorna el reporte. `only` filtra por texto en la etiqueta
+    '''
+    setup_test_environment()
+    employee = (Employee.objects.filter(role_id=ADMIN_ROLE_ID, isActive=True)
+                .order_by('pk').values_list('pk', flat=True).first())
+    if employee is None:
+        teardown_test_environment()
+        raise ValueError('Se necesita un empleado administrador activo (create_roles_and_admin)')
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session['employee_id'] = employee
+    session.save()
+    try:
+        samples = _samples()
+        results = {}
+        for label, name, method, data in _scenarios(samples):
+            if only and only not in label:
+                continue
+            results[label] = _measure(label, name, method, data, samples, session.session_key, iterations)
+            if stdout:
+                result = results[label]
+                stdout.write(f'{label:<32} {result["status"]}  p50 {result["p50_ms"]:>8.2f} ms  '
+                             f'p95 {result["p95_ms"]:>8.2f} ms  {result["queries"]} consultas')
+        plans = explain_queries(samples, only) if explain else {}
+    finally:
+        session.delete()
+        teardown_test_environment()
+
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            'dataset': {model.__name__: model.objects.count()
+                        for model in (Category, Product, Customer, Employee, Sale, SaleDetail)},
+        },
+        'results': results,
+        'plans': plans,
+    }
+
+
+def run_concurrency(concurrency=16, iterations=20, only=None, stdout=None):
+    '''
+    Envía concurrency * iterations peticiones a cada escenario de CONCURRENCY_SCENARIOS, con
+    concurrency clientes simultáneos, primero con el manejador WSGI y luego con el ASGI.
+    Las peticiones no se ejecutan en transacciones: solo deben usarse vistas de solo lectura
+    '''
+    setup_test_environment()
+    employee = (Employee.objects.filter(role_id=ADMIN_ROLE_ID, isActive=True)
+                .order_by('pk').values_list('pk', flat=True).first())
+    if employee is None:
+        teardown_test_environment()
+        raise ValueError('Se necesita un empleado administrador activo (create_roles_and_admin)')
+
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session['employee_id'] = employee
+    session.save()
+    try:
+        samples = _samples()
+        results = {}
+        for label, name, data in CONCURRENCY_SCENARIOS:
+            if only and only not in label:
+                continue
+            url = reverse(name, kwargs=_url_kwargs(name, samples))
+            payload = data(samples) if data else {}
+            wsgi = _measure_wsgi(url, payload, session.session_key, concurrency, iterations)
+            asgi = asyncio.run(_measure_asgi(url, payload, session.session_key, concurrency, iterations))
+            results[label] = {'url': url, 'wsgi': wsgi, 'asgi': asgi}
+            if stdout:
+                stdout.write(f'{label:<32} WSGI {wsgi["rps"]:>8.1f} pet/s  p95 {wsgi["p95_ms"]:>8.2f} ms   '
+                             f'ASGI {asgi["rps"]:>8.1f} pet/s  p95 {asgi["p95_ms"]:>8.2f} ms')
+    finally:
+        session.delete()
+        teardown_test_environment()
+
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'concurrency': concurrency,
+            'iterations': iterations,
+        },
+        'results': results,
+    }
+
+
+def explain_queries(samples=None, only=None):
+    '''
+    Plan de ejecución de cada consulta de EXPLAIN_QUERIES, según el motor de base de datos
+    (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en MySQL)
+    '''
+    samples = samples or _samples()
+    plans = {}
+    for label, build in EXPLAIN_QUERIES:
+        if only and only not in label:
+            continue
+        plans[label] = build(samples).explain()
+    return plans
+
+
+def compare_reports(baseline, current):
+    '''
+    Retorna filas (etiqueta, p50 anterior, p50 actual, cambio %, consultas anteriores, consultas actuales)
+    para los escenarios presentes en ambos reportes
+    '''
+    rows = []
+    for label, result in current['results'].items():
+        previous = baseline['results'].get(label)
+        if previous is None:
+            continue
+        change = ((result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100) if previous['p50_ms'] else 0
+        rows.append((label, previous['p50_ms'], result['p50_ms'], change, previous['queries'], result['queries']))
+    return rows
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as report:
+        return json.load(report)
+
+
+def _scenarios(samples):
+    '''
+    Una petición por cada URL con nombre de urls.py (sin incluir el panel de administración)
+    más los escenarios adicionales
+    '''
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        method, data = DEFAULT_REQUESTS.get(pattern.name, ('GET', None))
+        yield pattern.name, pattern.name, method, data
+    yield from EXTRA_SCENARIOS
+
+
+def _measure(label, name, method, data, samples, session_key, iterations):
+    client = Client()
+    url = reverse(name, kwargs=_url_kwargs(name, samples))
+    payload = data(samples) if data else {}
+    # El inicio de sesión se mide sin sesión previa
+    anonymous = name == 'login' and method == 'POST'
+    content_type = 'application/json' if name in JSON_VIEWS else MULTIPART_CONTENT
+
+    timings, query_counts = [], []
+    status = size = None
+    for _ in range(iterations + 1):
+        client.cookies.clear()
+        if not anonymous:
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                if method == 'POST':
+                    response = client.post(url, payload, content_type=content_type)
+                else:
+                    response = client.get(url, payload)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        timings.append(elapsed * 1000)
+        query_counts.append(len(queries))
+        status, size = response.status_code, len(content)
+
+    first, timings = timings[0], sorted(timings[1:])
+    return {
+        'url': url,
+        'method': method,
+        'status': status,
+        'bytes': size,
+        'first_ms': round(first, 2),
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'max_ms': round(timings[-1], 2),
+        'queries': int(statistics.median(query_counts[1:])),
+        'queries_max': max(query_counts),
+    }
+
+
+def _measure_wsgi(url, payload, session_key, concurrency, iterations):
+    '''
+    Cada cliente es un hilo con su propio Client (y su propia conexión a la base de datos)
+    '''
+    barrier = threading.Barrier(concurrency)
+
+    def worker():
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        timings, errors = [], 0
+        barrier.wait()
+        try:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = client.get(url, payload)
+                timings.append((time.perf_counter() - start) * 1000)
+                errors += response.status_code != 200
+        finally:
+            connection.close()
+        return timings, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(lambda _: worker(), range(concurrency)))
+    return _throughput(outcomes, time.perf_counter() - start)
+
+
+async def _measure_asgi(url, payload, session_key, concurrency, iterations):
+    '''
+    Cada cliente es una corrutina con su propio AsyncClient, todas en el mismo hilo
+    '''
+    async def worker():
+        client = AsyncClient()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        timings, errors = [], 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = await client.get(url, payload)
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+        return timings, errors
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    # El ORM asíncrono ejecuta las consultas en un hilo aparte, cuyas conexiones se cierran aquí
+    await sync_to_async(connections.close_all)()
+    return _throughput(outcomes, elapsed)
+
+
+def _throughput(outcomes, elapsed):
+    timings = sorted(timing for worker_timings, _ in outcomes for timing in worker_timings)
+    return {
+        'requests': len(timings),
+        'errors': sum(errors for _, errors in outcomes),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(timings) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(_percentile(timings, 50), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+    }
+
+
+def _samples():
+    '''
+    Ids y valores de ejemplo para construir las URL y los datos de los escenarios
+    '''
+    product = Product.objects.filter(status=True).order_by('pk').values('pk', 'sku', 'name', 'category_id').first() or {}
+    customer = (Customer.objects.exclude(idNumber=None).order_by('pk').values('pk', 'idNumber', 'firstName').first()
+                or {})
+    employee = (Employee.objects.exclude(role_id=ADMIN_ROLE_ID).order_by('pk').values('pk', 'idNumber').first()
+                or Employee.objects.order_by('pk').values('pk', 'idNumber').first())
+    return {
+        'product': product.get('pk'),
+        'sku': product.get('sku', ''),
+        'search': (product.get('name') or 'a').split()[0],
+        'category': product.get('category_id') or Category.objects.values_list('pk', flat=True).first(),
+        'sale': Sale.objects.order_by('-pk').values_list('pk', flat=True).first(),
+        'page_products': list(Product.objects.order_by('name', 'productId')
+                              .values_list('pk', flat=True)[:getattr(settings, 'PRODUCTS_PAGE_SIZE', 25)]),
+        'customer': customer.get('pk'),
+        'customer_id_number': customer.get('idNumber', ''),
+        'customer_name': customer.get('firstName') or 'a',
+        'employee': employee['pk'],
+        'month_ago': (date.today() - timedelta(days=30)).isoformat(),
+        'month_ago_datetime': timezone.now() - timedelta(days=30),
+        'credentials': {'username': employee['idNumber'], 'password': SEED_PASSWORD},
+    }
+
+
+def _url_kwargs(name, samples):
+    '''
+    Argumentos de la URL según su nombre: edit_sale -> id de una venta, lookup_sku -> un SKU, etc.
+    '''
+    pattern = next(p for p in get_resolver().url_patterns if isinstance(p, URLPattern) and p.name == name)
+    kwargs = {}
+    for argument in pattern.pattern.converters:
+        if argument == 'sku':
+            kwargs[argument] = samples['sku']
+        else:
+            kwargs[argument] = samples[name.split('_', 1)[-1]] or 0
+    return kwargs
+
+
+def _percentile(values, percent):
+    '''
+    Percentil por rango más cercano de una lista ordenada
+    '''
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
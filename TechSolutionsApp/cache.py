@@ -0,0 +1,173 @@
+"""
+cache.py
+
+Utilidades de caché en memoria del proceso.
+
+- LRUCache: caché con política LRU (se descarta lo menos usado) y expiración por TTL,
+  segura para varios hilos. Lleva contadores de aciertos y fallos.
+- CatalogCache: caché de listados del catálogo (productos, categorías) sobre el framework
+  de caché de Django. Cada espacio de nombres tiene un número de generación; las señales
+  lo incrementan y con eso todas las entradas anteriores quedan invalidadas. Los listados
+  no guardan stock (cambia con cada venta): las vistas lo leen aparte en cada petición.
+
+La generación se guarda en el backend de caché, por lo que con varios procesos el backend
+debe ser compartido (Redis o Memcached): con LocMemCache una invalidación solo llega al
+proceso que la hizo y los demás muestran datos anteriores hasta que la entrada expira.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class LRUCache:
+    '''
+    Caché en memoria con límite de tamaño (LRU) y tiempo de vida (TTL) por entrada
+    '''
+
+    MISSING = object()
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        '''
+        Retorna el valor guardado o `default` (LRUCache.MISSING) si no existe o expiró
+        '''
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        '''
+        Guarda el valor y descarta la entrada menos usada si se supera el tamaño máximo
+        '''
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        '''
+        Retorna tamaño actual, aciertos y fallos
+        '''
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class CatalogCache:
+    '''
+    Caché de consultas del catálogo con invalidación por generación y contadores de aciertos/fallos
+    '''
+
+    MISSING = object()
+
+    def __init__(self, alias='default', timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+        self._counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def get_or_set(self, namespace, key_parts, producer):
+        '''
+        Retorna el valor en caché para (namespace, key_parts) o lo calcula con producer()
+        '''
+        key = self._make_key(namespace, key_parts)
+        value = self.backend.get(key, self.MISSING)
+        hit = value is not self.MISSING
+        with self._lock:
+            self._counters[namespace]['hits' if hit else 'misses'] += 1
+        if hit:
+            return value
+
+        value = producer()
+        self.backend.set(key, value, self.timeout)
+        return value
+
+    async def aget_or_set(self, namespace, key_parts, producer):
+        '''
+        Versión asíncrona de get_or_set para las vistas async; producer es una función async
+        '''
+        key = await self._amake_key(namespace, key_parts)
+        value = await self.backend.aget(key, self.MISSING)
+        hit = value is not self.MISSING
+        with self._lock:
+            self._counters[namespace]['hits' if hit else 'misses'] += 1
+        if hit:
+            return value
+
+        value = await producer()
+        await self.backend.aset(key, value, self.timeout)
+        return value
+
+    def invalidate(self, *namespaces):
+        '''
+        Incrementa la generación de los espacios de nombres, las entradas anteriores dejan de usarse
+        '''
+        for namespace in namespaces:
+            key = f'catalog:generation:{namespace}'
+            try:
+                self.backend.incr(key)
+            except ValueError:
+                # La clave no existe (caché vacía o expirada)
+                self.backend.set(key, 2, None)
+
+    def invalidate_on_commit(self, *namespaces):
+        '''
+        Invalida al confirmar la transacción actual
+        '''
+        transaction.on_commit(lambda: self.invalidate(*namespaces))
+
+    def stats(self):
+        '''
+        Retorna los contadores de aciertos y fallos por espacio de nombres (de este proceso)
+        '''
+        with self._lock:
+            stats = {namespace: dict(counters) for namespace, counters in self._counters.items()}
+        for counters in stats.values():
+            total = counters['hits'] + counters['misses']
+            counters['hitRatio'] = round(counters['hits'] / total, 3) if total else 0
+        return stats
+
+    def _make_key(self, namespace, key_parts):
+        generation = self.backend.get_or_set(f'catalog:generation:{namespace}', 1, None)
+        digest = hashlib.md5(repr(key_parts).encode()).hexdigest()
+        return f'catalog:{namespace}:{generation}:{digest}'
+
+    async def _amake_key(self, namespace, key_parts):
+        generation = await self.backend.aget_or_set(f'catalog:generation:{namespace}', 1, None)
+        digest = hashlib.md5(repr(key_parts).encode()).hexdigest()
+        return f'catalog:{namespace}:{generation}:{digest}'
+
+
+catalog_cache = CatalogCache(timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
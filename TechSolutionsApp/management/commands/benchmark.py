@@ -0,0 +1,84 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from TechSolutionsApp.benchmark import compare_reports, load_report, run_benchmark, run_concurrency
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Mide la latencia (p50/p95) y la cantidad de consultas de cada vista del proyecto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Peticiones medidas por escenario')
+        parser.add_argument('-o', '--output', type=str, help='Guarda el reporte en un archivo JSON')
+        parser.add_argument('--compare', type=str, help='Reporte JSON anterior contra el que se comparan los resultados')
+        parser.add_argument('--filter', type=str, help='Solo ejecuta los escenarios cuyo nombre contiene este texto')
+        parser.add_argument('--explain', action='store_true',
+                            help='Incluye los planes de ejecución de las consultas principales de los listados')
+        parser.add_argument('--concurrency', type=int,
+                            help='Compara WSGI y ASGI en las vistas de solo lectura con esta cantidad de '
+                                 'clientes simultáneos (cada uno envía --iterations peticiones)')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Ejecuta los escenarios de benchmark.py, guarda el reporte y opcionalmente lo compara con uno anterior
+        '''
+        if options['iterations'] < 1:
+            raise CommandError('--iterations debe ser al menos 1')
+        if options['concurrency'] is not None:
+            return self._handle_concurrency(options)
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_report(options['compare'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer el reporte {options["compare"]}: {e}')
+
+        try:
+            report = run_benchmark(options['iterations'], options['filter'], stdout=self.stdout,
+                                   explain=options['explain'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for label, plan in report['plans'].items():
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Plan: {label}'))
+            self.stdout.write(plan)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'Reporte guardado en {options["output"]}'))
+
+        if baseline:
+            self.stdout.write('')
+            self.stdout.write(f'{"Escenario":<32} {"p50 antes":>10} {"p50 ahora":>10} {"cambio":>8}  consultas')
+            for label, before, after, change, queries_before, queries_after in compare_reports(baseline, report):
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(f'{label:<32} {before:>10.2f} {after:>10.2f} {change:>+7.1f}%  '
+                                        f'{queries_before} -> {queries_after}'))
+
+    def _handle_concurrency(self, options):
+        '''
+        Modo --concurrency: rendimiento con peticiones simultáneas, WSGI contra ASGI
+        '''
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency debe ser al menos 1')
+        if options['compare'] or options['explain']:
+            raise CommandError('--compare y --explain no se pueden usar con --concurrency')
+
+        try:
+            report = run_concurrency(options['concurrency'], options['iterations'], options['filter'],
+                                     stdout=self.stdout)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'Reporte guardado en {options["output"]}'))
+
+        errors = sum(result[mode]['errors'] for result in report['results'].values() for mode in ('wsgi', 'asgi'))
+        if errors:
+            self.stdout.write(self.style.WARNING(f'{errors} peticiones no respondieron 200'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from TechSolutionsApp.services.stock import compact_movements, purge_expired_reservations
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Incorpora los movimientos de inventario a la foto de stock de cada producto y elimina las reservas vencidas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Productos actualizados por transacción')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Solo se procesan los productos con movimientos posteriores a su foto. Los movimientos
+        se conservan como historial. También elimina las reservas de carritos vencidas
+        '''
+        compacted = compact_movements(batch_size=options['batch_size'], stdout=self.stdout)
+        purged = purge_expired_reservations()
+        if purged:
+            self.stdout.write(f'{purged} reservas vencidas eliminadas')
+        self.stdout.write(self.style.SUCCESS(f'Inventario compactado: {compacted} productos actualizados'))
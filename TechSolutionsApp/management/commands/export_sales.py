@@ -0,0 +1,55 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from TechSolutionsApp.services.sales_export import CHUNK_SIZE, FORMATS, KINDS, export_sales, gzip_chunks
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Exporta las ventas o las líneas de venta de un rango de fechas en CSV o JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=list(KINDS), default='details',
+                            help='details: una fila por línea de venta; sales: una fila por venta')
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='Formato del archivo')
+        parser.add_argument('--date-from', type=str, help='Fecha inicial inclusiva (YYYY-MM-DD)')
+        parser.add_argument('--date-to', type=str, help='Fecha final inclusiva (YYYY-MM-DD)')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida en formato gzip')
+        parser.add_argument('-o', '--output', type=str,
+                            help='Archivo de salida (por defecto la salida estándar)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Cantidad de filas leídas por consulta')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Escribe la exportación por bloques, sin cargar todas las filas en memoria
+        '''
+        try:
+            date_from = date.fromisoformat(options['date_from']) if options['date_from'] else None
+            date_to = date.fromisoformat(options['date_to']) if options['date_to'] else None
+        except ValueError:
+            raise CommandError('Las fechas deben tener el formato YYYY-MM-DD')
+
+        chunks = export_sales(options['kind'], options['format'], date_from, date_to,
+                              chunk_size=options['chunk_size'])
+        if options['gzip']:
+            chunks = gzip_chunks(chunks)
+        else:
+            chunks = (chunk.encode('utf-8') for chunk in chunks)
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                written = self._write(chunks, output)
+            self.stderr.write(self.style.SUCCESS(f'Exportación guardada en {options["output"]} ({written} bytes)'))
+        else:
+            self._write(chunks, sys.stdout.buffer)
+
+    def _write(self, chunks, output):
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+        output.flush()
+        return written
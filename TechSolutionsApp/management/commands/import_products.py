@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from TechSolutionsApp.services.product_import import (
+    BATCH_SIZE, FORMATS, ProductImportError, detect_format, import_products, iter_rows
+)
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Importa o actualiza productos e inventario (por SKU) desde un archivo CSV o JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Ruta del archivo a importar')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Formato del archivo (por defecto se deduce de la extensión)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Cantidad de productos guardados por transacción')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Lee el archivo fila por fila y guarda los productos por lotes, mostrando el avance
+        y las filas que no se pudieron importar
+        '''
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                result = import_products(iter_rows(stream, file_format),
+                                         batch_size=options['batch_size'], stdout=self.stdout)
+        except (OSError, UnicodeDecodeError, ProductImportError) as e:
+            raise CommandError(f'No se pudo importar el archivo: {e}')
+
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'Línea {line}: {message}'))
+        if result.error_count > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'... y {result.error_count - len(result.errors)} errores más'))
+        self.stdout.write(self.style.SUCCESS(f'Importación terminada: {result}'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from TechSolutionsApp.models import Employee
+from TechSolutionsApp.services.sale_ingestion import (
+    BATCH_SIZE, FORMATS, SaleIngestionError, detect_format, ingest_sales, iter_records
+)
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = ('Registra por lotes las ventas de una caja sin conexión desde un archivo JSON o JSONL. '
+            'Las ventas cuya clave ya está registrada se ignoran.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Ruta del archivo con las ventas')
+        parser.add_argument('--employee', type=int, required=True, help='Id del empleado que realizó las ventas')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Formato del archivo (por defecto se deduce de la extensión)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Cantidad de ventas guardadas por transacción')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Lee el archivo y guarda las ventas por lotes, mostrando el avance, las ventas que no se
+        pudieron registrar y los productos que quedaron con inventario negativo
+        '''
+        if not Employee.objects.filter(pk=options['employee']).exists():
+            raise CommandError(f'No existe el empleado {options["employee"]}')
+        try:
+            file_format = options['format'] or detect_format(options['path'])
+            with open(options['path'], encoding='utf-8-sig') as stream:
+                result = ingest_sales(iter_records(stream, file_format), options['employee'],
+                                      batch_size=options['batch_size'], stdout=self.stdout)
+        except (OSError, UnicodeDecodeError, SaleIngestionError) as e:
+            raise CommandError(f'No se pudo registrar el archivo: {e}')
+
+        for position, key, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'Venta {position} ({key or "sin clave"}): {message}'))
+        if result.error_count > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'... y {result.error_count - len(result.errors)} errores más'))
+        if result.negative_stock:
+            self.stdout.write(self.style.WARNING(
+                f'Productos con inventario negativo: {", ".join(sorted(result.negative_stock))}'))
+        self.stdout.write(self.style.SUCCESS(f'Registro terminado: {result}'))
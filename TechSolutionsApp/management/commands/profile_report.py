@@ -0,0 +1,51 @@
+import io
+import pstats
+import statistics
+
+from django.core.management.base import BaseCommand
+from TechSolutionsApp.profiling import PROFILE_DIR, iter_profiles
+
+
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = ('Resume por vista los perfiles guardados por ProfilingMiddleware (funciones con mayor tiempo acumulado). '
+            'Solo hay perfiles de las vistas síncronas: las asíncronas (view_products, view_sales, view_customers, '
+            'lookup_sku, lookup_customer) no se perfilan.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', type=str, help='Solo la vista con este nombre de URL (por ejemplo add_sale)')
+        parser.add_argument('--top', type=int, default=20, help='Cantidad de funciones por vista')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative', help='Orden de las funciones')
+        parser.add_argument('--dir', type=str, default=str(PROFILE_DIR), help='Carpeta de los perfiles')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Suma los perfiles de cada vista en un solo pstats.Stats y muestra las N funciones principales
+        '''
+        views = {}
+        for view, duration, profile in iter_profiles(options['view'], options['dir']):
+            stats, durations = views.get(view, (None, []))
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            durations.append(duration)
+            views[view] = (stats, durations)
+
+        if not views:
+            self.stdout.write(f'No hay perfiles en {options["dir"]}')
+            return
+
+        for view, (stats, durations) in sorted(views.items()):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{view}: {len(durations)} muestras, mediana {statistics.median(durations):.0f} ms, '
+                f'máximo {max(durations)} ms'
+            ))
+            output = io.StringIO()
+            stats.stream = output
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(options['top'])
+            self.stdout.write(output.getvalue(), ending='')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from TechSolutionsApp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Recalcula el texto de búsqueda de todos los productos y reconstruye el índice de texto completo.'
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **kwargs):
+        '''
+        Útil después de cargas masivas que no pasan por Product.save()
+        '''
+        with transaction.atomic():
+            processed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Índice de búsqueda reconstruido para {processed} productos'))
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from TechSolutionsApp.services.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Actualiza de forma incremental los resúmenes diarios de ventas por producto, categoría y empleado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Reconstruye todos los resúmenes desde cero')
+        parser.add_argument('--since', type=str,
+                            help='Recalcula todos los días desde esta fecha (YYYY-MM-DD), por ejemplo tras eliminar ventas')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Recalcula solo los días con ventas modificadas desde la última ejecución
+        '''
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('La fecha de --since debe tener el formato YYYY-MM-DD')
+
+        days = refresh_rollups(full=options['full'], since=since, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes actualizados: {days} días recalculados'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from TechSolutionsApp.models import Product
+from TechSolutionsApp.thumbnails import THUMBNAIL_SIZES, generate_thumbnails
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Genera las miniaturas WebP de las imágenes de productos existentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Solo genera las miniaturas de imágenes que aún no tienen todos los tamaños '
+                                 'configurados (según Product.thumbnailSizes, sin revisar el almacenamiento)')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Recorre los productos con imagen y genera sus miniaturas de forma síncrona
+        '''
+        generated = 0
+        errors = 0
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if options['missing_only']:
+            products = products.exclude(thumbnailSizes=','.join(str(size) for size in sorted(THUMBNAIL_SIZES)))
+        images = products.values_list('image', flat=True).distinct().order_by().iterator()
+
+        for image_name in images:
+            try:
+                generate_thumbnails(image_name)
+                generated += 1
+            except Exception as e:
+                errors += 1
+                self.stdout.write(self.style.ERROR(f'Error en {image_name}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Miniaturas generadas para {generated} imágenes ({errors} errores)'))
@@ -0,0 +1,203 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from TechSolutionsApp.cache import catalog_cache
+from TechSolutionsApp.models import Category, Customer, Employee, Inventory, Product, Role, Sale, SaleDetail
+from TechSolutionsApp.search import rebuild_index
+from TechSolutionsApp.services.bulk import reset_sequences
+from TechSolutionsApp.services.rollups import refresh_rollups
+
+
+CATEGORY_NAMES = [
+    'Laptops', 'Computadoras de escritorio', 'Monitores', 'Teclados', 'Mouses', 'Audífonos',
+    'Parlantes', 'Impresoras', 'Almacenamiento', 'Memorias RAM', 'Tarjetas de video', 'Procesadores',
+    'Redes', 'Cables y adaptadores', 'Tablets', 'Celulares', 'Accesorios', 'Software', 'Cámaras', 'Gaming',
+]
+PRODUCT_BRANDS = ['Acer', 'Asus', 'Dell', 'HP', 'Lenovo', 'Logitech', 'Samsung', 'Kingston', 'TP-Link', 'Razer']
+PRODUCT_WORDS = ['Pro', 'Max', 'Ultra', 'Lite', 'Plus', 'Gamer', 'Slim', 'Air', 'Mini', 'Neo']
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'José', 'Carlos', 'Sofía', 'Daniel', 'Valeria', 'Andrés', 'Lucía',
+               'Jorge', 'Camila', 'Diego', 'Fernanda', 'Pablo', 'Gabriela', 'Mario', 'Paula', 'Ricardo', 'Elena']
+LAST_NAMES = ['Rodríguez', 'Vargas', 'Jiménez', 'Mora', 'Rojas', 'Castro', 'Solís', 'Araya', 'Chaves', 'Alfaro',
+              'Quesada', 'Campos', 'Salazar', 'Herrera', 'Ramírez', 'Navarro', 'Vega', 'Cordero', 'Méndez', 'Ulate']
+
+# Contraseña de los empleados generados (se calcula el hash una sola vez)
+EMPLOYEE_PASSWORD = 'Clave123'
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Genera datos de prueba realistas (categorías, productos, inventario, clientes, empleados y ventas).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20, help='Cantidad de categorías')
+        parser.add_argument('--products', type=int, default=5000, help='Cantidad de productos (con inventario)')
+        parser.add_argument('--customers', type=int, default=5000, help='Cantidad de clientes')
+        parser.add_argument('--employees', type=int, default=20, help='Cantidad de empleados (rol User)')
+        parser.add_argument('--sales', type=int, default=50000, help='Cantidad de ventas')
+        parser.add_argument('--max-lines', type=int, default=5, help='Máximo de líneas por venta')
+        parser.add_argument('--days', type=int, default=365, help='Las ventas se reparten en los últimos N días')
+        parser.add_argument('--seed', type=int, default=42, help='Semilla aleatoria (mismo valor, mismos datos)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas insertadas por consulta')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='No recalcula los resúmenes de ventas (ejecutar luego refresh_sales_rollups --full)')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Inserta los datos con bulk_create por lotes. Los datos se agregan a los existentes,
+        usando ids y valores únicos a partir de los ids máximos actuales
+        '''
+        if options['products'] and not (options['categories'] or Category.objects.exists()):
+            raise CommandError('Se necesita al menos una categoría para generar productos')
+        if options['sales'] and options['max_lines'] < 1:
+            raise CommandError('--max-lines debe ser al menos 1')
+
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        user_role, _ = Role.objects.get_or_create(roleId=2, defaults={'description': 'User'})
+        with transaction.atomic():
+            self._seed_categories(options['categories'])
+            self._seed_products(options['products'])
+            self._seed_customers(options['customers'])
+            self._seed_employees(options['employees'], user_role)
+            reset_sequences(Category, Product, Inventory, Customer, Employee)
+
+        self._seed_sales(options['sales'], options['max_lines'], options['days'])
+        reset_sequences(Sale, SaleDetail)
+
+        # Las inserciones masivas no disparan señales: índice de búsqueda, cachés y resúmenes
+        rebuild_index()
+        catalog_cache.invalidate('products', 'categories')
+        if options['sales'] and not options['skip_rollups']:
+            refresh_rollups(full=True)
+        self.stdout.write(self.style.SUCCESS('Datos de prueba generados'))
+
+    def _seed_categories(self, count):
+        start = _next_id(Category)
+        categories = []
+        for i in range(count):
+            name = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+            if i >= len(CATEGORY_NAMES):
+                name = f'{name} {i // len(CATEGORY_NAMES) + 1}'
+            categories.append(Category(categoryId=start + i, name=name))
+        Category.objects.bulk_create(categories, batch_size=self.batch_size)
+        self.stdout.write(f'{count} categorías creadas')
+
+    def _seed_products(self, count):
+        categories = dict(Category.objects.values_list('categoryId', 'name'))
+        category_ids = list(categories)
+        start = _next_id(Product)
+        for offset in range(0, count, self.batch_size):
+            products, inventories = [], []
+            for product_id in range(start + offset, start + min(offset + self.batch_size, count)):
+                category_id = self.random.choice(category_ids)
+                product = Product(
+                    productId=product_id,
+                    name=f'{self.random.choice(PRODUCT_BRANDS)} {categories[category_id].split()[0]} '
+                         f'{self.random.choice(PRODUCT_WORDS)} {product_id}',
+                    price=Decimal(self.random.randrange(5000, 1500000, 500)),
+                    category_id=category_id,
+                    status=self.random.random() < 0.9,
+                    sku=f'SD{product_id:08d}',
+                )
+                product.searchText = product.build_search_text(categories[category_id])
+                products.append(product)
+                quantity = self.random.randint(0, 200)
+                inventories.append(Inventory(product_id=product_id, productQuantity=quantity, available=quantity))
+            Product.objects.bulk_create(products)
+            Inventory.objects.bulk_create(inventories)
+        self.stdout.write(f'{count} productos creados')
+
+    def _seed_customers(self, count):
+        start = _next_id(Customer)
+        for offset in range(0, count, self.batch_size):
+            customers = []
+            for customer_id in range(start + offset, start + min(offset + self.batch_size, count)):
+                customer = Customer(
+                    customerId=customer_id,
+                    firstName=self.random.choice(FIRST_NAMES),
+                    lastName=f'{self.random.choice(LAST_NAMES)} {self.random.choice(LAST_NAMES)}',
+                    email=f'cliente{customer_id}@ejemplo.com' if self.random.random() < 0.7 else None,
+                    idNumber=500000000 + customer_id,
+                )
+                customer.set_search_names()
+                customers.append(customer)
+            Customer.objects.bulk_create(customers)
+        self.stdout.write(f'{count} clientes creados')
+
+    def _seed_employees(self, count, role):
+        start = _next_id(Employee)
+        password_hash = make_password(EMPLOYEE_PASSWORD)
+        Employee.objects.bulk_create([
+            Employee(
+                employeeId=employee_id,
+                firstName=self.random.choice(FIRST_NAMES),
+                lastName=self.random.choice(LAST_NAMES),
+                idNumber=300000000 + employee_id,
+                phoneNumber=60000000 + employee_id,
+                role=role,
+                passwordHash=password_hash,
+            )
+            for employee_id in range(start, start + count)
+        ], batch_size=self.batch_size)
+        self.stdout.write(f'{count} empleados creados (contraseña: {EMPLOYEE_PASSWORD})')
+
+    def _seed_sales(self, count, max_lines, days):
+        '''
+        Genera las ventas por lotes, cada lote en su propia transacción. Las fechas se asignan
+        después de insertar porque saleDate y modificationDate son automáticas
+        '''
+        if not count:
+            return
+        products = list(Product.objects.values_list('productId', 'price'))
+        customer_ids = list(Customer.objects.values_list('customerId', flat=True))
+        employee_ids = list(Employee.objects.values_list('employeeId', flat=True))
+        if not (products and customer_ids and employee_ids):
+            raise CommandError('Se necesitan productos, clientes y empleados para generar ventas')
+
+        now = timezone.now()
+        sale_id = _next_id(Sale)
+        detail_id = _next_id(SaleDetail)
+        for offset in range(0, count, self.batch_size):
+            sales, dates, details = [], [], []
+            for _ in range(min(self.batch_size, count - offset)):
+                sale = Sale(
+                    saleId=sale_id,
+                    customer_id=self.random.choice(customer_ids),
+                    user_id=self.random.choice(employee_ids),
+                    discountPercentage=self.random.choice([0, 0, 0, 0, 5, 10]),
+                )
+                subtotal = Decimal('0')
+                for product_id, price in self.random.sample(products, min(len(products), self.random.randint(1, max_lines))):
+                    quantity = self.random.randint(1, 4)
+                    details.append(SaleDetail(saleDetailId=detail_id, sale_id=sale_id, product_id=product_id,
+                                              quantity=quantity, unitPrice=price))
+                    subtotal += quantity * price
+                    detail_id += 1
+                sale.set_totals(subtotal)
+                sales.append(sale)
+                dates.append(now - timedelta(seconds=self.random.randint(0, days * 86400)))
+                sale_id += 1
+
+            with transaction.atomic():
+                Sale.objects.bulk_create(sales)
+                for sale, sale_date in zip(sales, dates):
+                    sale.saleDate = sale.modificationDate = sale_date
+                Sale.objects.bulk_update(sales, ['saleDate', 'modificationDate'])
+                SaleDetail.objects.bulk_create(details)
+            self.stdout.write(f'{offset + len(sales)} ventas creadas')
+
+
+def _next_id(model):
+    '''
+    Siguiente id libre de la tabla (los ids se asignan explícitamente para no depender de
+    que el motor retorne los ids generados por bulk_create)
+    '''
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
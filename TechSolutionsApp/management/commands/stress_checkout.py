@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from TechSolutionsApp.models import Category, Customer, Employee, Inventory, Product, Sale, SaleDetail, StockMovement
+from TechSolutionsApp.services import stock
+from TechSolutionsApp.services.checkout import CheckoutError, register_sale
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Prueba de concurrencia: varias cajas cobran el mismo producto a la vez y se verifica que no se venda de más.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Cajas (hilos) cobrando en paralelo')
+        parser.add_argument('--stock', type=int, default=200, help='Stock inicial del producto de prueba')
+        parser.add_argument('--quantity', type=int, default=1, help='Unidades por venta')
+        parser.add_argument('--carts', action='store_true',
+                            help='Cada venta aparta primero las unidades en un carrito (reserva) y luego cobra')
+        parser.add_argument('--keep', action='store_true',
+                            help='Conserva el producto y las ventas de prueba (por defecto se eliminan)')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Crea un producto de prueba, lanza los hilos hasta agotar el stock y compara las unidades
+        vendidas con el stock inicial. Termina con error si se vendió de más
+        '''
+        if options['threads'] < 1 or options['stock'] < 1 or options['quantity'] < 1:
+            raise CommandError('--threads, --stock y --quantity deben ser mayores a cero')
+        employee_id = Employee.objects.filter(isActive=True).values_list('pk', flat=True).first()
+        if employee_id is None:
+            raise CommandError('Se necesita al menos un empleado activo (create_roles_and_admin)')
+
+        product, customer = self._create_fixtures(options['stock'])
+        counters = {'sales': 0, 'conflicts': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def release(cart_id):
+            # La reserva que no se logra liberar vencería sola; sin liberarla la prueba no termina
+            while True:
+                try:
+                    return stock.release(cart_id)
+                except (stock.StockConflict, OperationalError):
+                    with lock:
+                        counters['locked'] += 1
+
+        def register():
+            try:
+                while True:
+                    cart_id = uuid.uuid4().hex if options['carts'] else None
+                    try:
+                        if cart_id:
+                            stock.reserve(cart_id, {product.pk: options['quantity']})
+                        register_sale(customer, employee_id, 0, {product.pk: options['quantity']}, cart_id=cart_id)
+                        outcome = 'sales'
+                    except (CheckoutError, stock.InsufficientStock, stock.StockConflict):
+                        # Rechazo por falta de stock (fin de la prueba) o por reintentos agotados
+                        if cart_id:
+                            release(cart_id)
+                        if stock.available_units([product.pk])[product.pk] < options['quantity']:
+                            return
+                        outcome = 'conflicts'
+                    except OperationalError:
+                        # Base de datos bloqueada por otra escritura (SQLite)
+                        if cart_id:
+                            release(cart_id)
+                        outcome = 'locked'
+                    with lock:
+                        counters[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=register) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        sold = SaleDetail.objects.filter(product=product).aggregate(units=Sum('quantity'))['units'] or 0
+        remaining = stock.stock_levels([product.pk])[product.pk]
+        self.stdout.write(f'Hilos: {options["threads"]}, stock inicial: {options["stock"]}, '
+                          f'unidades por venta: {options["quantity"]}')
+        self.stdout.write(f'Ventas: {counters["sales"]} en {elapsed:.2f} s '
+                          f'({counters["sales"] / elapsed:.1f} ventas/s)')
+        self.stdout.write(f'Reintentos agotados: {counters["conflicts"]}, bloqueos de la base de datos: {counters["locked"]}')
+        self.stdout.write(f'Unidades vendidas: {sold}, stock final: {remaining}')
+
+        oversold = remaining < 0 or sold + remaining != options['stock']
+        if not options['keep']:
+            self._delete_fixtures(product, customer)
+        if oversold:
+            raise CommandError('Se vendieron más unidades que el stock disponible')
+        self.stdout.write(self.style.SUCCESS('Sin sobreventa'))
+
+    @staticmethod
+    def _create_fixtures(initial_stock):
+        suffix = uuid.uuid4().hex[:8].upper()
+        with transaction.atomic():
+            category, _ = Category.objects.get_or_create(name='Prueba de concurrencia')
+            product = Product.objects.create(name=f'Producto de prueba {suffix}', price=1000,
+                                             category=category, sku=f'ST{suffix}')
+            Inventory.objects.create(product=product, productQuantity=0)
+            stock.record_movements([StockMovement(product=product, quantity=initial_stock,
+                                                  kind=StockMovement.RESTOCK)])
+            customer = Customer.objects.create(firstName='Prueba', lastName=f'Concurrencia {suffix}')
+        return product, customer
+
+    @staticmethod
+    def _delete_fixtures(product, customer):
+        with transaction.atomic():
+            Sale.objects.filter(customer=customer).delete()
+            product.delete()
+            customer.delete()
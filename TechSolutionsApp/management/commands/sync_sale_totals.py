@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from TechSolutionsApp.models import Sale
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = 'Calcula o verifica los totales persistidos (subtotal, descuento y total) de las ventas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Solo reporta las ventas cuyos totales no coinciden, sin modificarlas')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Cantidad de ventas actualizadas por transacción')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Recorre las ventas por lotes de saleId y recalcula sus totales en la base de datos.
+        Con --verify compara los valores guardados contra los calculados desde los detalles
+        '''
+        if options['verify']:
+            self._verify()
+            return
+
+        batch_size = options['batch_size']
+        sale_ids = Sale.objects.order_by('saleId').values_list('saleId', flat=True)
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(sale_ids.filter(saleId__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += Sale.objects.filter(saleId__gte=batch[0], saleId__lte=batch[-1]).refresh_totals(touch=False)
+            last_id = batch[-1]
+            self.stdout.write(f'{updated} ventas actualizadas...')
+
+        self.stdout.write(self.style.SUCCESS(f'Totales actualizados en {updated} ventas'))
+
+    def _verify(self):
+        '''
+        Reporta las ventas cuyos totales persistidos difieren de los detalles
+        '''
+        mismatched = (Sale.objects.with_calculated_totals()
+                      .filter(~Q(subtotal=F('calculated_subtotal'))
+                              | ~Q(discountAmount=F('calculated_discount'))
+                              | ~Q(total=F('calculated_subtotal') - F('calculated_discount')))
+                      .order_by('saleId'))
+
+        count = mismatched.count()
+        if not count:
+            self.stdout.write(self.style.SUCCESS('Todos los totales de venta son correctos'))
+            return
+
+        sample = list(mismatched.values_list('saleId', flat=True)[:20])
+        self.stdout.write(self.style.WARNING(
+            f'{count} ventas con totales incorrectos (ejemplos: {", ".join(map(str, sample))}). '
+            'Ejecute el comando sin --verify para corregirlas.'
+        ))
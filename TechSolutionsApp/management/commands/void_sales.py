@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from TechSolutionsApp.models import Employee, Sale
+from TechSolutionsApp.services.sale_reversal import void_sales
+
+
+class Command(BaseCommand):
+    # Descripción del comando que aparece en la ayuda
+    help = ('Anula ventas y devuelve sus productos al inventario: ventas indicadas por id o todas las de '
+            'un turno de caja (empleado y rango de fecha y hora). Las ventas se conservan marcadas como anuladas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sale', type=int, action='append', default=[],
+                            help='Id de una venta a anular (se puede repetir)')
+        parser.add_argument('--employee', type=int, help='Id del empleado que realizó las ventas del turno')
+        parser.add_argument('--from', dest='start', type=str,
+                            help='Inicio del turno, inclusivo (YYYY-MM-DD o YYYY-MM-DDTHH:MM)')
+        parser.add_argument('--to', dest='end', type=str,
+                            help='Fin del turno, exclusivo (YYYY-MM-DD o YYYY-MM-DDTHH:MM)')
+        parser.add_argument('--voided-by', type=int,
+                            help='Id del empleado que registra la anulación (queda en los movimientos)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo muestra cuántas ventas se anularían')
+
+    # Método principal que se ejecuta al correr el comando
+    def handle(self, *args, **options):
+        '''
+        Selecciona las ventas y las anula en una sola transacción
+        '''
+        if options['sale']:
+            sales = Sale.objects.active().filter(pk__in=options['sale'])
+        elif options['employee'] and options['start'] and options['end']:
+            sales = Sale.objects.active().filter(user_id=options['employee'],
+                                        saleDate__gte=self._parse(options['start']),
+                                        saleDate__lt=self._parse(options['end']))
+        else:
+            raise CommandError('Indique --sale, o bien --employee con --from y --to')
+
+        if options['voided_by'] and not Employee.objects.filter(pk=options['voided_by']).exists():
+            raise CommandError(f'No existe el empleado {options["voided_by"]}')
+
+        if options['dry_run']:
+            self.stdout.write(f'Se anularían {sales.count()} ventas')
+            return
+
+        voided, units = void_sales(sales, options['voided_by'])
+        self.stdout.write(self.style.SUCCESS(f'{voided} ventas anuladas, {units} unidades devueltas al inventario'))
+
+    @staticmethod
+    def _parse(value):
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {value} (use YYYY-MM-DD o YYYY-MM-DDTHH:MM)')
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
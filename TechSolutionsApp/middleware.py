@@ -0,0 +1,252 @@
+"""
+middleware.py
+
+Middleware del sistema.
+
+- EmployeeAuthMiddleware: asigna `request.employee` (resuelto de forma diferida, una vez por
+  petición) y `request.aemployee()` para las vistas asíncronas, y verifica los requisitos
+  declarados en las vistas con login_required y permission_required (ver permissions.py).
+- QueryInstrumentationMiddleware: opcional (SQL_INSTRUMENTATION); mide las consultas SQL de
+  cada petición y detecta consultas repetidas (N+1).
+- ProfilingMiddleware: opcional (PROFILING_SAMPLE_RATES); perfila con cProfile una fracción de
+  las peticiones de cada vista (ver profiling.py).
+
+Con ASGI (asgi.py) los middleware opcionales son solo síncronos: mientras están activos Django
+ejecuta la cadena de middleware en un hilo y las vistas asíncronas pierden su ventaja.
+"""
+
+import cProfile
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from TechSolutionsApp import profiling
+from TechSolutionsApp.permissions import aresolve_employee, resolve_employee
+
+
+sql_logger = logging.getLogger('TechSolutionsApp.sql')
+
+# Valores literales y listas de parámetros que se reemplazan para agrupar consultas con la misma forma
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SQL_PARAMS = re.compile(r'%s|\?')
+_SQL_PARAM_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SQL_SPACES = re.compile(r'\s+')
+
+# Control de transacciones: se cuenta pero no se considera para las consultas repetidas
+_SQL_TRANSACTION = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK')
+
+
+class EmployeeAuthMiddleware:
+    '''
+    Autenticación y permisos de los empleados por petición. Funciona en modo síncrono (WSGI) y
+    asíncrono (ASGI); en modo asíncrono la verificación no pasa por un hilo aparte
+    '''
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        self._set_employee(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    @staticmethod
+    def _set_employee(request):
+        '''
+        request.employee (síncrono, diferido) y request.aemployee() (asíncrono) comparten el
+        resultado: el empleado se resuelve una sola vez por petición con cualquiera de los dos
+        '''
+        resolved = {}
+
+        def employee():
+            if 'employee' not in resolved:
+                resolved['employee'] = resolve_employee(request)
+            return resolved['employee']
+
+        async def aemployee():
+            if 'employee' not in resolved:
+                resolved['employee'] = await aresolve_employee(request)
+            return resolved['employee']
+
+        request.employee = SimpleLazyObject(employee)
+        request.aemployee = aemployee
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        '''
+        Redirige al login si la vista requiere sesión, o rechaza si faltan permisos
+        '''
+        if not getattr(view_func, 'login_required', False):
+            return None
+        return self._check(request, request.employee, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(view_func, 'login_required', False):
+            return None
+        return self._check(request, await request.aemployee(), view_func)
+
+    @staticmethod
+    def _check(request, employee, view_func):
+        if not employee.is_authenticated:
+            return redirect('login')
+
+        permissions = getattr(view_func, 'required_permissions', None)
+        if permissions and not employee.has_perms(permissions):
+            if getattr(view_func, 'permission_denied_json', False):
+                return JsonResponse({'error': 'No tienes permiso para acceder a esta sección.'}, status=403)
+            messages.error(request, "No tienes permiso para acceder a esta sección.")
+            return redirect('home')
+        return None
+
+
+class QueryInstrumentationMiddleware:
+    '''
+    Registra la cantidad de consultas, el tiempo total en SQL y las consultas más repetidas de
+    cada petición. Los datos se agregan a la respuesta como encabezado Server-Timing (visible en
+    las herramientas de desarrollo del navegador) y se escriben en una línea JSON en el logger
+    TechSolutionsApp.sql. Si una misma forma de consulta se ejecuta más de
+    SQL_REPEATED_QUERY_THRESHOLD veces la línea se registra como advertencia (posible N+1).
+
+    Las consultas ejecutadas mientras se envía una respuesta por partes (StreamingHttpResponse)
+    no se cuentan, porque ocurren después de que el middleware retorna.
+    '''
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SQL_REPEATED_QUERY_THRESHOLD', 5)
+        self.top = getattr(settings, 'SQL_INSTRUMENTATION_TOP', 3)
+
+    def __call__(self, request):
+        shapes = Counter()
+        timing = {'queries': 0, 'seconds': 0.0}
+
+        def record(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timing['queries'] += 1
+                timing['seconds'] += time.perf_counter() - start
+                if not sql.lstrip().upper().startswith(_SQL_TRANSACTION):
+                    shapes[normalize_sql(sql)] += 1
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = timing['seconds'] * 1000
+
+        repeated = [(sql, count) for sql, count in shapes.most_common(self.top) if count > 1]
+        flagged = [(sql, count) for sql, count in repeated if count > self.threshold]
+
+        metrics = [
+            f'sql;dur={sql_ms:.2f};desc="{timing["queries"]} consultas"',
+            f'app;dur={total_ms - sql_ms:.2f}',
+        ]
+        if flagged:
+            metrics.append(f'repeated;desc="{flagged[0][1]}x"')
+        response.headers['Server-Timing'] = ', '.join(
+            filter(None, [response.headers.get('Server-Timing'), *metrics])
+        )
+
+        line = json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'queries': timing['queries'],
+            'sql_ms': round(sql_ms, 2),
+            'repeated': [{'sql': sql, 'count': count} for sql, count in repeated],
+            'n_plus_one': bool(flagged),
+        }, ensure_ascii=False)
+        if flagged:
+            sql_logger.warning(line)
+        else:
+            sql_logger.info(line)
+        return response
+
+
+class ProfilingMiddleware:
+    '''
+    Perfila por muestreo las peticiones de las vistas configuradas en PROFILING_SAMPLE_RATES.
+    El perfil se inicia al resolver la vista, por lo que incluye los middleware siguientes, la
+    vista y el renderizado de la respuesta.
+
+    Las vistas asíncronas (view_products, view_sales, view_customers, lookup_sku,
+    lookup_customer) no se perfilan: cProfile solo registra el hilo donde se activa y esas
+    vistas se ejecutan en el hilo del bucle de eventos, por lo que su perfil solo mostraría
+    el código de asgiref y del ORM. Se registra una advertencia la primera vez que se omite cada una
+    '''
+
+    def __init__(self, get_response):
+        if not profiling.SAMPLE_RATES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self._skipped_views = set()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler = getattr(request, '_profiler', None)
+            if profiler is not None:
+                profiler.disable()
+                duration_ms = (time.perf_counter() - start) * 1000
+                profiling.save_profile(profiler, request.resolver_match.url_name, duration_ms)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        if not url_name or not profiling.should_sample(url_name):
+            return None
+        if iscoroutinefunction(view_func):
+            if url_name not in self._skipped_views:
+                self._skipped_views.add(url_name)
+                profiling.logger.warning('La vista asíncrona %s no se perfila (cProfile no la alcanza)', url_name)
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Ya hay otro perfilador activo en este hilo
+            return None
+        request._profiler = profiler
+        return None
+
+
+def normalize_sql(sql):
+    '''
+    Forma de la consulta sin valores: WHERE id = 5 y WHERE id = 7 se cuentan como la misma,
+    igual que las listas IN con distinta cantidad de parámetros
+    '''
+    sql = _SQL_STRING.sub('?', sql)
+    sql = _SQL_NUMBER.sub('?', sql)
+    sql = _SQL_PARAMS.sub('?', sql)
+    sql = _SQL_PARAM_LIST.sub('(...)', sql)
+    return _SQL_SPACES.sub(' ', sql).strip()
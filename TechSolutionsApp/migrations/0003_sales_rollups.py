@@ -0,0 +1,65 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0002_sale_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('highWaterMark', models.DateTimeField(blank=True, null=True)),
+                ('lastRefresh', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='TechSolutionsApp.category')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily category sales',
+                'unique_together': {('day', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyEmployeeSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('saleCount', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='TechSolutionsApp.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily employee sales',
+                'unique_together': {('day', 'employee')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='TechSolutionsApp.product')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily product sales',
+                'unique_together': {('day', 'product')},
+            },
+        ),
+    ]
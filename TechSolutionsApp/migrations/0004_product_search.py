@@ -0,0 +1,67 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+FTS_TABLE = 'TechSolutionsApp_product_fts'
+
+
+def fill_search_text(apps, schema_editor):
+    '''
+    Calcula searchText (nombre, SKU y categoría) para los productos existentes
+    '''
+    Product = apps.get_model('TechSolutionsApp', 'Product')
+    batch = []
+    for product in Product.objects.select_related('category').iterator(chunk_size=2000):
+        category_name = product.category.name if product.category_id else ''
+        product.searchText = ' '.join(part for part in (product.name, str(product.sku), category_name) if part)[:255]
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ['searchText'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['searchText'])
+
+
+def create_search_index(apps, schema_editor):
+    '''
+    Crea el índice de texto completo según el motor: FULLTEXT en MySQL o tabla FTS5 en SQLite
+    '''
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE `TechSolutionsApp_product` ADD FULLTEXT INDEX `product_search_ft` (`searchText`)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5("searchText", tokenize="unicode61 remove_diacritics 2")'
+        )
+        schema_editor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, "searchText") '
+            'SELECT "productId", "searchText" FROM "TechSolutionsApp_product"'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE `TechSolutionsApp_product` DROP INDEX `product_search_ft`')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0003_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='searchText',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(db_index=True, default=0, max_length=12),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0005_product_sku_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='isActive',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_inventory(apps, schema_editor):
+    '''
+    Deja un solo registro de inventario por producto antes de crear la restricción única.
+    Se conserva el registro más antiguo, que es el que el sistema leía y descontaba en las
+    ventas (los demás nunca se actualizaban), con la fecha de modificación más reciente
+    '''
+    Inventory = apps.get_model('TechSolutionsApp', 'Inventory')
+    duplicated = (Inventory.objects.values('product_id')
+                  .annotate(count=Count('inventoryId'), keep=Min('inventoryId'))
+                  .filter(count__gt=1))
+    for row in list(duplicated):
+        rows = Inventory.objects.filter(product_id=row['product_id'])
+        latest = rows.order_by('-modificationDate').values_list('modificationDate', flat=True).first()
+        rows.exclude(inventoryId=row['keep']).delete()
+        Inventory.objects.filter(inventoryId=row['keep']).update(modificationDate=latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0006_employee_is_active'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_inventory, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='inventory',
+            name='product',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='TechSolutionsApp.product'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'productId'], name='product_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'name', 'productId'], name='product_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'name', 'productId'], name='product_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['saleDate', 'saleId'], name='sale_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['user', 'saleDate', 'saleId'], name='sale_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['modificationDate'], name='sale_modification_idx'),
+        ),
+    ]
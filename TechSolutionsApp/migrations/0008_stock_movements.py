@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0007_inventory_one_to_one_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='snapshotMovementId',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='inventory',
+            name='productQuantity',
+            field=models.IntegerField(),
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('movementId', models.BigAutoField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField()),
+                ('kind', models.CharField(choices=[('sale', 'Venta'), ('sale_edit', 'Edición de venta'), ('adjustment', 'Ajuste manual'), ('restock', 'Reabastecimiento')], max_length=20)),
+                ('createdAt', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='TechSolutionsApp.employee')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='TechSolutionsApp.product')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='TechSolutionsApp.sale')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'movementId'], name='movement_product_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0008_stock_movements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('reservationId', models.AutoField(primary_key=True, serialize=False)),
+                ('cartId', models.CharField(max_length=32)),
+                ('quantity', models.PositiveIntegerField()),
+                ('expiresAt', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='TechSolutionsApp.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'expiresAt'], name='reservation_product_idx'), models.Index(fields=['expiresAt'], name='reservation_expires_idx')],
+                'unique_together': {('cartId', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:50
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(value):
+    decomposed = unicodedata.normalize('NFKD', (value or '').strip())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()[:100]
+
+
+def fill_search_names(apps, schema_editor):
+    '''
+    Calcula el nombre y apellido normalizados de los clientes existentes
+    '''
+    Customer = apps.get_model('TechSolutionsApp', 'Customer')
+    batch = []
+    for customer in Customer.objects.only('customerId', 'firstName', 'lastName').iterator(chunk_size=2000):
+        customer.searchFirstName = normalize_name(customer.firstName)
+        customer.searchLastName = normalize_name(customer.lastName)
+        batch.append(customer)
+        if len(batch) >= 2000:
+            Customer.objects.bulk_update(batch, ['searchFirstName', 'searchLastName'])
+            batch = []
+    if batch:
+        Customer.objects.bulk_update(batch, ['searchFirstName', 'searchLastName'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0009_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='searchFirstName',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='searchLastName',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['searchFirstName'], name='customer_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['searchLastName', 'searchFirstName'], name='customer_last_name_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0010_customer_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='kind',
+            field=models.CharField(choices=[('sale', 'Venta'), ('sale_edit', 'Edición de venta'), ('adjustment', 'Ajuste manual'), ('restock', 'Reabastecimiento'), ('void', 'Anulación de venta'), ('return', 'Devolución')], max_length=20),
+        ),
+    ]
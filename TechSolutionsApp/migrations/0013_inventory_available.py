@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.utils import timezone
+
+
+def fill_available(apps, schema_editor):
+    '''
+    Calcula el disponible de cada producto: foto más movimientos posteriores menos las reservas
+    vigentes (las vencidas se eliminan). Crea la foto de los productos que no la tienen
+    '''
+    Product = apps.get_model('TechSolutionsApp', 'Product')
+    Inventory = apps.get_model('TechSolutionsApp', 'Inventory')
+    StockMovement = apps.get_model('TechSolutionsApp', 'StockMovement')
+    StockReservation = apps.get_model('TechSolutionsApp', 'StockReservation')
+
+    StockReservation.objects.filter(expiresAt__lte=timezone.now()).delete()
+    Inventory.objects.bulk_create([
+        Inventory(product_id=product_id, productQuantity=0)
+        for product_id in Product.objects.filter(inventory__isnull=True).values_list('pk', flat=True)
+    ])
+
+    recent = dict(StockMovement.objects
+                  .filter(movementId__gt=F('product__inventory__snapshotMovementId'))
+                  .values('product_id')
+                  .annotate(total=Sum('quantity'))
+                  .values_list('product_id', 'total'))
+    reserved = dict(StockReservation.objects.values('product_id')
+                    .annotate(total=Sum('quantity'))
+                    .values_list('product_id', 'total'))
+    inventories = list(Inventory.objects.only('pk', 'product_id', 'productQuantity'))
+    for inventory in inventories:
+        inventory.available = (inventory.productQuantity + recent.get(inventory.product_id, 0)
+                               - reserved.get(inventory.product_id, 0))
+    Inventory.objects.bulk_update(inventories, ['available'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0012_sale_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='available',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_available, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='inventory',
+            name='version',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0013_inventory_available'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='voidedAt',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='voidedBy',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='voided_sales', to='TechSolutionsApp.employee'),
+        ),
+    ]
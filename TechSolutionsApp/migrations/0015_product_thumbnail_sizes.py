@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-18 05:52
+
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def mark_existing_thumbnails(apps, schema_editor):
+    '''
+    Registra los tamaños de las miniaturas que ya existen en el almacenamiento (una única
+    revisión al migrar; después los asigna la generación en segundo plano)
+    '''
+    Product = apps.get_model('TechSolutionsApp', 'Product')
+    sizes = sorted(getattr(settings, 'PRODUCT_THUMBNAIL_SIZES', (64, 160, 320)))
+    images = (Product.objects.exclude(image='').exclude(image__isnull=True)
+              .values_list('image', flat=True).distinct().order_by())
+    for image_name in list(images):
+        stem = os.path.splitext(os.path.basename(image_name))[0]
+        generated = [size for size in sizes if default_storage.exists(f'products/thumbs/{stem}_{size}.webp')]
+        if generated:
+            Product.objects.filter(image=image_name).update(thumbnailSizes=','.join(map(str, generated)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0014_sale_void_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='thumbnailSizes',
+            field=models.CharField(blank=True, default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(mark_existing_thumbnails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def reset_thumbnail_sizes(apps, schema_editor):
+    '''
+    Las miniaturas ahora incluyen la extensión de la imagen en su nombre: las generadas con el
+    nombre anterior no se encuentran en las nuevas URL. Se olvidan sus tamaños para que las
+    plantillas usen la imagen original hasta correr regenerate_thumbnails --missing-only
+    '''
+    Product = apps.get_model('TechSolutionsApp', 'Product')
+    Product.objects.exclude(thumbnailSizes='').update(thumbnailSizes='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TechSolutionsApp', '0015_product_thumbnail_sizes'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_thumbnail_sizes, migrations.RunPython.noop),
+    ]
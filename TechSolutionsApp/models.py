@@ -10,14 +10,28 @@ Modelos incluidos:
 - Customer: almacena información de los clientes.
 - Category: clasifica los productos en categorías.
 - Product: representa los productos disponibles para la venta.
-- Inventory: lleva el control de stock de los productos.
+- Inventory: foto (snapshot) del stock de cada producto.
+- StockMovement: movimientos de inventario (ventas, ediciones, ajustes, reabastecimientos).
+- StockReservation: unidades apartadas por los carritos en curso.
 - Sale: contiene los datos generales de una venta.
 - SaleDetail: desglosa los productos vendidos en cada venta.
+- DailyProductSales, DailyCategorySales, DailyEmployeeSales: resúmenes diarios de ventas para reportes.
+- RollupState: marca de agua de la actualización incremental de los resúmenes.
 '''
+import unicodedata
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
 from django.contrib.auth.hashers import make_password, check_password 
 
 
+# Tipo de salida para expresiones de montos calculados en la base de datos
+MONEY_FIELD = models.DecimalField(max_digits=12, decimal_places=2)
+
+
 class Role(models.Model):
     '''
     Representa los roles asignables a los empleados del sistema
@@ -42,6 +56,8 @@ class Employee(models.Model):
     phoneNumber = models.PositiveIntegerField(unique=True)
     role = models.ForeignKey(Role, on_delete=models.PROTECT)
     passwordHash = models.CharField(max_length=128, default='')
+    # Los empleados inactivos no pueden iniciar sesión y sus sesiones abiertas se cierran
+    isActive = models.BooleanField(default=True)
     
     def __str__(self):
         return self.firstName + self.lastName
@@ -63,10 +79,41 @@ class Customer(models.Model):
     lastName = models.CharField(max_length=100)
     email = models.EmailField(max_length=100, unique=True, null=True, blank=True)
     idNumber = models.PositiveIntegerField(unique=True, null=True, blank=True)
+    # Nombre y apellido normalizados (minúscula, sin tildes) para la búsqueda por prefijo, se actualizan al guardar
+    searchFirstName = models.CharField(max_length=100, blank=True, default='', editable=False)
+    searchLastName = models.CharField(max_length=100, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # Búsqueda de clientes por prefijo del nombre o del apellido (services/customers.py)
+            models.Index(fields=['searchFirstName'], name='customer_first_name_idx'),
+            models.Index(fields=['searchLastName', 'searchFirstName'], name='customer_last_name_idx'),
+        ]
     
     def __str__(self):
         return self.firstName + self.lastName
 
+    def save(self, *args, **kwargs):
+        self.set_search_names()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'searchFirstName', 'searchLastName'}
+        super().save(*args, **kwargs)
+
+    def set_search_names(self):
+        '''
+        Calcula los campos de búsqueda (también se usa antes de bulk_create, que no llama a save)
+        '''
+        self.searchFirstName = self.normalize_name(self.firstName)
+        self.searchLastName = self.normalize_name(self.lastName)
+
+    @staticmethod
+    def normalize_name(value):
+        '''
+        Minúscula y sin tildes: "José Pérez" -> "jose perez"
+        '''
+        decomposed = unicodedata.normalize('NFKD', (value or '').strip())
+        return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()[:100]
+
 
 class Category(models.Model):
     '''
@@ -82,6 +129,28 @@ class Category(models.Model):
         verbose_name_plural = "Categories"
 
 
+class ProductQuerySet(models.QuerySet):
+    '''
+    Consultas reutilizables sobre productos
+    '''
+
+    def with_stock(self):
+        '''
+        Anota el stock de cada producto (campo `stock`) en la misma consulta,
+        evitando una consulta de inventario por producto.
+        El stock es la foto de Inventory más los movimientos posteriores a ella
+        '''
+        recent = (StockMovement.objects
+                  .filter(product=OuterRef('pk'),
+                          movementId__gt=Coalesce(OuterRef('inventory__snapshotMovementId'), 0))
+                  .values('product')
+                  .annotate(total=Sum('quantity'))
+                  .values('total'))
+        return self.annotate(
+            stock=Coalesce(F('inventory__productQuantity'), 0) + Coalesce(Subquery(recent), 0)
+        )
+
+
 class Product(models.Model):
     '''
     Representa los productos disponibles para la venta.
@@ -94,31 +163,199 @@ class Product(models.Model):
     dateAdded = models.DateTimeField(auto_now_add=True)
     modificationDate = models.DateTimeField(auto_now=True)
     status = models.BooleanField(default=True)
-    sku = models.CharField(max_length=12, default=0)
+    sku = models.CharField(max_length=12, default=0, db_index=True)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # Tamaños de las miniaturas ya generadas para la imagen actual ("64,160,320"). Los asigna la
+    # generación en segundo plano y se vacía al cambiar la imagen; las URL se arman con este
+    # campo sin consultar el almacenamiento
+    thumbnailSizes = models.CharField(max_length=50, blank=True, default='', editable=False)
+    # Texto indexado para la búsqueda (nombre, SKU y categoría), se actualiza al guardar
+    searchText = models.CharField(max_length=255, blank=True, default='', editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Listado de productos (ordenado por nombre) y formulario de venta (solo activos)
+            models.Index(fields=['name', 'productId'], name='product_name_idx'),
+            models.Index(fields=['status', 'name', 'productId'], name='product_status_name_idx'),
+            models.Index(fields=['category', 'name', 'productId'], name='product_category_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.searchText = self.build_search_text()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'searchText'}
+        super().save(*args, **kwargs)
+
+    @property
+    def thumbnail_url(self):
+        '''
+        URL de la miniatura más pequeña, o de la imagen original si aún no se ha generado
+        '''
+        if not self.image:
+            return None
+        from TechSolutionsApp.thumbnails import parse_sizes, thumbnail_url
+        sizes = parse_sizes(self.thumbnailSizes)
+        return thumbnail_url(self.image.name, sizes[0]) if sizes else self.image.url
+
+    @property
+    def thumbnail_srcset(self):
+        '''
+        Valor srcset con las miniaturas disponibles para que el navegador elija el tamaño
+        '''
+        if not self.image:
+            return ''
+        from TechSolutionsApp.thumbnails import parse_sizes, thumbnail_srcset
+        return thumbnail_srcset(self.image.name, parse_sizes(self.thumbnailSizes))
+
+    def build_search_text(self, category_name=None):
+        '''
+        Construye el texto de búsqueda a partir del nombre, SKU y nombre de la categoría
+        '''
+        if category_name is None:
+            category_name = self.category.name if self.category_id else ''
+        return ' '.join(part for part in (self.name, str(self.sku), category_name) if part)[:255]
+
 
 class Inventory(models.Model):
     '''
-    Representa el inventario de productos.
-    Almacena la cantidad disponible y la fecha de última modificación.
+    Foto del inventario de cada producto (un registro por producto, `product.inventory`).
+    productQuantity es el stock con los movimientos hasta snapshotMovementId inclusive; el stock
+    actual suma los movimientos posteriores (ver ProductQuerySet.with_stock). La foto solo la
+    actualiza el comando compact_stock_movements.
+    available son las unidades que aún se pueden vender o reservar (stock actual menos las
+    reservas de carritos sin liberar); las ventas lo descuentan con un UPDATE condicionado.
     '''
     inventoryId = models.AutoField(primary_key=True)
-    product = models.ForeignKey(Product, on_delete=models.CASCADE) 
-    productQuantity = models.PositiveIntegerField()
+    product = models.OneToOneField(Product, on_delete=models.CASCADE)
+    productQuantity = models.IntegerField()
+    snapshotMovementId = models.BigIntegerField(default=0)
+    available = models.IntegerField(default=0)
     modificationDate = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Inventory"
 
 
+class StockMovement(models.Model):
+    '''
+    Movimiento de inventario de un producto: cantidad positiva para entradas y negativa para
+    salidas. Los movimientos solo se agregan (nunca se modifican ni eliminan), por lo que las
+    cajas no compiten por actualizar la misma fila y queda el historial de cada cambio de stock.
+    '''
+    SALE = 'sale'
+    SALE_EDIT = 'sale_edit'
+    ADJUSTMENT = 'adjustment'
+    RESTOCK = 'restock'
+    VOID = 'void'
+    RETURN = 'return'
+    KIND_CHOICES = [
+        (SALE, 'Venta'),
+        (SALE_EDIT, 'Edición de venta'),
+        (ADJUSTMENT, 'Ajuste manual'),
+        (RESTOCK, 'Reabastecimiento'),
+        (VOID, 'Anulación de venta'),
+        (RETURN, 'Devolución'),
+    ]
+
+    movementId = models.BigAutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # La venta y el empleado se conservan como referencia aunque se eliminen
+    sale = models.ForeignKey('Sale', on_delete=models.SET_NULL, null=True, blank=True)
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True)
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Movimientos de un producto posteriores a su foto (cálculo del stock)
+            models.Index(fields=['product', 'movementId'], name='movement_product_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.quantity:+d} ({self.product_id})'
+
+
+class StockReservation(models.Model):
+    '''
+    Unidades de un producto apartadas por un carrito en curso. Las reservas vigentes de otros
+    carritos se descuentan del stock disponible; al vencer (expiresAt) dejan de contar.
+    '''
+    reservationId = models.AutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    cartId = models.CharField(max_length=32)
+    quantity = models.PositiveIntegerField()
+    expiresAt = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('cartId', 'product')
+        indexes = [
+            # Reservas vigentes de un producto (cálculo del stock disponible)
+            models.Index(fields=['product', 'expiresAt'], name='reservation_product_idx'),
+            models.Index(fields=['expiresAt'], name='reservation_expires_idx'),
+        ]
+
+
+class SaleQuerySet(models.QuerySet):
+    '''
+    Consultas reutilizables sobre ventas
+    '''
+
+    def active(self):
+        '''
+        Ventas no anuladas (las anuladas se conservan como registro, pero no cuentan en reportes,
+        resúmenes ni totales)
+        '''
+        return self.filter(voidedAt__isnull=True)
+
+    @staticmethod
+    def _calculated_subtotal():
+        '''
+        Expresión con la suma de cantidad * precio unitario de los detalles de cada venta
+        '''
+        line_totals = (SaleDetail.objects.filter(sale=OuterRef('pk'))
+                       .values('sale')
+                       .annotate(amount=Sum(F('quantity') * F('unitPrice')))
+                       .values('amount'))
+        return Coalesce(Subquery(line_totals, output_field=MONEY_FIELD), Value(Decimal('0')), output_field=MONEY_FIELD)
+
+    def with_calculated_totals(self):
+        '''
+        Anota calculated_subtotal y calculated_discount calculados desde los detalles,
+        útil para verificar los totales persistidos
+        '''
+        return (self.annotate(calculated_subtotal=self._calculated_subtotal())
+                .annotate(calculated_discount=Round(F('calculated_subtotal') * F('discountPercentage') / 100, 2,
+                                                    output_field=MONEY_FIELD)))
+
+    def refresh_totals(self, touch=True):
+        '''
+        Recalcula en la base de datos los totales persistidos (subtotal, discountAmount
+        y total) de las ventas del queryset a partir de sus detalles.
+        Se usan sentencias separadas para que cada columna se calcule con el valor
+        ya actualizado de la anterior en cualquier motor de base de datos
+        '''
+        values = {'subtotal': self._calculated_subtotal()}
+        if touch:
+            values['modificationDate'] = timezone.now()
+
+        updated = self.update(**values)
+        self.update(discountAmount=Round(F('subtotal') * F('discountPercentage') / 100, 2, output_field=MONEY_FIELD))
+        self.update(total=F('subtotal') - F('discountAmount'))
+        return updated
+
+
 class Sale(models.Model):
     '''
     Representa una venta realizada.
-    Incluye cliente, empleado que la realizó, fecha y descuento aplicado.
+    Incluye cliente, empleado que la realizó, fecha, descuento aplicado
+    y los totales calculados de la venta. Una venta anulada conserva sus detalles y registra
+    cuándo y quién la anuló (voidedAt, voidedBy).
     '''
     saleId = models.AutoField(primary_key=True)
     customer = models.ForeignKey(Customer, on_delete=models.PROTECT)
@@ -126,10 +363,54 @@ class Sale(models.Model):
     saleDate = models.DateTimeField(auto_now_add=True)
     modificationDate = models.DateTimeField(auto_now=True)
     discountPercentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discountAmount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Clave generada por la caja para las ventas recibidas por lotes (sale_ingestion): un mismo
+    # lote puede reenviarse sin duplicar ventas
+    idempotencyKey = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    voidedAt = models.DateTimeField(null=True, blank=True, editable=False)
+    voidedBy = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                 related_name='voided_sales')
+
+    objects = SaleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Listado de ventas (más recientes primero, paginación por cursor) y rangos de fechas
+            models.Index(fields=['saleDate', 'saleId'], name='sale_date_idx'),
+            models.Index(fields=['user', 'saleDate', 'saleId'], name='sale_user_date_idx'),
+            # Actualización incremental de los resúmenes (ventas modificadas desde la última ejecución)
+            models.Index(fields=['modificationDate'], name='sale_modification_idx'),
+        ]
 
     def __str__(self):
         return f'{self.saleId}'
 
+    def save(self, *args, **kwargs):
+        # El descuento y el total siempre se derivan del subtotal y el porcentaje actuales
+        self.set_totals(self.subtotal)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'subtotal', 'discountAmount', 'total'}
+        super().save(*args, **kwargs)
+
+    def set_totals(self, subtotal):
+        '''
+        Asigna subtotal, monto de descuento y total a partir del subtotal de las líneas
+        '''
+        cents = Decimal('0.01')
+        self.subtotal = Decimal(str(subtotal)).quantize(cents, ROUND_HALF_UP)
+        discount = Decimal(str(self.discountPercentage or 0))
+        self.discountAmount = (self.subtotal * discount / 100).quantize(cents, ROUND_HALF_UP)
+        self.total = self.subtotal - self.discountAmount
+
+    def refresh_totals(self):
+        '''
+        Recalcula los totales persistidos de esta venta desde sus detalles
+        '''
+        Sale.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=['subtotal', 'discountAmount', 'total', 'modificationDate'])
+
 
 class SaleDetail(models.Model):
     '''
@@ -143,4 +424,60 @@ class SaleDetail(models.Model):
     unitPrice = models.DecimalField(max_digits=10, decimal_places=2)
 
     class Meta:
-        unique_together = ('sale', 'product')
\ No newline at end of file
+        unique_together = ('sale', 'product')
+
+class DailyProductSales(models.Model):
+    '''
+    Resumen diario de ventas por producto (cantidad vendida e ingreso bruto).
+    Se mantiene con el comando refresh_sales_rollups.
+    '''
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('day', 'product')
+        verbose_name_plural = "Daily product sales"
+
+
+class DailyCategorySales(models.Model):
+    '''
+    Resumen diario de ventas por categoría (cantidad vendida e ingreso bruto).
+    Los productos sin categoría se agrupan con category nulo.
+    '''
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('day', 'category')
+        verbose_name_plural = "Daily category sales"
+
+
+class DailyEmployeeSales(models.Model):
+    '''
+    Resumen diario de ventas por empleado (cantidad de ventas e ingreso neto con descuento).
+    '''
+    day = models.DateField()
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    saleCount = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('day', 'employee')
+        verbose_name_plural = "Daily employee sales"
+
+
+class RollupState(models.Model):
+    '''
+    Guarda la marca de agua (última modificationDate procesada) de cada resumen
+    para que la actualización sea incremental.
+    '''
+    name = models.CharField(max_length=50, unique=True)
+    highWaterMark = models.DateTimeField(null=True, blank=True)
+    lastRefresh = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
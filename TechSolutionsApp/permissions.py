@@ -0,0 +1,226 @@
+"""
+permissions.py
+
+Empleado actual y permisos por rol.
+
+EmployeeAuthMiddleware (middleware.py) asigna a cada petición `request.employee`, que se resuelve
+de forma diferida y como máximo una vez por petición. Los datos del empleado y sus permisos se
+guardan en una caché LRU con TTL; las señales de Employee la invalidan, por lo que un cambio de
+rol o una desactivación se aplica en la siguiente petición (en otros procesos, a más tardar al
+vencer el TTL) sin esperar a que expire la sesión.
+
+Las vistas declaran sus requisitos con decoradores, que solo marcan la vista; el middleware
+es quien los verifica antes de ejecutarla:
+
+    @login_required
+    @permission_required(PRODUCTS_MANAGE)
+    def edit_product(request, id): ...
+
+Los decoradores sirven igual para vistas asíncronas (async def). En ellas el empleado se obtiene
+con `await request.aemployee()` (resolve_employee consulta la base de datos de forma síncrona);
+ambos comparten el resultado, por lo que después `request.employee` ya no consulta nada.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.db import transaction
+
+from TechSolutionsApp.cache import LRUCache
+from TechSolutionsApp.models import Employee
+
+
+PRODUCTS_MANAGE = 'products.manage'
+CATEGORIES_MANAGE = 'categories.manage'
+EMPLOYEES_MANAGE = 'employees.manage'
+SALES_MANAGE = 'sales.manage'
+REPORTS_VIEW = 'reports.view'
+
+ALL_PERMISSIONS = frozenset({PRODUCTS_MANAGE, CATEGORIES_MANAGE, EMPLOYEES_MANAGE, SALES_MANAGE, REPORTS_VIEW})
+
+ADMIN_ROLE_ID = 1
+
+# Permisos de cada rol (roleId -> permisos). Los roles que no aparecen no tienen permisos especiales
+ROLE_PERMISSIONS = getattr(settings, 'ROLE_PERMISSIONS', {ADMIN_ROLE_ID: ALL_PERMISSIONS})
+
+MIDDLEWARE_PATH = 'TechSolutionsApp.middleware.EmployeeAuthMiddleware'
+
+
+class CurrentEmployee:
+    '''
+    Datos del empleado autenticado necesarios en cada petición (sin consultar el modelo completo)
+    '''
+
+    def __init__(self, id=None, name='', role_id=None, permissions=frozenset()):
+        self.id = id
+        self.name = name
+        self.role_id = role_id
+        self.permissions = frozenset(permissions)
+
+    @property
+    def is_authenticated(self):
+        return self.id is not None
+
+    @property
+    def is_admin(self):
+        return self.role_id == ADMIN_ROLE_ID
+
+    def has_perms(self, permissions):
+        return self.permissions.issuperset(permissions)
+
+    def __repr__(self):
+        return f'<CurrentEmployee {self.id} rol={self.role_id}>'
+
+
+ANONYMOUS = CurrentEmployee()
+
+_cache = LRUCache(
+    max_size=getattr(settings, 'AUTH_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_CACHE_TTL', 30)
+)
+
+# Tiempo acumulado resolviendo el empleado de las peticiones (para medir el costo del middleware)
+_timing = {'resolutions': 0, 'seconds': 0.0}
+_timing_lock = threading.Lock()
+
+
+def login_required(view_func):
+    '''
+    Marca una vista como accesible solo para empleados autenticados
+    '''
+    view_func.login_required = True
+    return view_func
+
+
+def permission_required(*permissions, json_response=False):
+    '''
+    Marca una vista como accesible solo para empleados con todos los permisos indicados.
+    Con json_response=True el rechazo se responde con JSON (403) en lugar de redirigir al inicio
+    '''
+    def decorator(view_func):
+        view_func.login_required = True
+        view_func.required_permissions = frozenset(permissions)
+        view_func.permission_denied_json = json_response
+        return view_func
+    return decorator
+
+
+def resolve_employee(request):
+    '''
+    Obtiene el empleado de la sesión. Si fue eliminado o desactivado se cierra la sesión
+    '''
+    employee_id = request.session.get('employee_id')
+    if employee_id is None:
+        return ANONYMOUS
+
+    start = time.perf_counter()
+    employee = get_employee(employee_id)
+    _record_timing(start)
+
+    if employee is None:
+        request.session.flush()
+        return ANONYMOUS
+    return employee
+
+
+async def aresolve_employee(request):
+    '''
+    Versión asíncrona de resolve_employee para las vistas async (sesión y consulta con el ORM asíncrono)
+    '''
+    employee_id = await request.session.aget('employee_id')
+    if employee_id is None:
+        return ANONYMOUS
+
+    start = time.perf_counter()
+    employee = await aget_employee(employee_id)
+    _record_timing(start)
+
+    if employee is None:
+        await request.session.aflush()
+        return ANONYMOUS
+    return employee
+
+
+def get_employee(employee_id):
+    '''
+    Retorna el CurrentEmployee activo con ese id (o None) usando la caché
+    '''
+    employee = _cache.get(employee_id)
+    if employee is not LRUCache.MISSING:
+        return employee
+
+    row = _employee_row(employee_id).first()
+    return _cache_employee(employee_id, row)
+
+
+async def aget_employee(employee_id):
+    '''
+    Versión asíncrona de get_employee
+    '''
+    employee = _cache.get(employee_id)
+    if employee is not LRUCache.MISSING:
+        return employee
+
+    row = await _employee_row(employee_id).afirst()
+    return _cache_employee(employee_id, row)
+
+
+def _employee_row(employee_id):
+    return (Employee.objects.filter(pk=employee_id, isActive=True)
+            .values_list('firstName', 'lastName', 'role_id'))
+
+
+def _cache_employee(employee_id, row):
+    employee = None
+    if row is not None:
+        first_name, last_name, role_id = row
+        employee = CurrentEmployee(employee_id, f'{first_name} {last_name}', role_id,
+                                   ROLE_PERMISSIONS.get(role_id, frozenset()))
+    _cache.set(employee_id, employee)
+    return employee
+
+
+def _record_timing(start):
+    with _timing_lock:
+        _timing['resolutions'] += 1
+        _timing['seconds'] += time.perf_counter() - start
+
+
+def invalidate_employee(employee_id):
+    _cache.delete(employee_id)
+
+
+def invalidate_employee_on_commit(employee_id):
+    '''
+    Invalida al confirmar la transacción, para no volver a guardar datos previos al cambio
+    '''
+    transaction.on_commit(lambda: invalidate_employee(employee_id))
+
+
+def auth_stats():
+    '''
+    Contadores de la caché y tiempo promedio (en microsegundos) para resolver el empleado
+    '''
+    with _timing_lock:
+        resolutions, seconds = _timing['resolutions'], _timing['seconds']
+    return {
+        **_cache.stats(),
+        'resolutions': resolutions,
+        'avg_us': round(seconds / resolutions * 1e6, 1) if resolutions else 0,
+    }
+
+
+@checks.register(checks.Tags.security)
+def check_middleware(app_configs, **kwargs):
+    '''
+    Los decoradores solo marcan las vistas: sin el middleware ninguna vista estaría protegida
+    '''
+    if MIDDLEWARE_PATH not in settings.MIDDLEWARE:
+        return [checks.Error(
+            f'{MIDDLEWARE_PATH} no está en MIDDLEWARE; las vistas con login_required '
+            'y permission_required quedarían sin protección.',
+            id='TechSolutionsApp.E001',
+        )]
+    return []
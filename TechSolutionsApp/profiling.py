@@ -0,0 +1,110 @@
+"""
+profiling.py
+
+Perfilado por muestreo de las vistas en producción (ProfilingMiddleware en middleware.py).
+
+Se perfila con cProfile una fracción de las peticiones de cada vista, según su nombre de URL:
+
+    PROFILING_SAMPLE_RATES = {'add_sale': 0.05, '*': 0.001}
+
+Cada muestra se guarda comprimida (gzip) en PROFILING_DIR con el nombre
+<vista>-<fecha>-<pid>-<ms>.prof.gz; al superar PROFILING_MAX_FILES se eliminan las más antiguas.
+El comando profile_report agrupa las muestras por vista y muestra las funciones con mayor
+tiempo acumulado.
+
+Solo se perfilan las vistas síncronas: las asíncronas corren en el hilo del bucle de eventos,
+fuera del alcance de cProfile (ver ProfilingMiddleware).
+"""
+
+import gzip
+import logging
+import marshal
+import os
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+SAMPLE_RATES = getattr(settings, 'PROFILING_SAMPLE_RATES', {})
+PROFILE_DIR = Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+MAX_FILES = getattr(settings, 'PROFILING_MAX_FILES', 500)
+
+SUFFIX = '.prof.gz'
+
+logger = logging.getLogger(__name__)
+
+
+class LoadedProfile:
+    '''
+    Datos de un perfil guardado, con la interfaz que pstats.Stats espera de un cProfile.Profile
+    '''
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def should_sample(url_name):
+    '''
+    Decide al azar si se perfila la petición, con la fracción configurada para la vista
+    (o la de '*' si la vista no está en PROFILING_SAMPLE_RATES)
+    '''
+    rate = SAMPLE_RATES.get(url_name, SAMPLE_RATES.get('*', 0))
+    return rate > 0 and random.random() < rate
+
+
+def save_profile(profiler, url_name, duration_ms):
+    '''
+    Guarda el perfil comprimido y elimina los más antiguos si se supera PROFILING_MAX_FILES.
+    Un error al escribir solo se registra: no debe afectar la respuesta de la petición
+    '''
+    profiler.create_stats()
+    name = f'{url_name}-{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}-{int(duration_ms)}{SUFFIX}'
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        with gzip.open(PROFILE_DIR / name, 'wb') as output:
+            output.write(marshal.dumps(profiler.stats))
+        _rotate()
+    except OSError:
+        logger.exception('No se pudo guardar el perfil %s', name)
+
+
+def iter_profiles(url_name=None, directory=None):
+    '''
+    Genera (vista, duración en ms, LoadedProfile) de los perfiles guardados
+    '''
+    directory = Path(directory or PROFILE_DIR)
+    if not directory.is_dir():
+        return
+    for path in sorted(directory.glob(f'*{SUFFIX}')):
+        view, _, _, duration = path.name[:-len(SUFFIX)].rsplit('-', 3)
+        if url_name and view != url_name:
+            continue
+        try:
+            with gzip.open(path, 'rb') as profile:
+                stats = marshal.loads(profile.read())
+        except (OSError, EOFError, ValueError):
+            # Archivo incompleto (por ejemplo, borrado por la rotación mientras se leía)
+            continue
+        yield view, int(duration), LoadedProfile(stats)
+
+
+def _rotate():
+    files = sorted(PROFILE_DIR.glob(f'*{SUFFIX}'))
+    if len(files) <= MAX_FILES:
+        return
+    # Los nombres incluyen la fecha, pero varios procesos pueden escribir en el mismo segundo
+    files.sort(key=_modified)
+    for path in files[:len(files) - MAX_FILES]:
+        path.unlink(missing_ok=True)
+
+
+def _modified(path):
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,164 @@
+"""
+search.py
+
+Búsqueda indexada de productos por nombre, SKU y categoría.
+
+Cada producto guarda en `searchText` el texto a indexar. Según el motor de base de datos:
+- MySQL: índice FULLTEXT sobre searchText, consultado con MATCH ... AGAINST en modo booleano.
+- SQLite: tabla virtual FTS5 (product_fts) cuyo rowid es el productId; se mantiene
+  sincronizada desde las señales de Product y Category (ver signals.py).
+- Otros motores: búsqueda por icontains sobre searchText.
+
+En todos los casos se admite coincidencia por prefijo (cada término busca palabras que
+empiecen con él) y los resultados se ordenan por relevancia.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from TechSolutionsApp.models import Product
+
+
+FTS_TABLE = 'TechSolutionsApp_product_fts'
+
+# MySQL ignora por defecto los términos de menos de 3 caracteres (innodb_ft_min_token_size)
+MYSQL_MIN_TOKEN_SIZE = 3
+
+
+def tokenize(query):
+    '''
+    Separa la búsqueda en términos alfanuméricos en minúscula
+    '''
+    return re.findall(r'\w+', (query or '').lower())
+
+
+def search_products(queryset, query):
+    '''
+    Filtra el queryset de productos por la búsqueda y lo ordena por relevancia.
+    Si la búsqueda no tiene términos válidos, retorna el queryset sin cambios
+    '''
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    if connection.vendor == 'mysql' and all(len(token) >= MYSQL_MIN_TOKEN_SIZE for token in tokens):
+        return _search_mysql(queryset, tokens)
+    if connection.vendor == 'sqlite' and _fts_table_exists():
+        return _search_sqlite(queryset, tokens)
+    return _search_fallback(queryset, tokens)
+
+
+def index_products(product_ids):
+    '''
+    Sincroniza el índice FTS5 (solo SQLite) para los productos indicados.
+    En MySQL el índice FULLTEXT lo mantiene el propio motor
+    '''
+    product_ids = list(product_ids)
+    if not product_ids or connection.vendor != 'sqlite' or not _fts_table_exists():
+        return
+    table = Product._meta.db_table
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(
+                f'INSERT INTO "{FTS_TABLE}" (rowid, "searchText") '
+                f'SELECT "productId", "searchText" FROM "{table}" WHERE "productId" IN ({placeholders})',
+                chunk
+            )
+
+
+def unindex_products(product_ids):
+    '''
+    Elimina productos del índice FTS5 (solo SQLite)
+    '''
+    product_ids = list(product_ids)
+    if not product_ids or connection.vendor != 'sqlite' or not _fts_table_exists():
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid IN ({placeholders})', product_ids)
+
+
+def rebuild_index():
+    '''
+    Recalcula searchText de todos los productos y reconstruye el índice FTS5 si aplica.
+    Retorna la cantidad de productos procesados
+    '''
+    processed = 0
+    batch = []
+    products = Product.objects.select_related('category').only('productId', 'name', 'sku', 'category__name')
+    for product in products.iterator(chunk_size=2000):
+        product.searchText = product.build_search_text()
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ['searchText'])
+            processed += len(batch)
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['searchText'])
+        processed += len(batch)
+
+    if connection.vendor == 'sqlite' and _fts_table_exists():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+            cursor.execute(
+                f'INSERT INTO "{FTS_TABLE}" (rowid, "searchText") '
+                f'SELECT "productId", "searchText" FROM "{Product._meta.db_table}"'
+            )
+    return processed
+
+
+def _search_mysql(queryset, tokens):
+    '''
+    MATCH ... AGAINST en modo booleano: todos los términos son obligatorios y por prefijo
+    '''
+    expression = ' '.join(f'+{token}*' for token in tokens)
+    relevance = RawSQL(
+        f'MATCH (`{Product._meta.db_table}`.`searchText`) AGAINST (%s IN BOOLEAN MODE)',
+        (expression,)
+    )
+    return queryset.annotate(relevance=relevance).filter(relevance__gt=0).order_by('-relevance', 'name', 'productId')
+
+
+def _search_sqlite(queryset, tokens):
+    '''
+    Une la tabla FTS5 por rowid y ordena por bm25 (rank). La coincidencia es parte de la misma
+    consulta que los demás filtros (estado, categoría, stock), por lo que el conteo y la
+    paginación cubren todos los resultados
+    '''
+    expression = ' '.join(f'"{token}"*' for token in tokens)
+    # Una tabla virtual no tiene modelo: extra() agrega el JOIN (una subconsulta de rango por
+    # fila repetiría la expansión del prefijo en cada producto)
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'"{FTS_TABLE}".rowid = "{Product._meta.db_table}"."productId"', f'"{FTS_TABLE}" MATCH %s'],
+        params=[expression],
+        select={'relevance': f'"{FTS_TABLE}".rank'},
+        order_by=['relevance', 'name', 'productId'],
+    )
+
+
+def _search_fallback(queryset, tokens):
+    '''
+    Búsqueda sin índice de texto completo, todos los términos deben aparecer
+    '''
+    condition = Q()
+    for token in tokens:
+        condition &= Q(searchText__icontains=token)
+    return queryset.filter(condition)
+
+
+def _fts_table_exists():
+    '''
+    Verifica (una vez por conexión) que la tabla FTS5 exista
+    '''
+    cached = getattr(connection, '_product_fts_exists', None)
+    if cached is None:
+        cached = FTS_TABLE in connection.introspection.table_names()
+        connection._product_fts_exists = cached
+    return cached
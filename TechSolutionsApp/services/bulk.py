@@ -0,0 +1,40 @@
+"""
+bulk.py
+
+Utilidades para escrituras masivas.
+
+- delete_rows: DELETE por llave primaria en una sentencia, sin cargar los objetos ni enviar
+  señales (quien llama se encarga de lo que harían los receptores, como recalcular totales).
+- reset_sequences: ajusta las secuencias de llaves primarias después de insertar ids explícitos
+  (solo tiene efecto en los motores que las usan, como PostgreSQL).
+"""
+
+from django.core.management.color import no_style
+from django.db import connection
+
+
+def delete_rows(model, pks, batch_size=1000):
+    '''
+    Elimina las filas con esas llaves primarias. Retorna la cantidad eliminada
+    '''
+    pks = list(pks)
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    deleted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(pks), batch_size):
+            chunk = pks[start:start + batch_size]
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(chunk))})', chunk)
+            deleted += cursor.rowcount
+    return deleted
+
+
+def reset_sequences(*models):
+    '''
+    Sincroniza las secuencias de llaves primarias con el id máximo de cada tabla
+    '''
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
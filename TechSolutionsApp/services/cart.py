@@ -0,0 +1,167 @@
+"""
+cart.py
+
+Carrito de venta guardado en la sesión del usuario.
+
+En lugar de enviar un campo quantity_<id> por cada producto del catálogo, la caja agrega,
+modifica y elimina líneas mediante endpoints JSON y al cobrar solo envía el id del carrito.
+El carrito guarda únicamente {productId: cantidad}; los datos de los productos se consultan
+en una sola consulta cuando se necesita mostrarlo, por lo que el costo depende del tamaño
+del carrito y no del catálogo.
+
+Las unidades de cada línea quedan apartadas (StockReservation, ver stock.py) mientras el carrito
+está en uso, para que otra caja no venda las mismas unidades; las reservas se renuevan con cada
+cambio del carrito y vencen a los CART_RESERVATION_TIMEOUT segundos sin actividad.
+"""
+
+import uuid
+from decimal import Decimal
+
+from TechSolutionsApp.models import Product
+from TechSolutionsApp.services import stock
+
+
+class CartError(Exception):
+    '''
+    Error al modificar el carrito (producto inexistente, cantidad inválida, sin stock)
+    '''
+
+
+class SessionCart:
+    '''
+    Carrito asociado a la sesión. Cada carrito tiene un id que cambia al cobrarlo o vaciarlo,
+    lo que evita registrar dos veces la misma venta si el formulario se envía de nuevo
+    '''
+
+    SESSION_KEY = 'sale_cart'
+
+    def __init__(self, session):
+        self.session = session
+        data = session.get(self.SESSION_KEY) or {}
+        self.id = data.get('id') or uuid.uuid4().hex
+        self.lines = {int(product_id): quantity for product_id, quantity in data.get('lines', {}).items()}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, product_id, quantity=1):
+        '''
+        Agrega unidades de un producto activo validando el stock disponible
+        '''
+        quantity = self._parse_quantity(quantity, allow_zero=False)
+        product = self._get_product(product_id)
+        new_quantity = self.lines.get(product['productId'], 0) + quantity
+        self._reserve(product, new_quantity)
+        self.lines[product['productId']] = new_quantity
+        self.save()
+
+    def update(self, product_id, quantity):
+        '''
+        Cambia la cantidad de una línea, con cantidad cero la elimina
+        '''
+        quantity = self._parse_quantity(quantity, allow_zero=True)
+        product_id = self._parse_product_id(product_id)
+        if quantity == 0:
+            self.remove(product_id)
+            return
+        product = self._get_product(product_id)
+        self._reserve(product, quantity)
+        self.lines[product_id] = quantity
+        self.save()
+
+    def remove(self, product_id):
+        product_id = self._parse_product_id(product_id)
+        stock.release(self.id, [product_id])
+        self.lines.pop(product_id, None)
+        self.save()
+
+    def clear(self):
+        '''
+        Vacía el carrito (liberando sus reservas) y genera un id nuevo
+        '''
+        stock.release(self.id)
+        self.id = uuid.uuid4().hex
+        self.lines = {}
+        self.save()
+
+    def save(self):
+        self.session[self.SESSION_KEY] = {
+            'id': self.id,
+            'lines': {str(product_id): quantity for product_id, quantity in self.lines.items()},
+        }
+        self.session.modified = True
+
+    def checkout_lines(self):
+        '''
+        Retorna las líneas en el formato del servicio de cobro {product_id: cantidad}
+        '''
+        return dict(self.lines)
+
+    def as_dict(self):
+        '''
+        Representación del carrito con los datos de sus productos (una sola consulta)
+        '''
+        products = {
+            product['productId']: product
+            for product in (Product.objects.filter(pk__in=list(self.lines))
+                            .with_stock()
+                            .values('productId', 'name', 'sku', 'price', 'stock'))
+        }
+        lines = []
+        subtotal = Decimal('0.00')
+        for product_id, quantity in self.lines.items():
+            product = products.get(product_id)
+            if product is None:
+                continue
+            line_total = product['price'] * quantity
+            subtotal += line_total
+            lines.append({
+                'productId': product_id,
+                'name': product['name'],
+                'sku': product['sku'],
+                'price': str(product['price']),
+                'stock': product['stock'],
+                'quantity': quantity,
+                'lineTotal': str(line_total),
+            })
+        return {'id': self.id, 'lines': lines, 'subtotal': str(subtotal), 'count': len(lines)}
+
+    def _get_product(self, product_id):
+        product = (Product.objects.filter(pk=self._parse_product_id(product_id), status=True)
+                   .values('productId', 'name')
+                   .first())
+        if product is None:
+            raise CartError("El producto no existe o está inactivo")
+        return product
+
+    def _reserve(self, product, quantity):
+        '''
+        Aparta las unidades de la línea, validando contra el stock no reservado por otros carritos
+        '''
+        try:
+            stock.reserve(self.id, {product['productId']: quantity})
+        except stock.InsufficientStock as e:
+            _, available, _ = e.shortages[0]
+            raise CartError(
+                f"No hay suficiente inventario para {product['name']} "
+                f"(disponible: {available}, solicitado: {quantity})"
+            )
+        except stock.StockConflict:
+            raise CartError("La base de datos está ocupada por ventas simultáneas, intente nuevamente")
+
+    @staticmethod
+    def _parse_product_id(product_id):
+        try:
+            return int(product_id)
+        except (TypeError, ValueError):
+            raise CartError("Producto inválido")
+
+    @staticmethod
+    def _parse_quantity(quantity, allow_zero):
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            raise CartError("La cantidad debe ser un número entero")
+        if quantity < 0 or (quantity == 0 and not allow_zero):
+            raise CartError("La cantidad debe ser mayor a cero")
+        return quantity
@@ -0,0 +1,104 @@
+"""
+checkout.py
+
+Servicio de cobro utilizado por la vista add_sale.
+
+Registra una venta completa dentro de una única transacción:
+- Recibe las líneas del carrito {product_id: cantidad} y carga esos productos en una consulta
+- Crea los detalles de venta con bulk_create
+- Descuenta el inventario insertando un movimiento por línea y consume las reservas del carrito
+- Al final descuenta las unidades del disponible con un UPDATE condicionado (ver stock.py): si
+  no alcanzan, la venta se rechaza; si otra caja vende los mismos productos, espera su turno
+- Guarda los totales de la venta (subtotal, descuento y total) al crearla
+
+Si cualquier línea falla, la venta y los movimientos de inventario se revierten.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from TechSolutionsApp.models import Product, Sale, SaleDetail, StockMovement, StockReservation
+from TechSolutionsApp.services import stock
+
+
+class CheckoutError(Exception):
+    '''
+    Error de validación durante el cobro, la venta no se registra
+    '''
+
+
+def parse_discount(value):
+    '''
+    Convierte el porcentaje de descuento a Decimal y valida que esté entre 0 y 100
+    '''
+    if value in (None, ''):
+        return Decimal('0')
+    try:
+        discount = Decimal(str(value))
+    except InvalidOperation:
+        raise CheckoutError("El descuento ingresado no es válido")
+    if not discount.is_finite() or discount < 0 or discount > 100:
+        raise CheckoutError("El descuento debe estar entre 0 y 100")
+    return discount
+
+
+def register_sale(customer, employee_id, discount, lines, cart_id=None):
+    '''
+    Registra la venta con sus detalles y descuenta el inventario.
+    Todo ocurre en una transacción: si alguna línea no es válida se lanza
+    CheckoutError y no queda ningún cambio aplicado. cart_id identifica el carrito
+    cuyas reservas se consumen con la venta
+    '''
+    if not lines:
+        raise CheckoutError("Debe agregar al menos un producto a la venta")
+
+    discount = parse_discount(discount)
+
+    def attempt():
+        products = Product.objects.filter(status=True).in_bulk(list(lines))
+        missing = [product_id for product_id in lines if product_id not in products]
+        if missing:
+            raise CheckoutError("Uno o más productos seleccionados no existen o están inactivos")
+
+        sale = Sale(
+            customer=customer,
+            user_id=employee_id,
+            discountPercentage=discount
+        )
+        sale.set_totals(sum(products[product_id].price * quantity for product_id, quantity in lines.items()))
+        sale.save()
+
+        SaleDetail.objects.bulk_create([
+            SaleDetail(
+                sale=sale,
+                product=products[product_id],
+                quantity=quantity,
+                unitPrice=products[product_id].price
+            )
+            for product_id, quantity in lines.items()
+        ])
+
+        stock.record_movements([
+            StockMovement(product_id=product_id, quantity=-quantity, kind=StockMovement.SALE,
+                          sale=sale, employee_id=employee_id)
+            for product_id, quantity in lines.items()
+        ], update_available=False)
+        # Las unidades que el carrito tenía reservadas ya están descontadas del disponible
+        reservations = StockReservation.objects.filter(cartId=cart_id) if cart_id else StockReservation.objects.none()
+        held = dict(reservations.select_for_update().values_list('product_id', 'quantity'))
+        reservations.delete()
+        # Última sentencia de la transacción: el bloqueo de las filas de inventario dura hasta el commit
+        try:
+            stock.take_stock({product_id: lines.get(product_id, 0) - held.get(product_id, 0)
+                              for product_id in {*lines, *held}})
+        except stock.InsufficientStock as e:
+            raise CheckoutError('. '.join(
+                f"No hay suficiente inventario para {products[product_id].name} "
+                f"(disponible: {remaining + held.get(product_id, 0)}, solicitado: {lines[product_id]})"
+                for product_id, remaining, _ in e.shortages
+            ))
+        return sale
+
+    try:
+        return stock.with_retries(attempt)
+    except stock.StockConflict:
+        raise CheckoutError("La base de datos está ocupada por ventas simultáneas, intente nuevamente")
@@ -0,0 +1,184 @@
+"""
+customers.py
+
+Búsqueda y resolución de clientes para las cajas.
+
+- search_customers: búsqueda por prefijo para el autocompletado (endpoint lookup_customer).
+  Según el texto se usa un solo índice:
+  - Solo dígitos: prefijo de la cédula, como rango sobre el índice único de idNumber
+    (las cédulas tienen 9 dígitos: "2045" busca entre 204500000 y 204599999).
+  - Con @: prefijo del correo (índice único de email).
+  - Otro texto: cada palabra debe ser prefijo del nombre o del apellido normalizados
+    (searchFirstName, searchLastName: minúscula y sin tildes).
+- filter_customers, after_cursor, sales_summary: directorio de clientes (view_customers),
+  paginado por cursor sobre el mismo índice y con el resumen de compras de cada página.
+- resolve_customer: obtiene el cliente del cobro por cédula y correo en una sola consulta,
+  y lo crea (o actualiza su correo) si corresponde.
+"""
+
+import json
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, Sum
+
+from TechSolutionsApp.models import Customer, Sale
+
+
+ID_NUMBER_LENGTH = 9
+
+# Cantidad de coincidencias que retorna el autocompletado y largo mínimo de la búsqueda
+LOOKUP_LIMIT = getattr(settings, 'CUSTOMER_LOOKUP_LIMIT', 10)
+LOOKUP_MIN_LENGTH = getattr(settings, 'CUSTOMER_LOOKUP_MIN_LENGTH', 2)
+
+LOOKUP_FIELDS = ('customerId', 'firstName', 'lastName', 'idNumber', 'email')
+
+# Orden de los resultados según el índice que usa la búsqueda (los campos identifican al cliente)
+NAME_ORDERING = ('searchLastName', 'searchFirstName', 'customerId')
+ID_NUMBER_ORDERING = ('idNumber',)
+EMAIL_ORDERING = ('email',)
+
+EMAIL_UPDATED = 'email_updated'
+CREATED = 'created'
+
+
+class CustomerError(Exception):
+    '''
+    Los datos del cliente no son válidos o pertenecen a otro cliente
+    '''
+
+
+def search_customers(query):
+    '''
+    Retorna un queryset de clientes (valores de LOOKUP_FIELDS) cuyo nombre, apellido, cédula o
+    correo empieza con la búsqueda, ordenado por el mismo índice. Vacío si la búsqueda es muy corta
+    '''
+    query = (query or '').strip()
+    customers = Customer.objects.values(*LOOKUP_FIELDS)
+    if len(query) < LOOKUP_MIN_LENGTH:
+        return customers.none()
+    customers, ordering = filter_customers(customers, query)
+    return customers.order_by(*ordering)
+
+
+def filter_customers(customers, query):
+    '''
+    Aplica la búsqueda por prefijo al queryset. Retorna (queryset, ordering), donde ordering son
+    los campos del índice usado, que identifican a cada cliente (para paginar por cursor)
+    '''
+    query = (query or '').strip()
+    if not query:
+        return customers, NAME_ORDERING
+
+    if query.isdigit():
+        if len(query) > ID_NUMBER_LENGTH:
+            return customers.none(), ID_NUMBER_ORDERING
+        scale = 10 ** (ID_NUMBER_LENGTH - len(query))
+        return (customers.filter(idNumber__gte=int(query) * scale, idNumber__lt=(int(query) + 1) * scale),
+                ID_NUMBER_ORDERING)
+
+    if '@' in query:
+        return customers.filter(email__istartswith=query.lower()), EMAIL_ORDERING
+
+    # Las columnas ya están en minúscula; istartswith se traduce a LIKE 'texto%' en MySQL, que
+    # usa el índice (startswith usaría LIKE BINARY)
+    tokens = re.findall(r'\w+', Customer.normalize_name(query))
+    if not tokens:
+        return customers.none(), NAME_ORDERING
+    condition = Q()
+    for token in tokens:
+        condition &= Q(searchFirstName__istartswith=token) | Q(searchLastName__istartswith=token)
+    return customers.filter(condition), NAME_ORDERING
+
+
+def after_cursor(customers, ordering, cursor):
+    '''
+    Filtra los clientes posteriores al cursor (valores de ordering del último cliente mostrado):
+    (a > x) OR (a = x AND b > y) OR ... Si el cursor no es válido para ese orden, retorna None
+    '''
+    values = decode_cursor(cursor, ordering)
+    if values is None:
+        return None
+    condition = Q()
+    for position, field in enumerate(ordering):
+        equal = {previous: values[index] for index, previous in enumerate(ordering[:position])}
+        condition |= Q(**equal, **{f'{field}__gt': values[position]})
+    return customers.filter(condition)
+
+
+def encode_cursor(customer, ordering):
+    raw = json.dumps([getattr(customer, field) for field in ordering])
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    if not cursor:
+        return None
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering) or None in values:
+        return None
+    return values
+
+
+def sales_summary(customer_ids):
+    '''
+    Cantidad de ventas, última compra y total comprado de los clientes indicados, en una sola
+    consulta agrupada (valores customer_id, sales, lastPurchase, spent). No cuenta las ventas anuladas
+    '''
+    return (Sale.objects.active().filter(customer_id__in=list(customer_ids))
+            .values('customer_id')
+            .annotate(sales=Count('saleId'), lastPurchase=Max('saleDate'), spent=Sum('total'))
+            .order_by())
+
+
+def resolve_customer(first_name, last_name, id_number, email=''):
+    '''
+    Retorna (cliente, acción) para los datos del formulario de venta. Busca por cédula y por
+    correo en una sola consulta; acción es CREATED si el cliente se creó, EMAIL_UPDATED si se
+    actualizó su correo, o None. Lanza CustomerError si los datos no son válidos
+    '''
+    first_name, last_name = (first_name or '').strip(), (last_name or '').strip()
+    id_number, email = (id_number or '').strip(), (email or '').strip().lower()
+
+    if not id_number.isdigit() or len(id_number) != ID_NUMBER_LENGTH:
+        raise CustomerError("La cédula debe contener solo números y tener 9 dígitos.")
+    if not first_name or not last_name:
+        raise CustomerError("Nombre, apellido e identificación son obligatorios")
+
+    condition = Q(idNumber=int(id_number))
+    if email:
+        condition |= Q(email=email)
+    matches = list(Customer.objects.filter(condition)[:2])
+    customer = next((match for match in matches if match.idNumber == int(id_number)), None)
+    email_owner = next((match for match in matches if email and match.email == email), None)
+
+    if customer is None:
+        if email_owner is not None:
+            raise CustomerError("El correo electrónico ya está registrado")
+        try:
+            with transaction.atomic():
+                customer = Customer.objects.create(firstName=first_name, lastName=last_name,
+                                                   idNumber=int(id_number), email=email or None)
+        except IntegrityError:
+            # Otra caja registró la misma cédula o correo entretanto
+            raise CustomerError("Error al registrar el cliente: La cédula ya existe")
+        return customer, CREATED
+
+    if first_name.lower() != customer.firstName.lower() or last_name.lower() != customer.lastName.lower():
+        raise CustomerError(
+            f"Error: La cédula {id_number} pertenece a {customer.firstName} {customer.lastName}. "
+            "Por favor ingrese los datos correctos o use otra cédula."
+        )
+
+    if email and email != customer.email:
+        if email_owner is not None:
+            raise CustomerError("El correo electrónico ya está registrado para otro cliente")
+        customer.email = email
+        customer.save(update_fields=['email'])
+        return customer, EMAIL_UPDATED
+    return customer, None
@@ -0,0 +1,126 @@
+"""
+rollups.py
+
+Mantiene las tablas de resumen diario de ventas (por producto, categoría y empleado)
+que usan los reportes, para no ejecutar GROUP BY sobre Sale/SaleDetail en horario de caja.
+
+La actualización es incremental: se buscan las ventas con modificationDate posterior a la
+marca de agua guardada en RollupState, se obtienen los días afectados y solo esos días
+se recalculan por completo (borrar e insertar), por lo que el proceso es idempotente.
+Cada actualización (incluida la reconstrucción completa) se confirma en una sola transacción.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from TechSolutionsApp.models import (
+    DailyCategorySales, DailyEmployeeSales, DailyProductSales, RollupState, Sale, SaleDetail
+)
+
+
+STATE_NAME = 'sales'
+
+# Margen para volver a procesar ventas cuya transacción terminó después de la última lectura
+SAFETY_MARGIN = timedelta(minutes=1)
+
+
+def refresh_rollups(full=False, since=None, stdout=None):
+    '''
+    Actualiza los resúmenes diarios. Con full=True se reconstruyen todos los días;
+    con since (date) se recalculan todos los días desde esa fecha además de los
+    días con cambios. Retorna la cantidad de días recalculados
+    '''
+    state, _ = RollupState.objects.get_or_create(name=STATE_NAME)
+
+    changed = Sale.objects.all()
+    if state.highWaterMark and not full:
+        changed = changed.filter(modificationDate__gt=state.highWaterMark - SAFETY_MARGIN)
+
+    new_mark = changed.aggregate(mark=Max('modificationDate'))['mark'] or state.highWaterMark
+    days = set(changed.annotate(day=TruncDate('saleDate')).values_list('day', flat=True).distinct())
+
+    if since and not full:
+        # Días con ventas o con filas de resumen (para limpiar ventas eliminadas)
+        days.update(Sale.objects.filter(saleDate__gte=_start_of(since))
+                    .annotate(day=TruncDate('saleDate')).values_list('day', flat=True).distinct())
+        days.update(DailyEmployeeSales.objects.filter(day__gte=since).values_list('day', flat=True).distinct())
+        days.update(DailyProductSales.objects.filter(day__gte=since).values_list('day', flat=True).distinct())
+
+    # Una sola transacción: mientras se reconstruye, los reportes siguen leyendo los resúmenes
+    # anteriores completos (nunca tablas vacías o a medio reconstruir)
+    with transaction.atomic():
+        if full:
+            DailyProductSales.objects.all().delete()
+            DailyCategorySales.objects.all().delete()
+            DailyEmployeeSales.objects.all().delete()
+
+        for day in sorted(days):
+            _rebuild_day(day)
+            if stdout:
+                stdout.write(f'Resumen del {day.isoformat()} actualizado')
+
+        state.highWaterMark = new_mark
+        state.save()
+    return len(days)
+
+
+def rebuild_days(days):
+    '''
+    Recalcula los días indicados que ya tienen resumen. Se usa al eliminar ventas, porque el
+    proceso incremental solo encuentra ventas existentes. Retorna la cantidad de días recalculados
+    '''
+    summarized = set(DailyEmployeeSales.objects.filter(day__in=list(days)).values_list('day', flat=True))
+    for day in sorted(summarized):
+        _rebuild_day(day)
+    return len(summarized)
+
+
+def rollup_coverage():
+    '''
+    Retorna el rango de días disponible en los resúmenes y la marca de agua actual
+    '''
+    bounds = DailyEmployeeSales.objects.aggregate(first=Min('day'), last=Max('day'))
+    state = RollupState.objects.filter(name=STATE_NAME).first()
+    return bounds['first'], bounds['last'], state.highWaterMark if state else None
+
+
+def _start_of(day):
+    '''
+    Inicio del día en la zona horaria actual, comparable con saleDate
+    '''
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _rebuild_day(day):
+    '''
+    Recalcula las filas de resumen de un día usando un rango de saleDate (aprovecha el índice)
+    '''
+    start = _start_of(day)
+    end = _start_of(day + timedelta(days=1))
+    # Las ventas anuladas no cuentan en los resúmenes
+    details = SaleDetail.objects.filter(sale__saleDate__gte=start, sale__saleDate__lt=end, sale__voidedAt__isnull=True)
+    sales = Sale.objects.active().filter(saleDate__gte=start, saleDate__lt=end)
+    line_revenue = Sum(F('quantity') * F('unitPrice'))
+
+    with transaction.atomic():
+        DailyProductSales.objects.filter(day=day).delete()
+        DailyCategorySales.objects.filter(day=day).delete()
+        DailyEmployeeSales.objects.filter(day=day).delete()
+
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(day=day, product_id=row['product_id'], quantity=row['units'], revenue=row['amount'])
+            for row in details.values('product_id').annotate(units=Sum('quantity'), amount=line_revenue)
+        ])
+        DailyCategorySales.objects.bulk_create([
+            DailyCategorySales(day=day, category_id=row['product__category_id'], quantity=row['units'],
+                               revenue=row['amount'])
+            for row in details.values('product__category_id').annotate(units=Sum('quantity'), amount=line_revenue)
+        ])
+        DailyEmployeeSales.objects.bulk_create([
+            DailyEmployeeSales(day=day, employee_id=row['user_id'], saleCount=row['sale_count'], revenue=row['amount'])
+            for row in sales.values('user_id').annotate(sale_count=Count('saleId'), amount=Sum('total'))
+        ])
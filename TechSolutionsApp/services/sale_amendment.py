@@ -0,0 +1,137 @@
+"""
+sale_amendment.py
+
+Servicio de modificación de ventas utilizado por la vista edit_sale.
+
+Aplica todos los cambios de una venta existente (cliente, descuento, cantidades, líneas nuevas
+y líneas eliminadas) dentro de una única transacción:
+- Bloquea la venta (select_for_update) y carga sus detalles con su producto en una consulta
+- Valida todas las líneas antes de escribir; si alguna falla no se aplica ningún cambio y se
+  reportan todos los errores juntos
+- Escribe los detalles con una actualización, una inserción y un borrado masivos, y registra la
+  diferencia de cada línea como movimiento de inventario (SALE_EDIT)
+- Recalcula los totales de la venta desde las líneas finales
+- Las diferencias de cantidad se descuentan o devuelven al disponible con un UPDATE
+  condicionado (ver stock.py) durante la validación; si no alcanzan se reportan con los demás
+  errores y la transacción se revierte
+"""
+
+from TechSolutionsApp.models import Customer, Product, Sale, SaleDetail, StockMovement
+from TechSolutionsApp.services import stock
+from TechSolutionsApp.services.bulk import delete_rows
+from TechSolutionsApp.services.checkout import CheckoutError, parse_discount
+
+
+class AmendmentError(Exception):
+    '''
+    La modificación no es válida, no se aplicó ningún cambio. errors: mensajes para el usuario
+    '''
+
+    def __init__(self, errors):
+        super().__init__('. '.join(errors))
+        self.errors = errors
+
+
+def amend_sale(sale_id, employee_id, lines, customer_id=None, discount=None):
+    '''
+    Modifica la venta. lines: {product_id: cantidad} con la nueva cantidad de cada línea
+    (texto o entero); cantidad cero elimina la línea y un producto que no está en la venta
+    agrega una línea con su precio actual. Las líneas no incluidas no cambian.
+    Retorna la venta actualizada o lanza AmendmentError
+    '''
+    if discount is not None:
+        try:
+            discount = parse_discount(discount)
+        except CheckoutError as e:
+            raise AmendmentError([str(e)])
+
+    def attempt():
+        sale = Sale.objects.select_for_update().get(pk=sale_id)
+        if sale.voidedAt is not None:
+            raise AmendmentError(["La venta está anulada, no se puede modificar"])
+        details = {
+            detail.product_id: detail
+            for detail in SaleDetail.objects.filter(sale=sale).select_related('product')
+        }
+        new_ids = [product_id for product_id in lines if product_id not in details]
+        products = Product.objects.filter(status=True).in_bulk(new_ids) if new_ids else {}
+        names = {**{product_id: detail.product.name for product_id, detail in details.items()},
+                 **{product_id: product.name for product_id, product in products.items()}}
+
+        errors = []
+        quantities = {}
+        for product_id, value in lines.items():
+            if product_id not in names:
+                errors.append("Uno o más productos seleccionados no existen o están inactivos")
+                continue
+            try:
+                quantity = int(value)
+            except (TypeError, ValueError):
+                errors.append(f'Cantidad inválida para {names[product_id]}')
+                continue
+            if quantity < 0 or (quantity == 0 and product_id not in details):
+                errors.append(f'La cantidad de {names[product_id]} debe ser mayor a cero.')
+                continue
+            quantities[product_id] = quantity
+
+        final = {product_id: detail.quantity for product_id, detail in details.items()}
+        final.update(quantities)
+        if not any(final.values()):
+            errors.append("La venta debe tener al menos un producto")
+
+        if customer_id is not None and str(customer_id) != str(sale.customer_id):
+            if not str(customer_id).isdigit() or not Customer.objects.filter(pk=customer_id).exists():
+                errors.append("El cliente seleccionado no existe")
+
+        # Unidades que toma (o devuelve, si es negativo) cada línea válida
+        deltas = {
+            product_id: quantity - (details[product_id].quantity if product_id in details else 0)
+            for product_id, quantity in quantities.items()
+        }
+        try:
+            stock.take_stock(deltas)
+        except stock.InsufficientStock as e:
+            for product_id, remaining, extra in e.shortages:
+                current = details[product_id].quantity if product_id in details else 0
+                errors.append(f'No hay suficiente inventario para {names[product_id]}. '
+                              f'Disponible: {remaining + current}, solicitado: {extra + current}')
+        if errors:
+            raise AmendmentError(list(dict.fromkeys(errors)))
+
+        changed, created, removed, movements = [], [], [], []
+        for product_id, quantity in quantities.items():
+            detail = details.get(product_id)
+            previous = detail.quantity if detail else 0
+            if quantity == previous:
+                continue
+            if detail is None:
+                created.append(SaleDetail(sale=sale, product=products[product_id], quantity=quantity,
+                                          unitPrice=products[product_id].price))
+            elif quantity == 0:
+                removed.append(detail.pk)
+            else:
+                detail.quantity = quantity
+                changed.append(detail)
+            # La diferencia se registra como movimiento de inventario (devolución o salida)
+            movements.append(StockMovement(product_id=product_id, quantity=previous - quantity,
+                                           kind=StockMovement.SALE_EDIT, sale=sale, employee_id=employee_id))
+
+        SaleDetail.objects.bulk_update(changed, ['quantity'])
+        SaleDetail.objects.bulk_create(created)
+        # Sin señales por detalle (recalcularían los totales por línea): se calculan abajo
+        delete_rows(SaleDetail, removed)
+        stock.record_movements(movements, update_available=False)
+
+        if customer_id is not None:
+            sale.customer_id = int(customer_id)
+        if discount is not None:
+            sale.discountPercentage = discount
+        remaining_lines = [detail for detail in details.values() if detail.pk not in removed] + created
+        sale.set_totals(sum(detail.unitPrice * detail.quantity for detail in remaining_lines))
+        sale.save()
+        return sale
+
+    try:
+        return stock.with_retries(attempt)
+    except stock.StockConflict:
+        raise AmendmentError(["La base de datos está ocupada por ventas simultáneas, intente nuevamente"])
@@ -0,0 +1,402 @@
+"""
+sale_ingestion.py
+
+Registro por lotes de las ventas hechas por las cajas sin conexión (endpoint ingest_sales y
+comando ingest_sales).
+
+Cada venta trae una clave generada por la caja (key). Si la clave ya está registrada la venta
+se cuenta como duplicada y se ignora, por lo que un lote puede reenviarse completo después de
+un corte sin duplicar ventas. Las ventas se procesan en lotes, cada uno en su transacción:
+- Las claves ya registradas, los productos (por SKU o id) y los clientes (por cédula) se
+  consultan de una vez por lote; los clientes que no existen se crean con una inserción masiva.
+- Ventas, detalles y movimientos de inventario se insertan con bulk_create.
+- Las ventas ya ocurrieron, por lo que no se rechazan por falta de stock: el inventario se
+  descuenta igual (también del disponible, sin condición) y los productos que quedan en
+  negativo se reportan.
+
+Formato de cada venta (objeto JSON; el archivo puede ser un arreglo, {"sales": [...]} o JSONL):
+    {"key": "caja3-000123", "sold_at": "2025-01-31T10:15:00-06:00", "discount": 10,
+     "customer": {"id_number": "123456789", "first_name": "Ana", "last_name": "Mora", "email": ""},
+     "lines": [{"sku": "7501234", "quantity": 2}, {"product_id": 15, "quantity": 1, "unit_price": "1500.00"}]}
+sold_at, discount, email y unit_price son opcionales (por defecto: ahora, 0, sin correo y el
+precio actual del producto).
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from TechSolutionsApp.models import Customer, Product, Sale, SaleDetail, StockMovement
+from TechSolutionsApp.services import stock
+from TechSolutionsApp.services.checkout import CheckoutError, parse_discount
+from TechSolutionsApp.services.customers import ID_NUMBER_LENGTH
+
+
+FORMATS = ('json', 'jsonl')
+BATCH_SIZE = 1000
+
+# Cantidad máxima de ventas y de bytes por petición al endpoint (el comando no tiene límite)
+MAX_RECORDS = getattr(settings, 'SALE_BATCH_MAX_RECORDS', 10000)
+MAX_BYTES = getattr(settings, 'SALE_BATCH_MAX_BYTES', 20 * 1024 * 1024)
+
+# Cantidad máxima de ventas con error que se guardan para mostrarlas (el total se cuenta siempre)
+MAX_REPORTED_ERRORS = 100
+
+KEY_MAX_LENGTH = Sale._meta.get_field('idempotencyKey').max_length
+
+
+class SaleIngestionError(Exception):
+    '''
+    Error que impide procesar el lote completo (formato no soportado, JSON ilegible)
+    '''
+
+
+class IngestResult:
+    '''
+    Resumen de un lote: ventas leídas, registradas, duplicadas y con error
+    '''
+
+    def __init__(self):
+        self.records = 0
+        self.created = 0
+        self.duplicates = 0
+        self.customers_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.negative_stock = set()
+
+    def add_error(self, position, key, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((position, key, message))
+
+    def as_dict(self):
+        return {
+            'records': self.records,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'customersCreated': self.customers_created,
+            'errorCount': self.error_count,
+            'errors': [{'position': position, 'key': key, 'error': message}
+                       for position, key, message in self.errors],
+            'negativeStock': sorted(self.negative_stock),
+        }
+
+    def __str__(self):
+        return (f'{self.records} ventas leídas, {self.created} registradas, '
+                f'{self.duplicates} duplicadas, {self.error_count} con error, '
+                f'{self.customers_created} clientes nuevos')
+
+
+def detect_format(filename):
+    '''
+    Determina el formato a partir de la extensión del archivo
+    '''
+    name = filename.lower()
+    if name.endswith('.json'):
+        return 'json'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise SaleIngestionError('Formato no soportado, use un archivo .json o .jsonl')
+
+
+def iter_records(stream, file_format):
+    '''
+    Recorre las ventas de un texto, archivo o petición (texto o bytes) y retorna (posición,
+    venta); JSONL se lee línea por línea. La posición es el número de línea en JSONL y el índice
+    en el arreglo (desde 1) en JSON. Las ventas que no son un objeto JSON se retornan como
+    ValueError para reportarlas como error de esa venta
+    '''
+    if file_format == 'json':
+        try:
+            data = json.loads(stream if isinstance(stream, (str, bytes)) else stream.read())
+        except ValueError:
+            raise SaleIngestionError('JSON inválido')
+        if isinstance(data, dict):
+            data = data.get('sales')
+        if not isinstance(data, list):
+            raise SaleIngestionError('Se esperaba un arreglo de ventas o un objeto con la clave "sales"')
+        for position, record in enumerate(data, start=1):
+            yield position, record if isinstance(record, dict) else ValueError('Cada venta debe ser un objeto JSON')
+    elif file_format == 'jsonl':
+        lines = stream.splitlines() if isinstance(stream, (str, bytes)) else stream
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_number, ValueError('JSON inválido')
+                continue
+            yield line_number, record if isinstance(record, dict) else ValueError('Cada línea debe ser un objeto JSON')
+    else:
+        raise SaleIngestionError('Formato no soportado, use json o jsonl')
+
+
+def ingest_sales(records, employee_id, batch_size=BATCH_SIZE, stdout=None):
+    '''
+    Registra las ventas (posición, venta) a nombre del empleado. Cada lote se guarda en su
+    propia transacción. Retorna un IngestResult
+    '''
+    result = IngestResult()
+    seen = set()
+    batch = []
+
+    for position, record in records:
+        result.records += 1
+        key = record.get('key') if isinstance(record, dict) else None
+        if isinstance(record, Exception):
+            result.add_error(position, None, str(record))
+            continue
+        try:
+            cleaned = _clean_record(record)
+        except ValueError as e:
+            result.add_error(position, key if isinstance(key, str) else None, str(e))
+            continue
+
+        # La misma clave repetida en el envío también es un reenvío
+        if cleaned['key'] in seen:
+            result.duplicates += 1
+            continue
+        seen.add(cleaned['key'])
+
+        batch.append((position, cleaned))
+        if len(batch) >= batch_size:
+            _ingest_batch(batch, employee_id, result)
+            batch = []
+            if stdout:
+                stdout.write(f'{result.records} ventas procesadas')
+
+    if batch:
+        _ingest_batch(batch, employee_id, result)
+    return result
+
+
+def _clean_record(record):
+    '''
+    Valida y convierte una venta. Lanza ValueError si es inválida
+    '''
+    key = record.get('key')
+    if not isinstance(key, str) or not key.strip():
+        raise ValueError('La clave de la venta (key) es obligatoria')
+    key = key.strip()
+    if len(key) > KEY_MAX_LENGTH:
+        raise ValueError(f'La clave de la venta no puede tener más de {KEY_MAX_LENGTH} caracteres')
+
+    sold_at = record.get('sold_at')
+    if sold_at not in (None, ''):
+        try:
+            sold_at = datetime.fromisoformat(str(sold_at))
+        except ValueError:
+            raise ValueError(f'La fecha "{sold_at}" no es válida')
+        if timezone.is_naive(sold_at):
+            sold_at = timezone.make_aware(sold_at)
+    else:
+        sold_at = None
+
+    try:
+        discount = parse_discount(record.get('discount'))
+    except CheckoutError as e:
+        raise ValueError(str(e))
+
+    customer = record.get('customer')
+    if not isinstance(customer, dict):
+        raise ValueError('Los datos del cliente (customer) son obligatorios')
+    id_number = str(customer.get('id_number') or '').strip()
+    if not id_number.isdigit() or len(id_number) != ID_NUMBER_LENGTH:
+        raise ValueError("La cédula debe contener solo números y tener 9 dígitos.")
+    customer = {
+        'id_number': int(id_number),
+        'first_name': str(customer.get('first_name') or '').strip(),
+        'last_name': str(customer.get('last_name') or '').strip(),
+        'email': str(customer.get('email') or '').strip().lower() or None,
+    }
+
+    lines = record.get('lines')
+    if not isinstance(lines, list) or not lines:
+        raise ValueError("Debe agregar al menos un producto a la venta")
+    cleaned_lines = []
+    for line in lines:
+        if not isinstance(line, dict):
+            raise ValueError('Cada línea debe ser un objeto JSON')
+        if line.get('sku') not in (None, ''):
+            product = ('sku', str(line['sku']).strip())
+        else:
+            try:
+                product = ('id', int(line.get('product_id')))
+            except (TypeError, ValueError):
+                raise ValueError('Cada línea debe indicar sku o product_id')
+        try:
+            quantity = int(line.get('quantity', 1))
+        except (TypeError, ValueError):
+            raise ValueError(f'Cantidad inválida para el producto {product[1]}')
+        if quantity <= 0:
+            raise ValueError(f'La cantidad del producto {product[1]} debe ser mayor a cero.')
+        unit_price = line.get('unit_price')
+        if unit_price not in (None, ''):
+            try:
+                unit_price = Decimal(str(unit_price)).quantize(Decimal('0.01'))
+                if not unit_price.is_finite() or unit_price < 0:
+                    raise InvalidOperation()
+            except InvalidOperation:
+                raise ValueError(f'El precio "{line.get("unit_price")}" no es válido')
+        else:
+            unit_price = None
+        cleaned_lines.append((product, quantity, unit_price))
+
+    return {'key': key, 'sold_at': sold_at, 'discount': discount, 'customer': customer, 'lines': cleaned_lines}
+
+
+def _ingest_batch(batch, employee_id, result):
+    '''
+    Registra un lote. Si otra caja registró entretanto alguna de las mismas claves (o clientes),
+    la transacción falla por la restricción única y el lote se procesa de nuevo, ya con esas
+    ventas como duplicadas
+    '''
+    for attempt in range(2):
+        batch_result = IngestResult()
+        try:
+            with transaction.atomic():
+                _write_batch(batch, employee_id, batch_result)
+            break
+        except IntegrityError:
+            if attempt:
+                raise
+
+    result.created += batch_result.created
+    result.duplicates += batch_result.duplicates
+    result.customers_created += batch_result.customers_created
+    result.negative_stock |= batch_result.negative_stock
+    for error in batch_result.errors:
+        result.add_error(*error)
+
+
+def _write_batch(batch, employee_id, result):
+    keys = [record['key'] for _, record in batch]
+    registered = set(Sale.objects.filter(idempotencyKey__in=keys).values_list('idempotencyKey', flat=True))
+    result.duplicates += len(registered)
+    batch = [(position, record) for position, record in batch if record['key'] not in registered]
+    if not batch:
+        return
+
+    # Productos del lote en una consulta (si un SKU se repite se usa el producto más antiguo)
+    skus = {value for _, record in batch for (kind, value), _, _ in record['lines'] if kind == 'sku'}
+    ids = {value for _, record in batch for (kind, value), _, _ in record['lines'] if kind == 'id'}
+    products = {}
+    for product_id, sku, price in (Product.objects.filter(Q(sku__in=skus) | Q(pk__in=ids))
+                                   .order_by('-productId').values_list('productId', 'sku', 'price')):
+        products[('id', product_id)] = (product_id, sku, price)
+        if sku:
+            products[('sku', sku)] = (product_id, sku, price)
+
+    valid = []
+    for position, record in batch:
+        missing = [product[1] for product, _, _ in record['lines'] if product not in products]
+        if missing:
+            result.add_error(position, record['key'], f'El producto {missing[0]} no existe')
+            continue
+        # Las líneas del mismo producto se agrupan (una línea por producto y venta)
+        lines = {}
+        for product, quantity, unit_price in record['lines']:
+            product_id, _, price = products[product]
+            if product_id in lines:
+                quantity += lines[product_id][0]
+                price = lines[product_id][1]
+            lines[product_id] = (quantity, unit_price if unit_price is not None else price)
+        valid.append((position, record, lines))
+
+    customers = _resolve_customers(valid, result)
+
+    sales = []
+    for position, record, lines in valid:
+        customer_id = customers.get(record['customer']['id_number'])
+        if customer_id is None:
+            # Cliente nuevo sin nombre y apellido en ninguna venta del lote: se reporta cada venta
+            result.add_error(position, record['key'], "Nombre, apellido e identificación son obligatorios")
+            continue
+        sale = Sale(customer_id=customer_id, user_id=employee_id, discountPercentage=record['discount'],
+                    idempotencyKey=record['key'])
+        sale.set_totals(sum(unit_price * quantity for quantity, unit_price in lines.values()))
+        sales.append((record, lines, sale))
+    if not sales:
+        return
+
+    Sale.objects.bulk_create([sale for _, _, sale in sales])
+    # Algunos motores (MySQL) no retornan los ids generados por bulk_create
+    if any(sale.pk is None for _, _, sale in sales):
+        ids = dict(Sale.objects.filter(idempotencyKey__in=[sale.idempotencyKey for _, _, sale in sales])
+                   .values_list('idempotencyKey', 'saleId'))
+        for _, _, sale in sales:
+            sale.pk = ids[sale.idempotencyKey]
+
+    # bulk_create asigna la fecha actual (auto_now_add); se guarda la fecha de la venta en la caja
+    dated = []
+    for record, _, sale in sales:
+        if record['sold_at'] is not None:
+            sale.saleDate = record['sold_at']
+            dated.append(sale)
+    Sale.objects.bulk_update(dated, ['saleDate'])
+
+    SaleDetail.objects.bulk_create([
+        SaleDetail(sale_id=sale.pk, product_id=product_id, quantity=quantity, unitPrice=unit_price)
+        for _, lines, sale in sales
+        for product_id, (quantity, unit_price) in lines.items()
+    ])
+    stock.record_movements(
+        StockMovement(product_id=product_id, quantity=-quantity, kind=StockMovement.SALE,
+                      sale_id=sale.pk, employee_id=employee_id)
+        for _, lines, sale in sales
+        for product_id, (quantity, _) in lines.items()
+    )
+    product_ids = {product_id for _, lines, _ in sales for product_id in lines}
+
+    product_skus = {product_id: sku for product_id, sku, _ in products.values()}
+    result.negative_stock.update(product_skus[product_id] or str(product_id)
+                                 for product_id, level in stock.stock_levels(product_ids).items() if level < 0)
+    result.created += len(sales)
+
+
+def _resolve_customers(valid, result):
+    '''
+    Retorna {cédula: customerId} de los clientes del lote, creando los que no existen con los
+    datos de la primera venta del lote que trae nombre y apellido (las cédulas nuevas sin nombre
+    en ninguna venta no se incluyen). Si la cédula ya está registrada se usa ese cliente.
+    El correo de un cliente nuevo se omite si ya pertenece a otro cliente
+    '''
+    id_numbers = {record['customer']['id_number'] for _, record, _ in valid}
+    customers = dict(Customer.objects.filter(idNumber__in=list(id_numbers)).values_list('idNumber', 'customerId'))
+
+    new = {}
+    for _, record, _ in valid:
+        customer = record['customer']
+        if customer['id_number'] in customers or customer['id_number'] in new:
+            continue
+        if customer['first_name'] and customer['last_name']:
+            new[customer['id_number']] = customer
+    if not new:
+        return customers
+
+    emails = {customer['email'] for customer in new.values() if customer['email']}
+    taken = set(Customer.objects.filter(email__in=emails).values_list('email', flat=True))
+    to_create = []
+    for id_number, customer in new.items():
+        email = customer['email']
+        if email in taken:
+            email = None
+        elif email:
+            taken.add(email)
+        created = Customer(firstName=customer['first_name'], lastName=customer['last_name'],
+                           idNumber=id_number, email=email)
+        created.set_search_names()
+        to_create.append(created)
+    Customer.objects.bulk_create(to_create)
+
+    customers.update(Customer.objects.filter(idNumber__in=list(new)).values_list('idNumber', 'customerId'))
+    result.customers_created += len(to_create)
+    return customers
@@ -0,0 +1,129 @@
+"""
+sale_reversal.py
+
+Anulación de ventas y devoluciones parciales, con restauración del inventario.
+
+- void_sales: anula un conjunto de ventas (una venta, las seleccionadas en el panel o todas las
+  de un turno de caja). En una transacción bloquea las ventas aún no anuladas, lee todas sus
+  líneas en una consulta, devuelve las unidades al inventario con un movimiento VOID por venta
+  y producto ligado a la venta (una sola inserción masiva) y marca las ventas como anuladas
+  (voidedAt, voidedBy) con una sola actualización. Las ventas y sus detalles se conservan como
+  registro; los reportes, resúmenes y exportaciones solo cuentan las ventas activas.
+  Los días anulados se recalculan en los resúmenes diarios (rollups.rebuild_days).
+- return_items: devolución parcial de una venta. Valida todas las líneas antes de escribir,
+  reduce las cantidades con una actualización masiva (elimina las líneas devueltas por
+  completo), registra un movimiento RETURN por producto y recalcula los totales de la venta.
+  Si se devuelve todo, la venta se anula.
+
+Devolver unidades no compite con otras cajas (solo aumenta el stock), por lo que el
+disponible se incrementa sin condición (ver stock.py).
+"""
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from TechSolutionsApp.models import Sale, SaleDetail, StockMovement
+from TechSolutionsApp.services import rollups, stock
+from TechSolutionsApp.services.bulk import delete_rows
+
+
+class ReversalError(Exception):
+    '''
+    La devolución no es válida, no se aplicó ningún cambio. errors: mensajes para el usuario
+    '''
+
+    def __init__(self, errors):
+        super().__init__('. '.join(errors))
+        self.errors = errors
+
+
+def void_sales(sales, employee_id=None):
+    '''
+    Anula las ventas indicadas (queryset de Sale o lista de ids) y restaura su inventario.
+    Las ventas ya anuladas se ignoran. Retorna (ventas anuladas, unidades devueltas al inventario)
+    '''
+    if not isinstance(sales, QuerySet):
+        sales = Sale.objects.filter(pk__in=list(sales))
+
+    with transaction.atomic():
+        # Bloquea las ventas: una edición o anulación simultánea espera y luego las ve anuladas
+        dates = dict(sales.active().select_for_update().order_by().values_list('saleId', 'saleDate'))
+        if not dates:
+            return 0, 0
+        sale_ids = list(dates)
+        lines = list(SaleDetail.objects.filter(sale_id__in=sale_ids).values_list('sale_id', 'product_id', 'quantity'))
+
+        stock.record_movements(
+            StockMovement(product_id=product_id, quantity=quantity, kind=StockMovement.VOID,
+                          sale_id=sale_id, employee_id=employee_id)
+            for sale_id, product_id, quantity in lines
+        )
+        now = timezone.now()
+        Sale.objects.filter(pk__in=sale_ids).update(voidedAt=now, voidedBy_id=employee_id, modificationDate=now)
+
+        rollups.rebuild_days({timezone.localdate(sale_date) for sale_date in dates.values()})
+    return len(sale_ids), sum(quantity for _, _, quantity in lines)
+
+
+def return_items(sale_id, employee_id, lines):
+    '''
+    Devuelve unidades de una venta. lines: {product_id: unidades devueltas} (texto o entero).
+    Retorna la venta actualizada, o None si se devolvió todo y la venta se anuló.
+    Lanza ReversalError si alguna línea no es válida
+    '''
+    with transaction.atomic():
+        sale = Sale.objects.select_for_update().get(pk=sale_id)
+        if sale.voidedAt is not None:
+            raise ReversalError(["La venta está anulada"])
+        details = {
+            detail.product_id: detail
+            for detail in SaleDetail.objects.filter(sale=sale).select_related('product')
+        }
+
+        errors = []
+        returned = {}
+        for product_id, value in lines.items():
+            detail = details.get(product_id)
+            if detail is None:
+                errors.append("Uno o más productos no pertenecen a la venta")
+                continue
+            try:
+                quantity = int(value)
+            except (TypeError, ValueError):
+                errors.append(f'Cantidad inválida para {detail.product.name}')
+                continue
+            if quantity < 0 or quantity > detail.quantity:
+                errors.append(f'Solo se pueden devolver entre 0 y {detail.quantity} unidades de {detail.product.name}')
+                continue
+            if quantity:
+                returned[product_id] = quantity
+        if not errors and not returned:
+            errors.append("Indique al menos una unidad a devolver")
+        if errors:
+            raise ReversalError(list(dict.fromkeys(errors)))
+
+        if all(returned.get(product_id) == detail.quantity for product_id, detail in details.items()):
+            void_sales([sale.pk], employee_id)
+            return None
+
+        changed, removed = [], []
+        for product_id, quantity in returned.items():
+            detail = details[product_id]
+            detail.quantity -= quantity
+            if detail.quantity:
+                changed.append(detail)
+            else:
+                removed.append(detail.pk)
+        SaleDetail.objects.bulk_update(changed, ['quantity'])
+        delete_rows(SaleDetail, removed)
+        stock.record_movements(
+            StockMovement(product_id=product_id, quantity=quantity, kind=StockMovement.RETURN,
+                          sale=sale, employee_id=employee_id)
+            for product_id, quantity in returned.items()
+        )
+
+        sale.set_totals(sum(detail.unitPrice * detail.quantity
+                            for detail in details.values() if detail.pk not in removed))
+        sale.save()
+        return sale
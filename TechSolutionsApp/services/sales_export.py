@@ -0,0 +1,143 @@
+"""
+sales_export.py
+
+Exportación de ventas en CSV o JSONL para contabilidad, generada por partes (streaming).
+
+Las filas se leen por lotes ordenados por llave primaria (paginación por llave), por lo que
+cada consulta es acotada, la memoria usada no depende de la cantidad de ventas y el
+primer bloque se puede enviar antes de terminar de leer la tabla. Se usa paginación por
+llave en lugar de solo .iterator() porque el cliente de MySQL carga el resultado completo
+de la consulta en memoria.
+
+Tipos de exportación:
+- details: una fila por línea de venta (SaleDetail) con los datos de la venta, cliente y empleado.
+- sales: una fila por venta con sus totales persistidos.
+
+Las ventas anuladas no se exportan.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from TechSolutionsApp.models import Sale, SaleDetail
+
+
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 2000
+
+_SALE_COLUMNS = [
+    ('sale_id', 'saleId'),
+    ('sale_date', 'saleDate'),
+    ('customer_id', 'customer_id'),
+    ('customer_first_name', 'customer__firstName'),
+    ('customer_last_name', 'customer__lastName'),
+    ('customer_id_number', 'customer__idNumber'),
+    ('customer_email', 'customer__email'),
+    ('employee_id', 'user_id'),
+    ('employee_first_name', 'user__firstName'),
+    ('employee_last_name', 'user__lastName'),
+    ('discount_percentage', 'discountPercentage'),
+    ('subtotal', 'subtotal'),
+    ('discount_amount', 'discountAmount'),
+    ('total', 'total'),
+]
+
+# Modelo, prefijo de los campos de la venta y columnas (encabezado, campo) de cada tipo de
+# exportación. La primera columna siempre es la llave primaria, se usa para paginar
+KINDS = {
+    'sales': (Sale, '', _SALE_COLUMNS),
+    'details': (SaleDetail, 'sale__', [
+        ('sale_detail_id', 'saleDetailId'),
+        *[(header, f'sale__{field}') for header, field in _SALE_COLUMNS],
+        ('product_id', 'product_id'),
+        ('product_sku', 'product__sku'),
+        ('product_name', 'product__name'),
+        ('quantity', 'quantity'),
+        ('unit_price', 'unitPrice'),
+    ]),
+}
+
+
+def export_sales(kind='details', file_format='csv', date_from=None, date_to=None, chunk_size=CHUNK_SIZE):
+    '''
+    Generador de bloques de texto con la exportación. date_from y date_to son fechas
+    (inclusivas) sobre la fecha de la venta
+    '''
+    model, sale_prefix, columns = KINDS[kind]
+    date_field = f'{sale_prefix}saleDate'
+    headers = [header for header, _ in columns]
+    fields = [field for _, field in columns]
+
+    queryset = model.objects.filter(**{f'{sale_prefix}voidedAt__isnull': True})
+    if date_from:
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if date_to:
+        # Fecha final inclusiva: se compara contra el inicio del día siguiente
+        end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+        queryset = queryset.filter(**{f'{date_field}__lt': end})
+
+    if file_format == 'csv':
+        # El encabezado se envía antes de la primera consulta
+        yield _csv_chunk([headers])
+
+    pk_name = model._meta.pk.name
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(**{f'{pk_name}__gt': last_pk})
+                    .order_by(pk_name)
+                    .values_list(*fields)[:chunk_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        rows = [[_format_value(value) for value in row] for row in rows]
+        if file_format == 'csv':
+            yield _csv_chunk(rows)
+        else:
+            yield ''.join(json.dumps(dict(zip(headers, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def gzip_chunks(chunks, level=6):
+    '''
+    Comprime en formato gzip un generador de bloques de texto, enviando cada bloque
+    comprimido en cuanto está listo (sin esperar a tener el archivo completo)
+    '''
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(kind, file_format, date_from=None, date_to=None, compressed=False):
+    '''
+    Nombre sugerido del archivo, por ejemplo ventas_details_2025-01-01_2025-01-31.csv.gz
+    '''
+    parts = ['ventas', kind]
+    if date_from or date_to:
+        parts.append(date_from.isoformat() if date_from else 'inicio')
+        parts.append(date_to.isoformat() if date_to else 'hoy')
+    return '_'.join(parts) + f'.{file_format}' + ('.gz' if compressed else '')
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _format_value(value):
+    '''
+    Convierte los valores a texto/JSON: fechas en hora local ISO 8601, decimales como texto
+    '''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if value is None or isinstance(value, (int, str)):
+        return value
+    return str(value)
@@ -0,0 +1,107 @@
+"""
+sku_lookup.py
+
+Búsqueda exacta de productos por SKU para los lectores de código de barras de las cajas.
+
+Los resultados (incluidos los SKU inexistentes) se guardan en una caché LRU en memoria
+con TTL. La caché se invalida desde las señales de Product e Inventory y desde los
+servicios que modifican el stock con actualizaciones masivas (que no disparan señales).
+Como cada proceso tiene su propia caché, el TTL limita el tiempo que otro proceso puede
+mostrar un stock desactualizado; el cobro siempre valida el stock contra la base de datos.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from TechSolutionsApp.cache import LRUCache
+from TechSolutionsApp.models import Product
+
+
+_cache = LRUCache(
+    max_size=getattr(settings, 'SKU_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'SKU_CACHE_TTL', 30)
+)
+
+# Índice inverso productId -> SKU para invalidar por producto
+_sku_by_product = {}
+_index_lock = threading.Lock()
+
+
+def lookup_sku(sku):
+    '''
+    Retorna un diccionario con productId, nombre, SKU, precio y stock del producto
+    activo con ese SKU, o None si no existe
+    '''
+    sku = (sku or '').strip()
+    if not sku:
+        return None
+
+    cached = _cache.get(sku)
+    if cached is not LRUCache.MISSING:
+        return cached
+
+    return _cache_product(sku, _product_by_sku(sku).first())
+
+
+async def alookup_sku(sku):
+    '''
+    Versión asíncrona de lookup_sku (para la vista async del lector de códigos)
+    '''
+    sku = (sku or '').strip()
+    if not sku:
+        return None
+
+    cached = _cache.get(sku)
+    if cached is not LRUCache.MISSING:
+        return cached
+
+    return _cache_product(sku, await _product_by_sku(sku).afirst())
+
+
+def invalidate_products(product_ids):
+    '''
+    Elimina de la caché las entradas de los productos indicados
+    '''
+    with _index_lock:
+        skus = [_sku_by_product.pop(product_id, None) for product_id in product_ids]
+    for sku in skus:
+        if sku is not None:
+            _cache.delete(sku)
+
+
+def invalidate_products_on_commit(product_ids):
+    '''
+    Invalida al confirmar la transacción actual, para no volver a guardar datos previos al cambio
+    '''
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: invalidate_products(product_ids))
+
+
+def invalidate_sku(sku):
+    '''
+    Elimina un SKU de la caché (por ejemplo un SKU que antes no existía)
+    '''
+    _cache.delete(str(sku).strip())
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def _product_by_sku(sku):
+    return (Product.objects.filter(sku=sku, status=True)
+            .with_stock()
+            .order_by('productId')
+            .values('productId', 'name', 'sku', 'price', 'stock'))
+
+
+def _cache_product(sku, product):
+    if product:
+        product['price'] = str(product['price'])
+        with _index_lock:
+            _sku_by_product[product['productId']] = sku
+
+    _cache.set(sku, product)
+    return product
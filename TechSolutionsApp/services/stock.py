@@ -0,0 +1,361 @@
+"""
+stock.py
+
+Movimientos de inventario y compactación de las fotos de stock.
+
+Todos los cambios de stock (ventas, ediciones de ventas, ajustes manuales, reabastecimientos
+e importaciones) se registran como filas nuevas de StockMovement con inserciones masivas, sin
+actualizar una fila compartida por producto. El stock actual de un producto es la foto
+guardada en Inventory más la suma de sus movimientos posteriores (Product.objects.with_stock).
+
+compact_movements incorpora periódicamente los movimientos a las fotos para que la suma de
+movimientos recientes se mantenga corta. Los movimientos no se eliminan: son el historial.
+
+Concurrencia (cobros y reservas de carritos):
+- Inventory.available es el contador de unidades que aún se pueden vender o apartar: el stock
+  actual menos las unidades reservadas por carritos (StockReservation, vencen a los
+  CART_RESERVATION_TIMEOUT segundos) que todavía no se liberan.
+- Vender o reservar descuenta el contador con un UPDATE condicionado
+  (`SET available = available - n WHERE available >= n`, take_stock): la base de datos
+  valida y descuenta en la misma sentencia, sin leer antes el stock. Las cajas que venden el
+  mismo producto esperan el bloqueo de la fila en lugar de revertir y reintentar; si no hay
+  unidades suficientes se liberan las reservas vencidas de esos productos y se intenta una
+  vez más antes de rechazar la venta.
+- Los movimientos que no validan stock (reabastecimientos, ajustes, anulaciones, ventas
+  recibidas por lotes) ajustan el contador en record_movements.
+- with_retries reintenta la transacción (hasta STOCK_MAX_RETRIES veces) solo ante errores
+  transitorios de bloqueo de la base de datos (deadlock, tiempo de espera agotado, base de
+  datos SQLite ocupada).
+"""
+
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Max, Min, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from TechSolutionsApp.models import Inventory, Product, StockMovement, StockReservation
+from TechSolutionsApp.services import sku_lookup
+
+
+# Solo se compactan los movimientos con esta antigüedad, para no saltar movimientos de
+# transacciones que aún no terminan (sus ids son menores pero se confirman después)
+COMPACTION_DELAY = timedelta(seconds=getattr(settings, 'STOCK_COMPACTION_DELAY', 300))
+
+# Tiempo que un carrito en curso conserva sus unidades apartadas
+RESERVATION_TIMEOUT = timedelta(seconds=getattr(settings, 'CART_RESERVATION_TIMEOUT', 900))
+
+MAX_RETRIES = getattr(settings, 'STOCK_MAX_RETRIES', 5)
+
+
+class StockConflict(Exception):
+    '''
+    La base de datos rechazó la transacción por un bloqueo (deadlock, tiempo de espera agotado
+    o SQLite ocupada); se reintenta
+    '''
+
+
+class InsufficientStock(Exception):
+    '''
+    Una o más líneas superan el stock disponible. shortages: [(product_id, disponible, solicitado)]
+    '''
+
+    def __init__(self, shortages):
+        super().__init__('Stock insuficiente')
+        self.shortages = shortages
+
+
+# Códigos de error de MySQL: tiempo de espera de bloqueo agotado y deadlock
+LOCK_ERROR_CODES = (1205, 1213)
+
+
+def is_lock_error(error):
+    '''
+    Indica si un OperationalError es un conflicto de bloqueo transitorio que vale la pena reintentar
+    '''
+    return (bool(error.args) and error.args[0] in LOCK_ERROR_CODES) or 'locked' in str(error)
+
+
+def stock_levels(product_ids):
+    '''
+    Retorna {product_id: stock actual} de los productos indicados en una consulta
+    '''
+    return dict(Product.objects.filter(pk__in=list(product_ids)).with_stock().values_list('pk', 'stock'))
+
+
+async def astock_levels(product_ids):
+    '''
+    Versión asíncrona de stock_levels (para las vistas async)
+    '''
+    queryset = Product.objects.filter(pk__in=list(product_ids)).with_stock().values_list('pk', 'stock')
+    return {product_id: quantity async for product_id, quantity in queryset}
+
+
+def available_units(product_ids):
+    '''
+    Retorna {product_id: unidades disponibles} (contador de Inventory) en una consulta
+    '''
+    return dict(Inventory.objects.filter(product_id__in=list(product_ids)).values_list('product_id', 'available'))
+
+
+def take_stock(deltas):
+    '''
+    Descuenta del disponible las unidades {product_id: cantidad} con un solo UPDATE condicionado
+    a que alcancen en todas las filas; las cantidades negativas devuelven unidades. Si alguna no
+    alcanza, libera las reservas vencidas de esos productos e intenta una vez más; si aún no
+    alcanza lanza InsufficientStock sin descontar nada. Debe llamarse dentro de una transacción
+    '''
+    taken = {product_id: quantity for product_id, quantity in deltas.items() if quantity > 0}
+    returned = {product_id: -quantity for product_id, quantity in deltas.items() if quantity < 0}
+    purged = False
+    while taken:
+        savepoint = transaction.savepoint()
+        updated = (Inventory.objects
+                   .filter(product_id__in=list(taken), available__gte=_per_product(taken))
+                   .update(available=F('available') - _per_product(taken)))
+        if updated == len(taken):
+            transaction.savepoint_commit(savepoint)
+            break
+        transaction.savepoint_rollback(savepoint)
+
+        if not purged:
+            purged = True
+            if purge_expired_reservations(taken):
+                continue
+        available = available_units(taken)
+        missing = [product_id for product_id in taken if product_id not in available]
+        if missing and _ensure_inventories(missing):
+            continue
+        shortages = [(product_id, max(available.get(product_id, 0), 0), quantity)
+                     for product_id, quantity in taken.items() if quantity > available.get(product_id, 0)]
+        if shortages:
+            raise InsufficientStock(shortages)
+        # Otra caja devolvió unidades entre el UPDATE y la lectura: se intenta de nuevo
+    _add_available(returned)
+
+
+def with_retries(operation):
+    '''
+    Ejecuta operation() en una transacción y la reintenta si la base de datos la rechaza por un
+    bloqueo (StockConflict), esperando un tiempo aleatorio creciente entre intentos. Después de
+    STOCK_MAX_RETRIES intentos relanza el StockConflict
+    '''
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            try:
+                with transaction.atomic():
+                    return operation()
+            except OperationalError as error:
+                if not is_lock_error(error):
+                    raise
+                raise StockConflict() from error
+        except StockConflict:
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(random.uniform(0, 0.005 * attempt))
+
+
+def reserve(cart_id, lines):
+    '''
+    Fija las unidades apartadas por el carrito para cada producto {product_id: cantidad}
+    (cantidad cero libera la reserva) y renueva el vencimiento de todas sus reservas.
+    Lanza InsufficientStock si no hay unidades suficientes (el disponible informado incluye
+    lo que el carrito ya tenía apartado)
+    '''
+    def attempt():
+        held = dict(StockReservation.objects.select_for_update()
+                    .filter(cartId=cart_id, product_id__in=list(lines))
+                    .values_list('product_id', 'quantity'))
+        try:
+            take_stock({product_id: quantity - held.get(product_id, 0) for product_id, quantity in lines.items()})
+        except InsufficientStock as error:
+            raise InsufficientStock([(product_id, available + held.get(product_id, 0), requested + held.get(product_id, 0))
+                                     for product_id, available, requested in error.shortages])
+        expires = timezone.now() + RESERVATION_TIMEOUT
+        StockReservation.objects.filter(cartId=cart_id, product_id__in=list(lines)).delete()
+        StockReservation.objects.bulk_create([
+            StockReservation(cartId=cart_id, product_id=product_id, quantity=quantity, expiresAt=expires)
+            for product_id, quantity in lines.items() if quantity
+        ])
+        StockReservation.objects.filter(cartId=cart_id).update(expiresAt=expires)
+
+    with_retries(attempt)
+
+
+def release(cart_id, product_ids=None):
+    '''
+    Libera las reservas del carrito (todas o solo las de los productos indicados) y devuelve
+    sus unidades al disponible
+    '''
+    def attempt():
+        reservations = StockReservation.objects.filter(cartId=cart_id)
+        if product_ids is not None:
+            reservations = reservations.filter(product_id__in=list(product_ids))
+        _release_rows(reservations)
+
+    with_retries(attempt)
+
+
+def purge_expired_reservations(product_ids=None):
+    '''
+    Elimina las reservas vencidas (todas o las de los productos indicados) y devuelve sus
+    unidades al disponible. Retorna la cantidad de reservas eliminadas
+    '''
+    expired = StockReservation.objects.filter(expiresAt__lte=timezone.now())
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=list(product_ids))
+    with transaction.atomic():
+        return _release_rows(expired)
+
+
+def _release_rows(reservations):
+    '''
+    Bloquea y elimina las reservas del queryset y suma sus unidades al disponible
+    '''
+    rows = list(reservations.select_for_update().values_list('reservationId', 'product_id', 'quantity'))
+    if not rows:
+        return 0
+    units = {}
+    for _, product_id, quantity in rows:
+        units[product_id] = units.get(product_id, 0) + quantity
+    StockReservation.objects.filter(pk__in=[reservation_id for reservation_id, _, _ in rows]).delete()
+    _add_available(units)
+    return len(rows)
+
+
+def record_movements(movements, update_available=True):
+    '''
+    Inserta los movimientos (objetos StockMovement sin guardar) en una sola consulta, ajusta el
+    disponible de sus productos (salvo que ya se haya descontado con take_stock) e invalida la
+    caché de SKU de los productos afectados al confirmar la transacción. Los listados del
+    catálogo en caché no guardan stock, por lo que no se invalidan
+    '''
+    movements = [movement for movement in movements if movement.quantity]
+    if not movements:
+        return []
+    if update_available:
+        deltas = {}
+        for movement in movements:
+            deltas[movement.product_id] = deltas.get(movement.product_id, 0) + movement.quantity
+        deltas = {product_id: quantity for product_id, quantity in deltas.items() if quantity}
+        if _add_available(deltas) < len(deltas):
+            # Las fotos nuevas se calculan sin estos movimientos, que aún no se insertan
+            created = _ensure_inventories(deltas)
+            _add_available({product_id: deltas[product_id] for product_id in created})
+    StockMovement.objects.bulk_create(movements)
+    sku_lookup.invalidate_products_on_commit({movement.product_id for movement in movements})
+    return movements
+
+
+def _per_product(quantities):
+    '''
+    Expresión con la cantidad de cada producto {product_id: cantidad} para usar en un UPDATE
+    '''
+    return Case(*[When(product_id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+                output_field=IntegerField())
+
+
+def _add_available(deltas):
+    '''
+    Suma al disponible de cada producto {product_id: cantidad} en un solo UPDATE.
+    Retorna la cantidad de filas actualizadas
+    '''
+    if not deltas:
+        return 0
+    return (Inventory.objects.filter(product_id__in=list(deltas))
+            .update(available=F('available') + _per_product(deltas)))
+
+
+def _ensure_inventories(product_ids):
+    '''
+    Crea la foto de inventario de los productos que no la tienen, con el disponible calculado
+    desde los movimientos y las reservas. Retorna los ids de los productos creados
+    '''
+    existing = set(Inventory.objects.filter(product_id__in=list(product_ids)).values_list('product_id', flat=True))
+    missing = [product_id for product_id in product_ids if product_id not in existing]
+    if not missing:
+        return []
+    levels = stock_levels(missing)
+    reserved = dict(StockReservation.objects.filter(product_id__in=missing)
+                    .values('product_id')
+                    .annotate(total=Sum('quantity'))
+                    .values_list('product_id', 'total'))
+    created = [product_id for product_id in missing if product_id in levels]
+    Inventory.objects.bulk_create([
+        Inventory(product_id=product_id, productQuantity=0, available=levels[product_id] - reserved.get(product_id, 0))
+        for product_id in created
+    ], ignore_conflicts=True)
+    return created
+
+
+def set_stock(targets, kind=StockMovement.ADJUSTMENT, employee_id=None):
+    '''
+    Lleva el stock de cada producto {product_id: cantidad} al valor indicado registrando
+    la diferencia como un movimiento. Retorna los ids de los productos cuyo stock cambió
+    '''
+    current = stock_levels(targets)
+    movements = record_movements(
+        StockMovement(product_id=product_id, quantity=quantity - current.get(product_id, 0),
+                      kind=kind, employee_id=employee_id)
+        for product_id, quantity in targets.items()
+    )
+    return [movement.product_id for movement in movements]
+
+
+def compact_movements(batch_size=1000, stdout=None):
+    '''
+    Suma a la foto de cada producto sus movimientos hasta el último movimiento con más de
+    COMPACTION_DELAY de antigüedad (y sin movimientos recientes con id menor).
+    Retorna la cantidad de productos compactados
+    '''
+    cutoff = timezone.now() - COMPACTION_DELAY
+    first_recent = StockMovement.objects.filter(createdAt__gte=cutoff).aggregate(first=Min('movementId'))['first']
+    if first_recent is not None:
+        last_id = first_recent - 1
+    else:
+        last_id = StockMovement.objects.aggregate(last=Max('movementId'))['last'] or 0
+
+    pending = (_after_snapshot(StockMovement.objects.filter(movementId__lte=last_id))
+               .values_list('product_id', flat=True)
+               .distinct()
+               .order_by('product_id'))
+    product_ids = list(pending)
+
+    compacted = 0
+    for start in range(0, len(product_ids), batch_size):
+        compacted += _compact_batch(product_ids[start:start + batch_size], last_id)
+        if stdout:
+            stdout.write(f'{compacted} productos compactados')
+    return compacted
+
+
+def _compact_batch(product_ids, last_id):
+    '''
+    Actualiza la foto y su marca (snapshotMovementId) en la misma fila, por lo que una lectura
+    concurrente ve la foto anterior con sus movimientos o la nueva, nunca una mezcla
+    '''
+    with transaction.atomic():
+        _ensure_inventories(product_ids)
+        # Movimientos de cada inventario entre su foto y last_id, sumados en el mismo UPDATE
+        delta = (StockMovement.objects
+                 .filter(product=OuterRef('product_id'), movementId__gt=OuterRef('snapshotMovementId'),
+                         movementId__lte=last_id)
+                 .values('product')
+                 .annotate(total=Sum('quantity'))
+                 .values('total'))
+        return Inventory.objects.filter(product_id__in=product_ids).update(
+            productQuantity=F('productQuantity') + Coalesce(Subquery(delta), 0),
+            snapshotMovementId=last_id,
+            modificationDate=timezone.now(),
+        )
+
+
+def _after_snapshot(movements):
+    '''
+    Movimientos posteriores a la foto de su producto (todos si el producto no tiene foto)
+    '''
+    return movements.filter(movementId__gt=Coalesce(F('product__inventory__snapshotMovementId'), 0))
@@ -0,0 +1,144 @@
+"""
+signals.py
+
+Receptores de señales de los modelos del sistema.
+
+- Mantiene los totales persistidos de la venta cuando sus detalles se guardan o eliminan
+  individualmente (por ejemplo desde el panel de administración).
+- Mantiene sincronizado el índice de búsqueda de productos cuando cambia un producto
+  o el nombre de una categoría.
+- Invalida la caché de búsqueda por SKU cuando cambia un producto o su inventario.
+- Invalida la caché de listados del catálogo cuando cambian productos o categorías (los listados
+  no guardan stock, por lo que los cambios de inventario no la invalidan).
+- Invalida la caché del empleado autenticado cuando un empleado cambia o se elimina.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from TechSolutionsApp import permissions, search
+from TechSolutionsApp.cache import catalog_cache
+from TechSolutionsApp.models import Category, Employee, Inventory, Product, Sale, SaleDetail
+from TechSolutionsApp.services import sku_lookup
+
+
+@receiver(post_save, sender=SaleDetail)
+def sale_detail_saved(sender, instance, raw=False, **kwargs):
+    '''
+    Recalcula los totales de la venta al guardar uno de sus detalles
+    '''
+    if raw:
+        return
+    Sale.objects.filter(pk=instance.sale_id).refresh_totals()
+
+
+@receiver(post_delete, sender=SaleDetail)
+def sale_detail_deleted(sender, instance, origin=None, **kwargs):
+    '''
+    Recalcula los totales de la venta al eliminar uno de sus detalles.
+    Si el borrado viene en cascada desde la propia venta no hay nada que recalcular
+    '''
+    if isinstance(origin, Sale):
+        return
+    Sale.objects.filter(pk=instance.sale_id).refresh_totals()
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    '''
+    Actualiza el índice de búsqueda del producto guardado
+    '''
+    if raw:
+        return
+    search.index_products([instance.pk])
+    _invalidate_sku_cache(instance)
+    catalog_cache.invalidate_on_commit('products')
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    '''
+    Quita el producto eliminado del índice de búsqueda
+    '''
+    search.unindex_products([instance.pk])
+    _invalidate_sku_cache(instance)
+    catalog_cache.invalidate_on_commit('products')
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def inventory_changed(sender, instance, raw=False, **kwargs):
+    '''
+    Invalida la caché de SKU del producto cuyo inventario cambió
+    '''
+    if raw:
+        return
+    sku_lookup.invalidate_products_on_commit([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created=False, raw=False, **kwargs):
+    '''
+    Invalida los listados y, si cambia el nombre de la categoría, recalcula el texto
+    de búsqueda de sus productos
+    '''
+    if raw:
+        return
+    catalog_cache.invalidate_on_commit('categories', 'products')
+    if not created:
+        _refresh_search_text(Product.objects.filter(category=instance), instance.name)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    '''
+    Guarda los productos de la categoría antes de que queden sin categoría (SET_NULL)
+    '''
+    instance._product_ids = list(Product.objects.filter(category=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    '''
+    Invalida los listados y quita el nombre de la categoría eliminada del texto
+    de búsqueda de sus productos
+    '''
+    catalog_cache.invalidate_on_commit('categories', 'products')
+    product_ids = getattr(instance, '_product_ids', [])
+    if product_ids:
+        _refresh_search_text(Product.objects.filter(pk__in=product_ids), '')
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def employee_changed(sender, instance, raw=False, **kwargs):
+    '''
+    Un cambio de rol o una desactivación se aplica en la siguiente petición del empleado
+    '''
+    if raw:
+        return
+    permissions.invalidate_employee_on_commit(instance.pk)
+
+
+def _refresh_search_text(products, category_name):
+    '''
+    Recalcula searchText de los productos indicados con bulk_update y sincroniza el índice
+    '''
+    products = list(products.only('productId', 'name', 'sku'))
+    for product in products:
+        product.searchText = product.build_search_text(category_name)
+    Product.objects.bulk_update(products, ['searchText'], batch_size=1000)
+    search.index_products([product.pk for product in products])
+
+
+def _invalidate_sku_cache(product):
+    '''
+    Invalida la entrada del producto y la de su SKU actual (que pudo estar en caché como inexistente)
+    '''
+    product_id, sku = product.pk, product.sku
+
+    def invalidate():
+        sku_lookup.invalidate_products([product_id])
+        sku_lookup.invalidate_sku(sku)
+    transaction.on_commit(invalidate)
@@ -0,0 +1,95 @@
+/*
+ * Carrito de venta del formulario add_sale.
+ * Las líneas se guardan en el servidor (sesión) mediante los endpoints JSON del carrito;
+ * al guardar la venta solo se envía el id del carrito.
+ */
+(function () {
+    const form = document.getElementById('sale-form');
+    const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+    const cartLines = document.getElementById('cart-lines');
+    const cartError = document.getElementById('cart-error');
+
+    // Envía una petición JSON al carrito y vuelve a dibujarlo con la respuesta
+    async function sendToCart(url, payload) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken},
+            body: JSON.stringify(payload),
+        });
+        const data = await response.json();
+        cartError.textContent = data.error || '';
+        renderCart(data.cart || data);
+    }
+
+    function renderCart(cart) {
+        document.getElementById('cart_id').value = cart.id;
+        document.getElementById('cart-subtotal').textContent = cart.subtotal;
+        cartLines.innerHTML = '';
+
+        if (!cart.lines.length) {
+            const row = cartLines.insertRow();
+            row.className = 'cart-empty';
+            const cell = row.insertCell();
+            cell.colSpan = 6;
+            cell.textContent = 'El carrito está vacío.';
+            return;
+        }
+
+        cart.lines.forEach(function (line) {
+            const row = cartLines.insertRow();
+            row.insertCell().textContent = line.sku;
+            row.insertCell().textContent = line.name;
+            row.insertCell().textContent = '₡' + line.price;
+
+            const quantity = document.createElement('input');
+            quantity.type = 'number';
+            quantity.className = 'cart-quantity';
+            quantity.dataset.productId = line.productId;
+            quantity.min = 0;
+            quantity.max = line.stock;
+            quantity.value = line.quantity;
+            row.insertCell().appendChild(quantity);
+
+            row.insertCell().textContent = '₡' + line.lineTotal;
+
+            const remove = document.createElement('button');
+            remove.type = 'button';
+            remove.className = 'cart-remove';
+            remove.dataset.productId = line.productId;
+            remove.textContent = 'Quitar';
+            row.insertCell().appendChild(remove);
+        });
+    }
+
+    form.addEventListener('click', function (event) {
+        const target = event.target;
+        if (target.classList.contains('cart-add')) {
+            const productId = target.dataset.productId;
+            const quantity = document.getElementById('add_quantity_' + productId).value;
+            sendToCart(form.dataset.cartAddUrl, {product_id: productId, quantity: quantity});
+        } else if (target.classList.contains('cart-remove')) {
+            sendToCart(form.dataset.cartRemoveUrl, {product_id: target.dataset.productId});
+        }
+    });
+
+    form.addEventListener('change', function (event) {
+        const target = event.target;
+        if (target.classList.contains('cart-quantity')) {
+            sendToCart(form.dataset.cartUpdateUrl, {product_id: target.dataset.productId, quantity: target.value});
+        }
+    });
+
+    // El lector de código de barras escribe el SKU y envía Enter
+    const scanInput = document.getElementById('scan-sku');
+    scanInput.addEventListener('keydown', function (event) {
+        if (event.key !== 'Enter') {
+            return;
+        }
+        event.preventDefault();
+        const sku = scanInput.value.trim();
+        if (sku) {
+            sendToCart(form.dataset.cartAddUrl, {sku: sku, quantity: 1});
+        }
+        scanInput.value = '';
+    });
+})();
@@ -0,0 +1,81 @@
+/*
+ * Autocompletado de clientes de los formularios de venta.
+ * Cada campo con data-customer-lookup consulta el endpoint lookup_customer mientras se escribe
+ * (cédula, nombre o correo) y muestra las coincidencias; al elegir una se copian sus datos a
+ * los campos indicados en data-fill ({"atributo del cliente": "id del campo"}).
+ * Con data-show-selection el campo muestra el cliente elegido (cédula y nombre).
+ */
+(function () {
+    document.querySelectorAll('[data-customer-lookup]').forEach(function (input) {
+        const url = input.dataset.customerLookup;
+        const fill = JSON.parse(input.dataset.fill || '{}');
+        const suggestions = document.createElement('ul');
+        suggestions.className = 'customer-suggestions';
+        input.insertAdjacentElement('afterend', suggestions);
+        input.autocomplete = 'off';
+
+        let timer = null;
+        let controller = null;
+
+        function describe(customer) {
+            return (customer.idNumber || '') + ' - ' + customer.firstName + ' ' + customer.lastName;
+        }
+
+        // Espera a que se deje de escribir y cancela la búsqueda anterior si sigue en curso
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(search, 200);
+        });
+
+        async function search() {
+            const query = input.value.trim();
+            if (controller) {
+                controller.abort();
+            }
+            if (query.length < 2) {
+                suggestions.innerHTML = '';
+                return;
+            }
+            controller = new AbortController();
+            try {
+                const response = await fetch(url + '?q=' + encodeURIComponent(query), {signal: controller.signal});
+                const data = await response.json();
+                render(data.results || []);
+            } catch (error) {
+                if (error.name !== 'AbortError') {
+                    suggestions.innerHTML = '';
+                }
+            }
+        }
+
+        function render(customers) {
+            suggestions.innerHTML = '';
+            customers.forEach(function (customer) {
+                const item = document.createElement('li');
+                item.textContent = describe(customer) + (customer.email ? ' (' + customer.email + ')' : '');
+                // mousedown en lugar de click: se ejecuta antes de que el campo pierda el foco
+                item.addEventListener('mousedown', function (event) {
+                    event.preventDefault();
+                    select(customer);
+                });
+                suggestions.appendChild(item);
+            });
+        }
+
+        function select(customer) {
+            Object.keys(fill).forEach(function (attribute) {
+                const field = document.getElementById(fill[attribute]);
+                const value = customer[attribute];
+                field.value = value === null || value === undefined ? '' : value;
+            });
+            if ('showSelection' in input.dataset) {
+                input.value = describe(customer);
+            }
+            suggestions.innerHTML = '';
+        }
+
+        input.addEventListener('blur', function () {
+            suggestions.innerHTML = '';
+        });
+    });
+})();
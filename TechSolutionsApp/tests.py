@@ -1,3 +1,343 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError, connection
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from TechSolutionsApp.models import (Category, Customer, DailyEmployeeSales, DailyProductSales, Employee, Inventory,
+                                     Product, Role, Sale, SaleDetail, StockMovement, StockReservation)
+from TechSolutionsApp.services import rollups, stock
+from TechSolutionsApp.services.checkout import CheckoutError, register_sale
+from TechSolutionsApp.services.product_import import import_products
+from TechSolutionsApp.services.sale_amendment import AmendmentError, amend_sale
+from TechSolutionsApp.services.sale_ingestion import ingest_sales
+from TechSolutionsApp.services.sale_reversal import ReversalError, return_items, void_sales
+
+
+class StockTestMixin:
+    '''
+    Datos comunes: un empleado, un cliente y productos con stock inicial
+    '''
+
+    def setUp(self):
+        role = Role.objects.create(description='Admin')
+        self.employee = Employee.objects.create(firstName='Caja', lastName='Uno', idNumber=1, phoneNumber=1, role=role)
+        self.customer = Customer.objects.create(firstName='Cliente', lastName='Prueba')
+        self.category = Category.objects.create(name='Pruebas')
+
+    def create_product(self, initial_stock):
+        product = Product.objects.create(name=f'Producto {Product.objects.count()}', price=1000,
+                                         category=self.category)
+        Inventory.objects.create(product=product, productQuantity=0)
+        stock.record_movements([StockMovement(product=product, quantity=initial_stock, kind=StockMovement.RESTOCK)])
+        return product
+
+
+class ConcurrentCheckoutTests(StockTestMixin, TransactionTestCase):
+    '''
+    Varias cajas cobran el mismo producto a la vez
+    '''
+
+    def test_concurrent_sales_never_oversell(self):
+        initial_stock, threads = 40, 6
+        product = self.create_product(initial_stock)
+        sold, errors = [], []
+        lock = threading.Lock()
+
+        def exhausted():
+            try:
+                return stock.available_units([product.pk])[product.pk] < 1
+            except OperationalError:
+                # Lectura bloqueada por otra escritura (SQLite): se sigue intentando
+                return False
+
+        def register():
+            try:
+                while True:
+                    try:
+                        register_sale(self.customer, self.employee.pk, 0, {product.pk: 1})
+                    except CheckoutError:
+                        # Falta de stock (fin) o base de datos ocupada (se vuelve a intentar)
+                        if exhausted():
+                            return
+                        continue
+                    with lock:
+                        sold.append(1)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=register) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        units_sold = SaleDetail.objects.filter(product=product).aggregate(units=Sum('quantity'))['units'] or 0
+        remaining = stock.stock_levels([product.pk])[product.pk]
+        self.assertEqual(units_sold, len(sold))
+        self.assertEqual(units_sold + remaining, initial_stock)
+        self.assertEqual(remaining, 0)
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 0)
+
+    def test_shortage_rolls_back_the_whole_sale(self):
+        product = self.create_product(2)
+        other = self.create_product(5)
+        with self.assertRaises(CheckoutError):
+            register_sale(self.customer, self.employee.pk, 0, {product.pk: 3, other.pk: 1})
+        self.assertFalse(Sale.objects.exists())
+        self.assertEqual(stock.available_units([product.pk, other.pk]), {product.pk: 2, other.pk: 5})
+
+
+class ReservationTests(StockTestMixin, TransactionTestCase):
+    '''
+    Reservas de carritos y su vencimiento
+    '''
+
+    def expire(self, cart_id):
+        StockReservation.objects.filter(cartId=cart_id).update(expiresAt=timezone.now() - timedelta(seconds=1))
+
+    def test_reservation_holds_units_for_other_carts(self):
+        product = self.create_product(5)
+        stock.reserve('cart-a', {product.pk: 4})
+        with self.assertRaises(stock.InsufficientStock) as error:
+            stock.reserve('cart-b', {product.pk: 2})
+        self.assertEqual(error.exception.shortages, [(product.pk, 1, 2)])
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 1)
+
+    def test_expired_reservation_releases_units_on_demand(self):
+        product = self.create_product(5)
+        stock.reserve('cart-a', {product.pk: 5})
+        self.expire('cart-a')
+
+        stock.reserve('cart-b', {product.pk: 3})
+
+        self.assertFalse(StockReservation.objects.filter(cartId='cart-a').exists())
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 2)
+
+    def test_purge_returns_expired_units(self):
+        product = self.create_product(5)
+        stock.reserve('cart-a', {product.pk: 2})
+        stock.reserve('cart-b', {product.pk: 1})
+        self.expire('cart-a')
+
+        self.assertEqual(stock.purge_expired_reservations(), 1)
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 4)
+        self.assertEqual(list(StockReservation.objects.values_list('cartId', flat=True)), ['cart-b'])
+
+    def test_checkout_consumes_the_cart_reservation(self):
+        product = self.create_product(5)
+        stock.reserve('cart-a', {product.pk: 3})
+        register_sale(self.customer, self.employee.pk, 0, {product.pk: 5}, cart_id='cart-a')
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(stock.stock_levels([product.pk])[product.pk], 0)
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 0)
+
+
+class RetryTests(StockTestMixin, TransactionTestCase):
+    '''
+    Reintentos ante bloqueos de la base de datos (deadlock, tiempo de espera, SQLite ocupada)
+    '''
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('TechSolutionsApp.services.stock.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def failing(self, failures, error):
+        calls = []
+
+        def operation():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise error
+            return 'ok'
+        return operation, calls
+
+    def test_lock_error_is_retried_until_it_succeeds(self):
+        operation, calls = self.failing(2, OperationalError('database is locked'))
+        self.assertEqual(stock.with_retries(operation), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_deadlock_is_a_stock_conflict(self):
+        operation, calls = self.failing(1, OperationalError(1213, 'Deadlock found when trying to get lock'))
+        self.assertEqual(stock.with_retries(operation), 'ok')
+
+    def test_conflict_is_raised_after_max_retries(self):
+        operation, calls = self.failing(stock.MAX_RETRIES, stock.StockConflict())
+        with self.assertRaises(stock.StockConflict):
+            stock.with_retries(operation)
+        self.assertEqual(len(calls), stock.MAX_RETRIES)
+
+    def test_other_database_errors_are_not_retried(self):
+        operation, calls = self.failing(1, OperationalError('no such table: foo'))
+        with self.assertRaises(OperationalError):
+            stock.with_retries(operation)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_attempt_is_rolled_back_before_retrying(self):
+        product = self.create_product(5)
+        attempts = []
+
+        def operation():
+            attempts.append(1)
+            stock.take_stock({product.pk: 2})
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+
+        stock.with_retries(operation)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 3)
+
+
+class SaleLifecycleTests(StockTestMixin, TestCase):
+    '''
+    Cobro, edición, devolución parcial y anulación: inventario, totales y resúmenes diarios
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.create_product(10)
+        self.second = self.create_product(5)
+        self.initial = {self.first.pk: 10, self.second.pk: 5}
+
+    def assert_consistent(self):
+        '''
+        El stock (foto más movimientos) y el disponible son el inicial menos lo vendido en ventas
+        activas; los totales de cada venta y los resúmenes coinciden con sus líneas
+        '''
+        sold = dict(SaleDetail.objects.filter(sale__voidedAt__isnull=True)
+                    .values('product').annotate(units=Sum('quantity')).values_list('product', 'units'))
+        expected = {product_id: units - sold.get(product_id, 0) for product_id, units in self.initial.items()}
+        self.assertEqual(stock.stock_levels(self.initial), expected)
+        self.assertEqual(stock.available_units(self.initial), expected)
+        ledger = dict(StockMovement.objects.values('product').annotate(units=Sum('quantity'))
+                      .values_list('product', 'units'))
+        self.assertEqual(ledger, expected)
+
+        for sale in Sale.objects.all():
+            lines = SaleDetail.objects.filter(sale=sale).aggregate(amount=Sum(F('quantity') * F('unitPrice')))
+            self.assertEqual(sale.subtotal, lines['amount'] or 0)
+            self.assertEqual(sale.total, sale.subtotal - sale.discountAmount)
+
+        rollups.refresh_rollups()
+        summarized = dict(DailyProductSales.objects.values('product').annotate(units=Sum('quantity'))
+                          .values_list('product', 'units'))
+        self.assertEqual({product_id: units for product_id, units in summarized.items() if units},
+                         {product_id: units for product_id, units in sold.items() if units})
+        revenue = DailyEmployeeSales.objects.aggregate(amount=Sum('revenue'))['amount'] or 0
+        self.assertEqual(revenue, Sale.objects.active().aggregate(amount=Sum('total'))['amount'] or 0)
+
+    def test_checkout_edit_return_and_void(self):
+        sale = register_sale(self.customer, self.employee.pk, 10, {self.first.pk: 3, self.second.pk: 2})
+        self.assertEqual(sale.total, Decimal('4500.00'))
+        self.assert_consistent()
+
+        # Edición: una línea sube (toma stock) y otra se elimina (lo devuelve)
+        amend_sale(sale.pk, self.employee.pk, {self.first.pk: 5, self.second.pk: 0})
+        self.assertEqual(list(SaleDetail.objects.filter(sale=sale).values_list('product', 'quantity')),
+                         [(self.first.pk, 5)])
+        self.assert_consistent()
+
+        sale = return_items(sale.pk, self.employee.pk, {self.first.pk: 2})
+        self.assertEqual(sale.subtotal, Decimal('3000.00'))
+        self.assert_consistent()
+
+        self.assertEqual(void_sales([sale.pk], self.employee.pk), (1, 3))
+        sale.refresh_from_db()
+        self.assertIsNotNone(sale.voidedAt)
+        self.assertEqual(StockMovement.objects.filter(kind=StockMovement.VOID, sale=sale).count(), 1)
+        self.assert_consistent()
+
+        # Una venta anulada no se vuelve a anular ni se modifica
+        self.assertEqual(void_sales([sale.pk]), (0, 0))
+        with self.assertRaises(AmendmentError):
+            amend_sale(sale.pk, self.employee.pk, {self.first.pk: 1})
+        with self.assertRaises(ReversalError):
+            return_items(sale.pk, self.employee.pk, {self.first.pk: 1})
+        self.assert_consistent()
+
+    def test_returning_every_unit_voids_the_sale(self):
+        sale = register_sale(self.customer, self.employee.pk, 0, {self.first.pk: 2, self.second.pk: 1})
+        self.assertIsNone(return_items(sale.pk, self.employee.pk, {self.first.pk: 2, self.second.pk: 1}))
+        self.assertTrue(Sale.objects.filter(pk=sale.pk, voidedAt__isnull=False).exists())
+        self.assert_consistent()
+
+    def test_invalid_edit_reports_every_line_and_changes_nothing(self):
+        sale = register_sale(self.customer, self.employee.pk, 0, {self.first.pk: 2, self.second.pk: 1})
+        with self.assertRaises(AmendmentError) as error:
+            amend_sale(sale.pk, self.employee.pk, {self.first.pk: 20, self.second.pk: 'x'})
+        self.assertEqual(len(error.exception.errors), 2)
+        self.assertEqual(dict(SaleDetail.objects.filter(sale=sale).values_list('product', 'quantity')),
+                         {self.first.pk: 2, self.second.pk: 1})
+        self.assert_consistent()
+
+
+class SaleIngestionTests(StockTestMixin, TestCase):
+    '''
+    Ventas recibidas por lotes desde las cajas sin conexión
+    '''
+
+    def record(self, key, id_number, quantity, **customer):
+        return {'key': key, 'customer': {'id_number': id_number, **customer},
+                'lines': [{'product_id': self.product.pk, 'quantity': quantity}]}
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product(10)
+
+    def test_reposting_the_same_batch_does_not_duplicate_sales(self):
+        batch = [(1, self.record('caja1-0001', '100000001', 2, first_name='Ana', last_name='Mora')),
+                 (2, self.record('caja1-0002', '100000001', 3))]
+
+        first = ingest_sales(batch, self.employee.pk)
+        self.assertEqual((first.created, first.duplicates, first.customers_created, first.error_count), (2, 0, 1, 0))
+        second = ingest_sales(batch, self.employee.pk)
+        self.assertEqual((second.created, second.duplicates, second.error_count), (0, 2, 0))
+
+        self.assertEqual(Sale.objects.count(), 2)
+        self.assertEqual(stock.stock_levels([self.product.pk])[self.product.pk], 5)
+        self.assertEqual(stock.available_units([self.product.pk])[self.product.pk], 5)
+
+    def test_every_sale_of_an_unknown_customer_without_names_is_reported(self):
+        result = ingest_sales([(1, self.record('caja1-0001', '100000002', 1)),
+                               (2, self.record('caja1-0002', '100000002', 1)),
+                               (3, self.record('caja1-0003', '100000003', 1, first_name='Luis', last_name='Soto'))],
+                              self.employee.pk)
+        self.assertEqual((result.created, result.error_count), (1, 2))
+        self.assertEqual([(position, key) for position, key, _ in result.errors],
+                         [(1, 'caja1-0001'), (2, 'caja1-0002')])
+        self.assertEqual(stock.stock_levels([self.product.pk])[self.product.pk], 9)
+
+
+class ProductImportTests(StockTestMixin, TestCase):
+    '''
+    Importación de productos: alta o actualización por SKU y diferencia de stock como movimiento
+    '''
+
+    def test_import_creates_then_updates_by_sku(self):
+        result = import_products([(2, {'sku': 'IMP-1', 'name': 'Importado', 'price': '1500', 'category': 'Pruebas',
+                                       'stock': '10'})])
+        self.assertEqual((result.created, result.updated, result.error_count), (1, 0, 0))
+        product = Product.objects.get(sku='IMP-1')
+        self.assertEqual(stock.stock_levels([product.pk])[product.pk], 10)
+
+        result = import_products([(2, {'sku': 'IMP-1', 'price': '1800', 'stock': '4'}),
+                                  (3, {'sku': 'IMP-2', 'price': '100'})])
+        self.assertEqual((result.created, result.updated, result.error_count), (0, 1, 1))
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.price), ('Importado', Decimal('1800.00')))
+        self.assertEqual(stock.stock_levels([product.pk])[product.pk], 4)
+        self.assertEqual(stock.available_units([product.pk])[product.pk], 4)
+        self.assertEqual(list(StockMovement.objects.filter(product=product).order_by('movementId')
+                              .values_list('kind', 'quantity')),
+                         [(StockMovement.RESTOCK, 10), (StockMovement.ADJUSTMENT, -6)])
 
-# Create your tests here.
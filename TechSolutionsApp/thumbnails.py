@@ -0,0 +1,114 @@
+"""
+thumbnails.py
+
+Generación de miniaturas WebP para las imágenes de productos.
+
+Al guardar un producto con imagen se programan varias miniaturas (PRODUCT_THUMBNAIL_SIZES)
+en un pool de hilos en segundo plano, para no bloquear la petición. Las miniaturas se guardan
+en media/products/thumbs/ con el nombre <imagen>_<extensión>_<tamaño>.webp (la extensión
+distingue foo.png de foo.jpg, que de otro modo compartirían miniatura). Al terminar, los tamaños
+generados se guardan en Product.thumbnailSizes: las URL se arman desde ese campo, sin consultar
+el almacenamiento por cada producto mostrado. Mientras no existan, las plantillas usan la
+imagen original.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from TechSolutionsApp.cache import catalog_cache
+from TechSolutionsApp.models import Product
+
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = tuple(getattr(settings, 'PRODUCT_THUMBNAIL_SIZES', (64, 160, 320)))
+THUMBNAIL_DIR = 'products/thumbs'
+WEBP_QUALITY = 80
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+    thread_name_prefix='thumbnails'
+)
+
+
+def thumbnail_name(image_name, size):
+    '''
+    Ruta de la miniatura de un tamaño para una imagen (relativa a MEDIA_ROOT)
+    '''
+    stem, extension = os.path.splitext(os.path.basename(image_name))
+    extension = extension.lstrip('.').lower()
+    return f'{THUMBNAIL_DIR}/{stem}_{extension}_{size}.webp' if extension else f'{THUMBNAIL_DIR}/{stem}_{size}.webp'
+
+
+def parse_sizes(value):
+    '''
+    Convierte el valor de Product.thumbnailSizes ("64,160,320") en una lista de enteros ordenada
+    '''
+    return sorted(int(size) for size in value.split(',') if size.isdigit()) if value else []
+
+
+def generate_thumbnails(image_name, sizes=THUMBNAIL_SIZES):
+    '''
+    Genera (o reemplaza) las miniaturas WebP de una imagen y registra los tamaños en los
+    productos que la usan. Retorna la lista de rutas creadas
+    '''
+    with default_storage.open(image_name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    created = []
+    for size in sorted(sizes, reverse=True):
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        thumbnail.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+
+        name = thumbnail_name(image_name, size)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        created.append(default_storage.save(name, ContentFile(buffer.getvalue())))
+
+    # Solo los productos que siguen con esta imagen (si se cambió entretanto, no se marca)
+    Product.objects.filter(image=image_name).update(thumbnailSizes=','.join(str(size) for size in sorted(sizes)))
+    # El listado en caché guarda los productos con el valor anterior
+    catalog_cache.invalidate('products')
+    return created
+
+
+def schedule_thumbnails(image_name):
+    '''
+    Programa la generación de miniaturas en segundo plano cuando se confirma la transacción
+    '''
+    if not image_name:
+        return
+    transaction.on_commit(lambda: _executor.submit(_generate_safely, image_name))
+
+
+def thumbnail_url(image_name, size):
+    '''
+    URL de la miniatura de un tamaño ya generado (no consulta el almacenamiento)
+    '''
+    return default_storage.url(thumbnail_name(image_name, size))
+
+
+def thumbnail_srcset(image_name, sizes):
+    '''
+    Valor srcset con las miniaturas generadas de los tamaños indicados ("url 64w, url 160w, ...")
+    '''
+    return ', '.join(f'{thumbnail_url(image_name, size)} {size}w' for size in sizes)
+
+
+def _generate_safely(image_name):
+    try:
+        generate_thumbnails(image_name)
+    except Exception:
+        logger.exception('No se pudieron generar las miniaturas de %s', image_name)
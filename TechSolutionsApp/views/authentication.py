@@ -2,42 +2,32 @@
 authentication.py
 
 Este módulo define las vistas y funciones relacionadas con la autenticación de usuarios 
-en el sistema, así como el decorador personalizado `@login_required` para proteger 
-vistas que requieren sesión activa.
+en el sistema.
 
 Funcionalidades incluidas:
 - Inicio de sesión (login)
 - Cierre de sesión (logout_view)
 - Validación de sesión (is_authenticated)
-- Decorador login_required para restringir acceso a usuarios no autenticados
 - Vista principal (index) protegida por sesión
 
 Se utiliza el modelo Employee para autenticar al usuario con su número de identificación
-y contraseña, y se almacenan datos clave en la sesión de Django.
+y contraseña; la sesión solo guarda el id del empleado. El rol, el nombre y los permisos se
+resuelven en cada petición con EmployeeAuthMiddleware (`request.employee`), y los decoradores
+login_required y permission_required se definen en permissions.py.
 """
 
 
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from TechSolutionsApp.models import Employee
+from TechSolutionsApp.permissions import login_required
 
-def is_authenticated(request):
-    '''
-    Función para verificar si el usuario está autenticado
-    ''' 
-    return request.session.get('employee_id') is not None
 
-
-def login_required(view_func):
+def is_authenticated(request):
     '''
-    Decorador para proteger vistas que requieren autorización
+    Función para verificar si el usuario está autenticado (y sigue activo)
     ''' 
-    def wrapper(request, *args, **kwargs):
-        # si el usuario no está autenticado, lo redirige al login
-        if not is_authenticated(request):
-            return redirect('login')
-        return view_func(request, *args, **kwargs)
-    return wrapper
+    return request.employee.is_authenticated
 
 
 @login_required
@@ -58,16 +48,16 @@ def login(request):
         try:
             # busca el empleado por número de identificación
             user = Employee.objects.get(idNumber=id_number)
-            if user.check_password(password):
-                # Si es correcto, guarda datos del usuario en la sesión
+            if not user.check_password(password):
+                messages.error(request, "Contraseña incorrecta")
+            elif not user.isActive:
+                messages.error(request, "El usuario está inactivo")
+            else:
+                # Si es correcto, guarda el id del empleado en la sesión (con una llave de sesión nueva)
+                request.session.cycle_key()
                 request.session['employee_id'] = user.employeeId
-                request.session['id_number'] = user.idNumber
-                request.session['role_id'] = user.role.roleId
-                request.session['name'] = f"{user.firstName} {user.lastName}"
                 
                 return redirect('home')
-            else:
-                messages.error(request, "Contraseña incorrecta")
         except Employee.DoesNotExist:
             messages.error(request, "Usuario no encontrado")
     # Si no es POST o hubo errores, muestra el formulario de login
@@ -15,21 +15,18 @@ Operaciones disponibles:
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from TechSolutionsApp.cache import catalog_cache
 from TechSolutionsApp.models import Category
-from TechSolutionsApp.views.authentication import login_required
+from TechSolutionsApp.permissions import CATEGORIES_MANAGE, login_required, permission_required
 from django.db.models import Q
 
 @login_required
+@permission_required(CATEGORIES_MANAGE)
 def add_category(request):
     '''
     Función para agregar una categoría
     '''
-    
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
+
     if request.method == 'POST':
         name = request.POST.get('name')
         
@@ -57,27 +54,27 @@ def view_categories(request):
     '''
     
     query = request.GET.get('q', '')
-    categories = Category.objects.all()
-    role = request.session.get('role_id')
-    
-    if query:
-        categories = categories.filter(Q(name__icontains=query))
+    role = request.employee.role_id
+
+    def load_categories():
+        categories = Category.objects.all()
+        if query:
+            categories = categories.filter(Q(name__icontains=query))
+        return list(categories)
+
+    # El listado se guarda en caché por búsqueda, se invalida al modificar categorías
+    categories = catalog_cache.get_or_set('categories', ('view_categories', query), load_categories)
     
     return render(request, 'categories/view_categories.html', {'categories': categories, 'role': role})
 
 
 @login_required
+@permission_required(CATEGORIES_MANAGE)
 def edit_category(request, id):
     '''
     Función para editar una categoría
     '''
-    
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
-    
+
     category = get_object_or_404(Category, categoryId=id)
     if request.method == 'POST':
         name = request.POST.get('name', '').strip()
@@ -100,16 +97,12 @@ def edit_category(request, id):
 
 
 @login_required
+@permission_required(CATEGORIES_MANAGE)
 def delete_category(request, id):
     '''
     Función para borrar una categoría
     '''
-    
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
+
     category = get_object_or_404(Category, categoryId=id)
     if request.method == 'POST':
         category.delete()
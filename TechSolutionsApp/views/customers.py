@@ -5,18 +5,24 @@ Este módulo contiene las vistas relacionadas con la gestión de clientes del si
 
 Incluye funcionalidades para:
 - Agregar nuevos clientes
-- Visualizar la lista de clientes
+- Visualizar el directorio de clientes (búsqueda, paginación por cursor y resumen de compras)
 - Editar información de clientes existentes
 - Eliminar clientes, con validación de relaciones protegidas (ventas asociadas)
+- Buscar clientes por cédula, nombre o correo mientras se escribe (JSON, para los formularios de venta)
 
 """
 
 
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from TechSolutionsApp.models import Customer
+from TechSolutionsApp.services.customers import (
+    LOOKUP_LIMIT, after_cursor, encode_cursor, filter_customers, sales_summary, search_customers
+)
 from django.db.models import ProtectedError
-from TechSolutionsApp.views.authentication import login_required
+from TechSolutionsApp.permissions import login_required
 from django.db import IntegrityError
 
 
@@ -62,12 +68,58 @@ def add_customer(request):
 
 
 @login_required
-def view_customers(request):
+async def view_customers(request):
     '''
-    Función para ver los clientes, los carga en view_customers.html
-    '''    
-    customers = Customer.objects.all()
-    return render(request, 'customers/view_customers.html', {'customers': customers})
+    Directorio de clientes (asíncrona): búsqueda por nombre, cédula o correo y paginación por
+    cursor sobre el índice de la búsqueda, por lo que cada página cuesta lo mismo sin importar
+    la cantidad de clientes. Con ?stats=1 agrega la cantidad de ventas, la última compra y el
+    total comprado de los clientes de la página en una sola consulta agrupada
+    '''
+    query = request.GET.get('q', '').strip()
+    with_stats = request.GET.get('stats') == '1'
+    page_size = getattr(settings, 'CUSTOMERS_PAGE_SIZE', 50)
+
+    customers, ordering = filter_customers(Customer.objects.all(), query)
+    cursor = request.GET.get('cursor', '')
+    if cursor:
+        after = after_cursor(customers, ordering, cursor)
+        if after is None:
+            messages.warning(request, "La página solicitada no es válida, se muestra la primera")
+            cursor = ''
+        else:
+            customers = after
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    page = [customer async for customer in customers.order_by(*ordering)[:page_size + 1].aiterator()]
+    next_cursor = encode_cursor(page[page_size - 1], ordering) if len(page) > page_size else None
+    page = page[:page_size]
+
+    if with_stats and page:
+        summary = {row['customer_id']: row async for row in sales_summary(customer.pk for customer in page)}
+        for customer in page:
+            customer.summary = summary.get(customer.pk)
+
+    return render(request, 'customers/view_customers.html', {
+        'customers': page,
+        'query': query,
+        'with_stats': with_stats,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+    })
+
+
+@login_required
+async def lookup_customer(request):
+    '''
+    Retorna en JSON los primeros clientes cuya cédula, nombre, apellido o correo empieza con
+    el texto de ?q= (autocompletado de los formularios de venta). Cada búsqueda usa un índice
+    '''
+    try:
+        limit = min(max(int(request.GET.get('limit', LOOKUP_LIMIT)), 1), LOOKUP_LIMIT)
+    except ValueError:
+        limit = LOOKUP_LIMIT
+    customers = search_customers(request.GET.get('q', ''))[:limit]
+    return JsonResponse({'results': [customer async for customer in customers]})
 
 
 @login_required
@@ -14,33 +14,27 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from TechSolutionsApp.models import Employee, Role
 from django.db.models import ProtectedError
-from TechSolutionsApp.views.authentication import login_required
+from TechSolutionsApp.permissions import EMPLOYEES_MANAGE, login_required, permission_required
 
 
 @login_required
+@permission_required(EMPLOYEES_MANAGE)
 def view_employees(request):
     '''
     Función para ver los empleados, los carga en view_employees.html
     '''
-    role = request.session.get('role_id')
-
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
+    role = request.employee.role_id
     employees = Employee.objects.all()
 
     return render(request, 'employees/view_employees.html', {'employees': employees,'role': role})
 
 
 @login_required
+@permission_required(EMPLOYEES_MANAGE)
 def add_employee(request):
     '''
     Función para agregar un empleado/usuario
     '''  
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
     
     if request.method == 'POST':
         firstName = request.POST.get('firstName')
@@ -100,16 +94,12 @@ def add_employee(request):
 
 
 @login_required
+@permission_required(EMPLOYEES_MANAGE)
 def edit_employee(request, id):
     '''
     Función para editar un empleado
     '''
 
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
     employee = get_object_or_404(Employee, pk=id)
 
     if request.method == 'POST':
@@ -119,6 +109,7 @@ def edit_employee(request, id):
         phoneNumber = request.POST.get('phoneNumber', '').strip()
         current_password = request.POST.get('currentPassword', '').strip()
         new_password = request.POST.get('newPassword', '').strip()
+        is_active = request.POST.get('status', 'activo') == 'activo'
 
         errors = []
 
@@ -142,6 +133,10 @@ def edit_employee(request, id):
         if Employee.objects.filter(phoneNumber=phoneNumber).exclude(pk=employee.pk).exists():
             errors.append("Ya existe otro empleado con ese número de teléfono.")
 
+        # Un administrador no puede desactivar su propia cuenta
+        if not is_active and employee.pk == request.employee.id:
+            errors.append("No puedes desactivar tu propio usuario.")
+
 
         if errors:
             for error in errors:
@@ -152,6 +147,8 @@ def edit_employee(request, id):
         employee.lastName = lastName
         employee.idNumber = idNumber
         employee.phoneNumber = phoneNumber
+        # Al desactivarlo, sus sesiones abiertas se cierran en la siguiente petición
+        employee.isActive = is_active
         
         # Cambiar contraseña si se indicó
         if current_password and new_password:
@@ -165,14 +162,11 @@ def edit_employee(request, id):
 
 
 @login_required
+@permission_required(EMPLOYEES_MANAGE)
 def delete_employee(request, id):
     '''
     Elimina un empleado del sistema
     '''
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
     
     employee = get_object_or_404(Employee, pk=id)
 
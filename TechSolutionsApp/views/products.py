@@ -4,49 +4,90 @@ products.py
 Este módulo contiene las vistas relacionadas con la gestión de productos dentro del sistema,
 
 Funciones incluidas:
-- view_products: muestra todos los productos con filtros por nombre, SKU o categoría.
+- view_products: muestra los productos paginados con filtros por nombre, SKU o categoría (asíncrona).
 - add_product: permite agregar un nuevo producto y su cantidad inicial en inventario.
-- edit_product: permite modificar datos del producto y actualizar su inventario.
+- edit_product: permite modificar datos del producto y ajustar su inventario.
 - delete_product: elimina un producto (solo para usuarios administradores).
+- lookup_sku: retorna en JSON el producto con un SKU exacto (para lectores de código de barras, asíncrona).
+- import_products: carga masiva de productos e inventario desde un archivo CSV o JSONL.
 
 """
 
 
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from TechSolutionsApp.models import Product, Category, Inventory
-from django.db.models import Q
-from TechSolutionsApp.views.authentication import login_required
+from TechSolutionsApp.cache import catalog_cache
+from TechSolutionsApp.models import Product, Category, Inventory, StockMovement
+from TechSolutionsApp.services import stock as stock_service
+from TechSolutionsApp.search import search_products
+from TechSolutionsApp.services.product_import import (
+    ProductImportError, detect_format, import_products as run_product_import, iter_rows
+)
+from TechSolutionsApp.thumbnails import schedule_thumbnails
+from TechSolutionsApp.services.sku_lookup import alookup_sku as find_product_by_sku
+from TechSolutionsApp.permissions import PRODUCTS_MANAGE, login_required, permission_required
 
 @login_required
-def view_products(request):
+async def view_products(request):
     '''
     Función para cargar los productos en view_products.html, permite filtrar
-    por categoría, nombre o sku y asigna el inventario y categoría
+    por categoría, nombre o sku. Los resultados se paginan en el servidor y cada página
+    (productos con su categoría) se guarda en caché; el stock no se guarda en caché, se lee
+    en cada petición para los productos de la página con una sola consulta.
+    Es asíncrona: con ASGI el proceso atiende otras peticiones mientras espera a la base de datos
     '''
     
     query = request.GET.get('q', '')
     category_id = request.GET.get('category', '')  # Para el combobox
 
-    products = Product.objects.all()
-
-    if query:
-        products = products.filter(Q(name__icontains=query) | Q(sku__icontains=query))
+    # Categoría en la misma consulta (el stock se lee aparte, fuera de la caché)
+    products = Product.objects.select_related('category').order_by('name', 'productId')
 
     # Filtra los productos por categoría especificada (en caso de)
     if category_id and category_id != '0':
         products = products.filter(category__categoryId=category_id)
 
-    # Agregar stock
-    for product in products:
-        inventory = Inventory.objects.filter(product=product).first()
-        product.stock = inventory.productQuantity if inventory else 0
-
-    categories = Category.objects.all()
-    role = request.session.get('role_id')
+    # Búsqueda indexada por nombre, SKU o categoría, ordenada por relevancia
+    if query:
+        # En SQLite la búsqueda consulta la tabla FTS5 con un cursor, que no tiene versión asíncrona
+        products = await sync_to_async(search_products)(products, query)
+
+    page_size = _get_page_size(request)
+    page_number = request.GET.get('page')
+
+    async def load_page():
+        paginator = Paginator(products, page_size)
+        paginator.count = await products.acount()
+        page = paginator.get_page(page_number)
+        return paginator.count, page.number, [product async for product in page.object_list.aiterator()]
+
+    # La página (productos con su categoría) se guarda en caché según filtros y página
+    count, number, items = await catalog_cache.aget_or_set(
+        'products', ('view_products', query, category_id, page_number, page_size), load_page
+    )
+    # Stock actual de los productos de la página: las ventas no invalidan la caché del catálogo
+    levels = await stock_service.astock_levels(product.pk for product in items)
+    for product in items:
+        product.stock = levels.get(product.pk, 0)
+    paginator = Paginator(products, page_size)
+    paginator.count = count
+    page_obj = Page(items, number, paginator)
+
+    async def load_categories():
+        return [category async for category in Category.objects.all()]
+
+    categories = await catalog_cache.aget_or_set('categories', ('all',), load_categories)
+    role = (await request.aemployee()).role_id
 
     return render(request, 'products/view_products.html', {
-        'products': products,
+        'products': page_obj.object_list,
+        'page_obj': page_obj,
         'query': query,
         'role': role,
         'categories': categories,
@@ -54,19 +95,29 @@ def view_products(request):
     })
 
 
+def _get_page_size(request):
+    '''
+    Obtiene el tamaño de página solicitado, limitado por PRODUCTS_MAX_PAGE_SIZE
+    '''
+    default_size = getattr(settings, 'PRODUCTS_PAGE_SIZE', 25)
+    max_size = getattr(settings, 'PRODUCTS_MAX_PAGE_SIZE', 100)
+    try:
+        page_size = int(request.GET.get('page_size', default_size))
+    except ValueError:
+        return default_size
+    return min(max(page_size, 1), max_size)
+
+
 
 @login_required
+@permission_required(PRODUCTS_MANAGE)
 def edit_product(request, id):
     '''
     Función para editar un producto, carga los datos del producto en el formulario edit_product.html
     '''
-    
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
-    product = get_object_or_404(Product, pk=id)
+
+    # El stock actual (foto de inventario más movimientos) se obtiene en la misma consulta
+    product = get_object_or_404(Product.objects.with_stock(), pk=id)
 
     if request.method == 'POST':
         name = request.POST.get('name')
@@ -93,12 +144,7 @@ def edit_product(request, id):
             return redirect('edit_product', id=id)
 
 
-        try:
-            inventory = Inventory.objects.get(product=product)
-            current_stock = inventory.productQuantity
-        except Inventory.DoesNotExist:
-            inventory = None
-            current_stock = 0
+        current_stock = product.stock
             
         # Validar o conservar el stock
         if stock_input is None or stock_input.strip() == '':
@@ -120,25 +166,27 @@ def edit_product(request, id):
         product.status = is_active
         if image:
             product.image = image
+            # Las miniaturas de la imagen anterior ya no aplican hasta generar las nuevas
+            product.thumbnailSizes = ''
         product.save()
 
-        # Actualizar cantidad en inventario
-        if inventory is None:
-            inventory = Inventory(product=product)
-        inventory.productQuantity = stock
-        inventory.save()
+        # Las miniaturas se generan en segundo plano para no bloquear la petición
+        if image:
+            schedule_thumbnails(product.image.name)
+
+        # La diferencia con el stock actual se registra como un ajuste manual
+        if stock != current_stock:
+            stock_service.record_movements([StockMovement(
+                product=product, quantity=stock - current_stock,
+                kind=StockMovement.ADJUSTMENT, employee_id=request.employee.id
+            )])
 
         messages.success(request, 'Producto actualizado exitosamente.')
         return redirect('view_products')
 
     else:
         categories = Category.objects.all()
-        # Obtener stock actual
-        try:
-            inventory = Inventory.objects.get(product=product)
-            stock_quantity = inventory.productQuantity
-        except Inventory.DoesNotExist:
-            stock_quantity = 0
+        stock_quantity = product.stock
 
         context = {
             'product': product,
@@ -150,16 +198,12 @@ def edit_product(request, id):
 
 
 @login_required
+@permission_required(PRODUCTS_MANAGE)
 def delete_product(request, id):
     '''
     Función para eliminar un producto, recibe el id desde view_products.html
     '''
-    
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
+
     product = get_object_or_404(Product, productId=id)
     
     if request.method == 'POST':
@@ -168,17 +212,12 @@ def delete_product(request, id):
 
 
 @login_required
+@permission_required(PRODUCTS_MANAGE)
 def add_product(request):
     '''
     Función para agregar un producto, valida los datos y asigna la categoría y el inventario
     '''
-    
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
-    
-    
+
     if request.method == 'POST':
         name = request.POST.get('name')
         price = request.POST.get('price')
@@ -222,8 +261,15 @@ def add_product(request):
         )
         product.save()
 
-        # Crear entrada de inventario con el stock ingresado
-        Inventory.objects.create(product=product, productQuantity=stock)
+        # Crear la foto de inventario y registrar el stock ingresado como reabastecimiento
+        Inventory.objects.create(product=product, productQuantity=0)
+        stock_service.record_movements([StockMovement(
+            product=product, quantity=stock, kind=StockMovement.RESTOCK, employee_id=request.employee.id
+        )])
+
+        # Las miniaturas se generan en segundo plano para no bloquear la petición
+        if product.image:
+            schedule_thumbnails(product.image.name)
 
         messages.success(request, 'Producto agregado exitosamente.')
         return redirect('add_product')
@@ -233,3 +279,44 @@ def add_product(request):
         return render(request, 'products/add_product.html', {'categories': categories})
 
 
+@login_required
+async def lookup_sku(request, sku):
+    '''
+    Función para buscar un producto activo por SKU exacto, retorna id, nombre, precio y stock
+    en JSON sin pasar por el motor de plantillas. Usa una caché en memoria con TTL
+    '''
+    product = await find_product_by_sku(sku)
+    if product is None:
+        return JsonResponse({'error': 'Producto no encontrado'}, status=404)
+    return JsonResponse(product)
+
+
+@login_required
+@permission_required(PRODUCTS_MANAGE)
+def import_products(request):
+    '''
+    Función para importar productos desde un archivo CSV o JSONL (solo administradores).
+    El archivo subido se procesa fila por fila sin cargarlo completo en memoria
+    '''
+
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Debe seleccionar un archivo.')
+            return redirect('import_products')
+
+        try:
+            file_format = detect_format(upload.name)
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = run_product_import(iter_rows(stream, file_format))
+        except (UnicodeDecodeError, ProductImportError) as e:
+            messages.error(request, f'No se pudo importar el archivo: {e}')
+            return redirect('import_products')
+
+        if result.error_count:
+            messages.warning(request, f'Importación terminada con errores: {result}.')
+        else:
+            messages.success(request, f'Importación terminada: {result}.')
+
+    return render(request, 'products/import_products.html', {'result': result})
@@ -0,0 +1,143 @@
+"""
+reports.py
+
+Contiene las vistas de reportes de ventas para administradores.
+
+Los reportes se construyen únicamente a partir de las tablas de resumen diario
+(DailyProductSales, DailyCategorySales y DailyEmployeeSales), nunca sobre
+Sale/SaleDetail, para no afectar el registro de ventas en caja. La exportación es la excepción:
+lee Sale/SaleDetail por lotes acotados.
+
+Funciones incluidas:
+- sales_report: ingresos por día, semana o mes agrupados por producto, categoría o empleado.
+- cache_stats: contadores de las cachés del catálogo, de SKU y del empleado autenticado, con el
+  tiempo promedio de autenticación por petición (JSON).
+- export_sales: descarga de ventas o líneas de venta en CSV/JSONL (opcionalmente gzip), generada por partes.
+"""
+
+from datetime import date, timedelta
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect
+from django.contrib import messages
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from TechSolutionsApp.cache import catalog_cache
+from TechSolutionsApp.models import DailyCategorySales, DailyEmployeeSales, DailyProductSales
+from TechSolutionsApp.services import sales_export, sku_lookup
+from TechSolutionsApp.services.rollups import rollup_coverage
+from TechSolutionsApp.permissions import REPORTS_VIEW, auth_stats, login_required, permission_required
+
+
+# Tabla de resumen, campos que identifican cada fila y columna de cantidad para cada dimensión
+DIMENSIONS = {
+    'product': (DailyProductSales, ('product_id', 'product__name'), 'quantity'),
+    'category': (DailyCategorySales, ('category_id', 'category__name'), 'quantity'),
+    'employee': (DailyEmployeeSales, ('employee_id', 'employee__firstName', 'employee__lastName'), 'saleCount'),
+}
+
+PERIODS = {
+    'day': lambda: F('day'),
+    'week': lambda: TruncWeek('day'),
+    'month': lambda: TruncMonth('day'),
+}
+
+
+@login_required
+@permission_required(REPORTS_VIEW)
+def sales_report(request):
+    '''
+    Función para mostrar los ingresos por periodo (día, semana o mes) y dimensión
+    (producto, categoría o empleado) en un rango de fechas
+    '''
+    
+    role = request.employee.role_id
+
+    dimension = request.GET.get('dimension', 'product')
+    period = request.GET.get('period', 'day')
+    if dimension not in DIMENSIONS:
+        dimension = 'product'
+    if period not in PERIODS:
+        period = 'day'
+
+    today = date.today()
+    try:
+        date_from = date.fromisoformat(request.GET.get('date_from') or (today - timedelta(days=30)).isoformat())
+        date_to = date.fromisoformat(request.GET.get('date_to') or today.isoformat())
+    except ValueError:
+        messages.warning(request, "El rango de fechas no es válido, se muestran los últimos 30 días")
+        date_from, date_to = today - timedelta(days=30), today
+
+    model, fields, quantity_field = DIMENSIONS[dimension]
+    rows = list(model.objects.filter(day__gte=date_from, day__lte=date_to)
+                .annotate(period=PERIODS[period]())
+                .values('period', *fields)
+                .annotate(units=Sum(quantity_field), amount=Sum('revenue'))
+                .order_by('-period', '-amount'))
+
+    # Nombre a mostrar según la dimensión (los productos sin categoría quedan como "Sin categoría")
+    for row in rows:
+        row['label'] = ' '.join(str(row[field]) for field in fields[1:] if row[field]) or 'Sin categoría'
+
+    first_day, last_day, high_water_mark = rollup_coverage()
+
+    return render(request, 'reports/sales_report.html', {
+        'rows': rows,
+        'dimension': dimension,
+        'period': period,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'total_revenue': sum(row['amount'] for row in rows),
+        'first_day': first_day,
+        'last_day': last_day,
+        'high_water_mark': high_water_mark,
+        'role': role,
+    })
+
+
+@login_required
+@permission_required(REPORTS_VIEW, json_response=True)
+def cache_stats(request):
+    '''
+    Función para consultar los contadores de las cachés de este proceso en JSON
+    '''
+
+    return JsonResponse({
+        'catalog': catalog_cache.stats(),
+        'sku': sku_lookup.cache_stats(),
+        'auth': auth_stats(),
+    })
+
+
+@login_required
+@permission_required(REPORTS_VIEW)
+def export_sales(request):
+    '''
+    Función para descargar las ventas (kind=sales) o sus líneas (kind=details) de un rango
+    de fechas en CSV o JSONL. Con compress=gzip el archivo se envía comprimido
+    '''
+
+    kind = request.GET.get('kind', 'details')
+    file_format = request.GET.get('format', 'csv')
+    compressed = request.GET.get('compress') == 'gzip'
+    if kind not in sales_export.KINDS or file_format not in sales_export.FORMATS:
+        messages.error(request, "El tipo o formato de exportación no es válido")
+        return redirect('sales_report')
+
+    try:
+        date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else None
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else None
+    except ValueError:
+        messages.error(request, "El rango de fechas no es válido")
+        return redirect('sales_report')
+
+    chunks = sales_export.export_sales(kind, file_format, date_from, date_to)
+    content_type = 'text/csv; charset=utf-8' if file_format == 'csv' else 'application/x-ndjson; charset=utf-8'
+    if compressed:
+        chunks = sales_export.gzip_chunks(chunks)
+        content_type = 'application/gzip'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    filename = sales_export.export_filename(kind, file_format, date_from, date_to, compressed)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,10 +1,28 @@
+import json
+from itertools import islice
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from TechSolutionsApp.models import Sale, SaleDetail, Customer, Product, Inventory, Employee
-from TechSolutionsApp.views.authentication import login_required
-from django.db.models import Q
+from TechSolutionsApp.models import Sale, SaleDetail, Product, Employee
+from TechSolutionsApp.search import search_products
+from TechSolutionsApp.services import checkout, stock
+from TechSolutionsApp.services.cart import CartError, SessionCart
+from TechSolutionsApp.services.checkout import CheckoutError
+from TechSolutionsApp.services.sale_amendment import AmendmentError, amend_sale
+from TechSolutionsApp.services.sale_reversal import ReversalError, return_items, void_sales
+from TechSolutionsApp.services.sale_ingestion import (
+    MAX_BYTES, MAX_RECORDS, SaleIngestionError, ingest_sales as run_sale_ingestion, iter_records
+)
+from TechSolutionsApp.services.customers import CREATED, EMAIL_UPDATED, CustomerError, resolve_customer
+from TechSolutionsApp.services.sku_lookup import lookup_sku
+from TechSolutionsApp.permissions import SALES_MANAGE, login_required, permission_required
+from django.db.models import Prefetch, Q
 from django.utils import timezone
-from django.db import IntegrityError
 
 
 '''
@@ -32,7 +50,13 @@ def add_sale(request):
     elif request.method == 'POST':
         _save_data_to_session(request, customer_data)
 
-        if not _has_at_least_one_product(request, Product.objects.all()):
+        # Solo se envía el id del carrito, las líneas están en la sesión
+        cart = SessionCart(request.session)
+        if request.POST.get('cart_id') != cart.id:
+            messages.error(request, "El carrito ya fue procesado o cambió, verifique la venta")
+            return redirect('add_sale')
+
+        if not len(cart):
             messages.error(request, "Debe agregar al menos un producto a la venta")
             return redirect('add_sale')
 
@@ -40,8 +64,9 @@ def add_sale(request):
         if not customer:
             return redirect('add_sale')   
 
-        if _register_sale(request, customer):
+        if _register_sale(request, customer, cart):
             messages.success(request, "Venta registrada exitosamente")
+            cart.clear()
             request.session.pop('sale_form_data', None)
             return redirect('add_sale')
 
@@ -61,196 +86,294 @@ def _save_data_to_session(request, customer_data):
             customer_data[key] = request.POST.get(key)
     request.session['sale_form_data'] = customer_data
 
-def _register_sale(request, customer):
+def _register_sale(request, customer, cart):
+    '''
+    Registra la venta del carrito mediante el servicio de cobro, que aplica todo o nada
+    '''
     try:
-        sale = Sale.objects.create(
+        checkout.register_sale(
             customer=customer,
-            user=Employee.objects.get(employeeId=request.session.get('employee_id')),
-            saleDate=timezone.now(),
-            discountPercentage=request.POST.get('discount', 0)
+            employee_id=request.employee.id,
+            discount=request.POST.get('discount', 0),
+            lines=cart.checkout_lines(),
+            cart_id=cart.id
         )
-
-        _create_sale_details(request, sale, Product.objects.all())
         return True
 
+    except CheckoutError as e:
+        messages.error(request, str(e))
+        return False
     except Exception as e:
         messages.error(request, f"Error al procesar la venta: {str(e)}")
         return False
 
-# Procesa los datos del cliente desde el formulario, crea o actualiza el cliente si es necesario
+# Obtiene, crea o actualiza el cliente con los datos del formulario (una consulta, ver services/customers.py)
 def _process_customer_data(request):
-    first_name = request.POST.get('customer_name', '').strip()
-    last_name = request.POST.get('customer_last_name', '').strip()
-    
-    id_number = request.POST.get('customer_id', '').strip()
-    if not id_number.isdigit() or len(id_number) != 9:
-        messages.error(request, "La cédula debe contener solo números y tener 9 dígitos.")
-        return None
-    
-    email = request.POST.get('customer_email', '').strip().lower()
-
-    if not all([first_name, last_name, id_number]):
-        messages.error(request, "Nombre, apellido e identificación son obligatorios")
-        return None
-
-    existing_customer = Customer.objects.filter(idNumber=id_number).first()
-    
-    if existing_customer:
-        # Verificar coincidencia de datos
-        if (request.POST.get('customer_name', '').strip().lower() != existing_customer.firstName.lower() or
-            request.POST.get('customer_last_name', '').strip().lower() != existing_customer.lastName.lower()):
-            
-            messages.error(
-                request,
-                f"Error: La cédula {id_number} pertenece a {existing_customer.firstName} {existing_customer.lastName}. "
-                "Por favor ingrese los datos correctos o use otra cédula."
-            )
-            return None
-
-    try:      
-        customer = Customer.objects.filter(idNumber=id_number).first() # Buscar cliente por cédula
-        
-        if customer:
-            # Cliente existe, verificar y actualizar email si es diferente y no está vacío
-            if email and email != customer.email:
-                # Verifica si el nuevo email no existe en otro cliente
-                if Customer.objects.filter(email=email).exclude(idNumber=id_number).exists():
-                    messages.error(request, "El correo electrónico ya está registrado para otro cliente")
-                    return None
-                
-                customer.email = email
-                customer.save()
-                messages.info(request, "Correo electrónico del cliente actualizado")
-            return customer
-        else:
-            # Crea nuevo cliente
-            customer_data = {
-                'firstName': first_name,
-                'lastName': last_name,
-                'idNumber': id_number,
-                'email': email if email else None  
-            }
-
-            if email and Customer.objects.filter(email=email).exists():
-                messages.error(request, "El correo electrónico ya está registrado")
-                return None
-                
-            customer = Customer.objects.create(**customer_data)
-            messages.success(request, "Nuevo cliente registrado exitosamente")
-            return customer
-
-    except IntegrityError as e:
-        messages.error(request, "Error al registrar el cliente: La cédula ya existe")
+    try:
+        customer, action = resolve_customer(
+            request.POST.get('customer_name', ''),
+            request.POST.get('customer_last_name', ''),
+            request.POST.get('customer_id', ''),
+            request.POST.get('customer_email', ''),
+        )
+    except CustomerError as e:
+        messages.error(request, str(e))
         return None
     except Exception as e:
         messages.error(request, f"Error al procesar cliente: {str(e)}")
         return None
 
-
-def _has_at_least_one_product(request, products):
-    '''
-    Verifica que se haya seleccionado al menos un producto con cantidad mayor a cero
-    '''
-    for product in products:
-        quantity = request.POST.get(f'quantity_{product.productId}')
-        if quantity and int(quantity) > 0:
-            return True
-    return False
-
-
-def _create_sale_details(request, sale, products):
-    '''
-    Crea los detalles de venta y actualiza el inventario
-    '''
-    for product in products:
-        quantity = request.POST.get(f'quantity_{product.productId}')
-        if quantity and int(quantity) > 0:
-            quantity = int(quantity)
-
-            SaleDetail.objects.create(
-                sale=sale,
-                product=product,
-                quantity=quantity,
-                unitPrice=product.price
-            )
-
-            inventory = Inventory.objects.filter(product=product).first()
-            if inventory:
-                if inventory.productQuantity >= quantity:
-                    inventory.productQuantity -= quantity
-                    inventory.save()
-                else:
-                    messages.error(request, f"No hay suficiente inventario para {product.name}")
+    if action == CREATED:
+        messages.success(request, "Nuevo cliente registrado exitosamente")
+    elif action == EMAIL_UPDATED:
+        messages.info(request, "Correo electrónico del cliente actualizado")
+    return customer
 
 
 def _render_add_sale_form(request, customer_data):
     """
-    Renderiza la vista del formulario de agregar venta con productos filtrados
+    Renderiza la vista del formulario de agregar venta con productos filtrados y el carrito actual.
+    Se muestra una cantidad limitada de productos, el resto se encuentra con la búsqueda o el lector
     """
     query = request.GET.get('q', '')
+    limit = getattr(settings, 'ADD_SALE_PRODUCTS_LIMIT', 50)
     
-    # Solo se muestran productos activos
-    products = Product.objects.filter(status=True)
+    # Solo se muestran productos activos con unidades disponibles (contador de Inventory, sin sumar
+    # el historial de movimientos). No se guarda en caché: la lista cambia con cada venta
+    products = Product.objects.filter(status=True, inventory__available__gt=0).order_by('name', 'productId')
 
+    # Búsqueda indexada por nombre, SKU o categoría, ordenada por relevancia
     if query:
-        products = products.filter(Q(name__icontains=query) | Q(sku__icontains=query))
+        products = search_products(products, query)
+    products = list(products[:limit + 1])
 
-    filtered_products = []
-    for product in products:
-        inventory = Inventory.objects.filter(product=product).first()
-        stock = inventory.productQuantity if inventory else 0
-        if stock > 0:
-            product.stock = stock
-            filtered_products.append(product)
+    # Stock de los productos mostrados en una sola consulta
+    levels = stock.stock_levels(product.pk for product in products[:limit])
+    for product in products[:limit]:
+        product.stock = levels.get(product.pk, 0)
 
     return render(request, 'sales/add_sale.html', {
-        'products': filtered_products,
+        'products': products[:limit],
+        'has_more_products': len(products) > limit,
         'query': query,
-        'customer_data': customer_data
+        'customer_data': customer_data,
+        'cart': SessionCart(request.session).as_dict(),
     })
 
 
 @login_required
-def view_sales(request):
+def cart_detail(request):
     '''
-    Muestra la lista de ventas registradas con subtotal, descuento y total calculado
+    Retorna en JSON el carrito de la venta en curso
     '''
-    sales = Sale.objects.all().order_by('-saleDate').prefetch_related('saledetail_set', 'user', 'customer')
-    role = request.session.get('role_id')
-    
-    for sale in sales:
-        sale.subtotal = sum(detail.quantity * detail.unitPrice for detail in sale.saledetail_set.all())
-        discount = sale.subtotal * (sale.discountPercentage / 100)
-        sale.total = sale.subtotal - discount
+    return JsonResponse(SessionCart(request.session).as_dict())
+
+
+@login_required
+@require_POST
+def cart_add(request):
+    '''
+    Agrega un producto al carrito por product_id o por SKU (lector de código de barras)
+    '''
+    data = _read_json(request)
+    cart = SessionCart(request.session)
+    try:
+        product_id = data.get('product_id')
+        if not product_id and data.get('sku'):
+            product = lookup_sku(data['sku'])
+            if product is None:
+                raise CartError("No existe un producto activo con ese SKU")
+            product_id = product['productId']
+        cart.add(product_id, data.get('quantity', 1))
+    except CartError as e:
+        return JsonResponse({'error': str(e), 'cart': cart.as_dict()}, status=400)
+    return JsonResponse(cart.as_dict())
+
+
+@login_required
+@require_POST
+def cart_update(request):
+    '''
+    Cambia la cantidad de una línea del carrito (cantidad 0 la elimina)
+    '''
+    data = _read_json(request)
+    cart = SessionCart(request.session)
+    try:
+        cart.update(data.get('product_id'), data.get('quantity'))
+    except CartError as e:
+        return JsonResponse({'error': str(e), 'cart': cart.as_dict()}, status=400)
+    return JsonResponse(cart.as_dict())
+
+
+@login_required
+@require_POST
+def cart_remove(request):
+    '''
+    Elimina una línea del carrito
+    '''
+    data = _read_json(request)
+    cart = SessionCart(request.session)
+    try:
+        cart.remove(data.get('product_id'))
+    except CartError as e:
+        return JsonResponse({'error': str(e), 'cart': cart.as_dict()}, status=400)
+    return JsonResponse(cart.as_dict())
+
+
+def _read_json(request):
+    '''
+    Lee el cuerpo JSON de la petición, o los datos del formulario si no es JSON
+    '''
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+@login_required
+async def view_sales(request):
+    '''
+    Muestra la lista de ventas registradas (las anuladas se marcan como tales) con sus totales persistidos. Permite filtrar por rango de fechas, empleado y cédula del cliente,
+    y pagina por cursor (saleDate, saleId) para que el costo dependa solo del tamaño de página.
+    Es asíncrona: todas las consultas usan el ORM asíncrono y se completan antes de renderizar
+    '''
+    role = (await request.aemployee()).role_id
+    page_size = getattr(settings, 'SALES_PAGE_SIZE', 20)
+    filters = {
+        'date_from': request.GET.get('date_from', '').strip(),
+        'date_to': request.GET.get('date_to', '').strip(),
+        'employee': request.GET.get('employee', '').strip(),
+        'customer': request.GET.get('customer', '').strip(),
+    }
+
+    # Los totales están persistidos en la venta, no es necesario recorrer los detalles
+    sales = (_filter_sales(request, Sale.objects.all(), filters)
+             .select_related('user', 'customer', 'voidedBy')
+             .order_by('-saleDate', '-saleId'))
+
+    cursor = _decode_sales_cursor(request.GET.get('cursor', ''))
+    if cursor:
+        cursor_date, cursor_id = cursor
+        sales = sales.filter(Q(saleDate__lt=cursor_date) | Q(saleDate=cursor_date, saleId__lt=cursor_id))
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    page = [sale async for sale in sales.prefetch_related(
+        Prefetch('saledetail_set', queryset=SaleDetail.objects.select_related('product'))
+    )[:page_size + 1].aiterator(chunk_size=page_size + 1)]
+    next_cursor = _encode_sales_cursor(page[page_size - 1]) if len(page) > page_size else None
+    page = page[:page_size]
+    employees = [employee async for employee in
+                 Employee.objects.order_by('firstName', 'lastName').only('employeeId', 'firstName', 'lastName')]
+
     return render(request, 'sales/view_sales.html', {
-        'sales': sales,
-        'role': role
+        'sales': page,
+        'role': role,
+        'filters': filters,
+        'employees': employees,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
         })
 
 
+def _filter_sales(request, sales, filters):
+    '''
+    Aplica los filtros de fecha, empleado y cliente. Los filtros inválidos se ignoran
+    con un mensaje de advertencia
+    '''
+    try:
+        if filters['date_from']:
+            start = datetime.combine(date.fromisoformat(filters['date_from']), time.min)
+            sales = sales.filter(saleDate__gte=timezone.make_aware(start))
+        if filters['date_to']:
+            # Fecha final inclusiva: se compara contra el inicio del día siguiente
+            end = datetime.combine(date.fromisoformat(filters['date_to']) + timedelta(days=1), time.min)
+            sales = sales.filter(saleDate__lt=timezone.make_aware(end))
+    except ValueError:
+        messages.warning(request, "El rango de fechas no es válido")
+
+    if filters['employee'].isdigit():
+        sales = sales.filter(user_id=int(filters['employee']))
+
+    if filters['customer']:
+        if filters['customer'].isdigit():
+            sales = sales.filter(customer__idNumber=int(filters['customer']))
+        else:
+            messages.warning(request, "La cédula del cliente debe contener solo números")
+    return sales
+
+
+def _encode_sales_cursor(sale):
+    '''
+    Codifica la posición (saleDate, saleId) de la última venta mostrada
+    '''
+    raw = f"{sale.saleDate.isoformat()}|{sale.saleId}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_sales_cursor(cursor):
+    '''
+    Decodifica el cursor de paginación, retorna None si no es válido
+    '''
+    if not cursor:
+        return None
+    try:
+        sale_date, sale_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(sale_date), int(sale_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
 @login_required
+@require_POST
+def ingest_sales(request):
+    '''
+    Registra por lotes las ventas que las cajas hicieron sin conexión (JSON o JSONL, formato en
+    sale_ingestion). Las ventas cuya clave ya está registrada se ignoran, por lo que la caja
+    puede reenviar el lote completo si no recibió la respuesta
+    '''
+    file_format = 'jsonl' if request.content_type in ('application/x-ndjson', 'application/jsonl') else 'json'
+    # El cuerpo se lee como flujo (un lote grande supera DATA_UPLOAD_MAX_MEMORY_SIZE), por lo que
+    # su tamaño se valida aquí antes de leerlo
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or '')
+    except ValueError:
+        return JsonResponse({'error': 'Se requiere el encabezado Content-Length'}, status=411)
+    if content_length > MAX_BYTES:
+        return JsonResponse({'error': f'El lote no puede superar {MAX_BYTES // (1024 * 1024)} MB'}, status=413)
+    try:
+        records = list(islice(iter_records(request, file_format), MAX_RECORDS + 1))
+    except SaleIngestionError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if len(records) > MAX_RECORDS:
+        return JsonResponse({'error': f'Se pueden enviar como máximo {MAX_RECORDS} ventas por lote'}, status=400)
+
+    result = run_sale_ingestion(records, request.employee.id)
+    return JsonResponse(result.as_dict())
+
+
+@login_required
+@permission_required(SALES_MANAGE)
 def edit_sale(request, id):
     '''
-    Edita una venta existente, validando que las nuevas cantidades no superen el inventario
+    Edita una venta existente: cliente, descuento, cantidades, líneas nuevas (por SKU) y líneas
+    eliminadas (cantidad cero). Todos los cambios se aplican juntos o ninguno (sale_amendment)
     ''' 
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
 
-    sale = get_object_or_404(Sale, saleId=id)
-    customers = Customer.objects.all()
-    details = SaleDetail.objects.filter(sale=sale)
+    # El cliente se elige con el autocompletado (lookup_customer), no se carga la lista de clientes
+    sale = get_object_or_404(Sale.objects.active().select_related('customer'), saleId=id)
 
     if request.method == 'POST':
-        customer_id = request.POST.get('customer')
-        discount = request.POST.get('discount') or 0
-
-        sale.customer = get_object_or_404(Customer, customerId=customer_id)
-        sale.discountPercentage = discount
-        sale.save()
-
-        if _update_sale_details(request, details):
+        try:
+            lines = _read_amendment_lines(request, sale)
+            amend_sale(sale.saleId, request.employee.id, lines,
+                       customer_id=request.POST.get('customer') or None,
+                       discount=request.POST.get('discount') or 0)
+        except AmendmentError as e:
+            for error in e.errors:
+                messages.error(request, error)
             return redirect('edit_sale', id=id)
 
         messages.success(request, "Venta actualizada exitosamente")
@@ -258,67 +381,86 @@ def edit_sale(request, id):
 
     return render(request, 'sales/edit_sale.html', {
         'sale': sale,
-        'customers': customers,
-        'details': details,
+        'details': SaleDetail.objects.filter(sale=sale).select_related('product'),
     })
 
 
-def _update_sale_details(request, details):
+def _read_amendment_lines(request, sale):
     '''
-    Valida y actualiza cada detalle de la venta, considerando el inventario.
-    Retorna True si hubo algún error.
+    Retorna {product_id: cantidad} con las cantidades del formulario (quantity_<id>) y la línea
+    nueva (add_sku, add_quantity); si el producto ya está en la venta se suman las unidades
     '''
-    error_occurred = False
-
-    for detail in details:
-        quantity_str = request.POST.get(f'quantity_{detail.product.productId}')
-        if quantity_str:
+    lines = {}
+    for key, value in request.POST.items():
+        if key.startswith('quantity_') and key[len('quantity_'):].isdigit() and value.strip():
+            lines[int(key[len('quantity_'):])] = value.strip()
+
+    sku = request.POST.get('add_sku', '').strip()
+    if sku:
+        product = lookup_sku(sku)
+        if product is None:
+            raise AmendmentError([f'No existe un producto activo con el SKU {sku}'])
+        try:
+            quantity = int(request.POST.get('add_quantity') or 1)
+        except ValueError:
+            raise AmendmentError([f'Cantidad inválida para {product["name"]}'])
+        current = lines.get(product['productId'])
+        if current is not None:
             try:
-                new_quantity = int(quantity_str)
-
-                if new_quantity <= 0:
-                    messages.error(request, f'La cantidad de {detail.product.name} debe ser mayor a cero.')
-                    error_occurred = True
-                    continue
-
-                inventory = Inventory.objects.get(product=detail.product)
-                available_stock = inventory.productQuantity + detail.quantity
-
-                if new_quantity > available_stock:
-                    messages.error(
-                        request,
-                        f'No hay suficiente inventario para {detail.product.name}. '
-                        f'Disponible: {available_stock}, solicitado: {new_quantity}'
-                    )
-                    error_occurred = True
-                    continue
-
-                inventory.productQuantity = available_stock - new_quantity
-                inventory.save()
-
-                detail.quantity = new_quantity
-                detail.save()
-
+                quantity += int(current)
             except ValueError:
-                messages.error(request, f'Cantidad inválida para {detail.product.name}')
-                error_occurred = True
-
-    return error_occurred
+                raise AmendmentError([f'Cantidad inválida para {product["name"]}'])
+        else:
+            existing = (SaleDetail.objects.filter(sale=sale, product_id=product['productId'])
+                        .values_list('quantity', flat=True).first())
+            quantity += existing or 0
+        lines[product['productId']] = quantity
+    return lines
 
 @login_required
+@permission_required(SALES_MANAGE)
 def delete_sale(request, id):
     '''
-    Elimina una venta del sistema
+    Anula una venta del sistema y devuelve sus unidades al inventario
     ''' 
-    role = request.session.get('role_id')
-    if role != 1:
-        messages.error(request, "No tienes permiso para acceder a esta sección.")
-        return redirect('home')
     
-    sale = get_object_or_404(Sale, saleId=id)
+    sale = get_object_or_404(Sale.objects.active(), saleId=id)
 
     if request.method == 'POST':
-        sale.delete()
+        void_sales([sale.saleId], request.employee.id)
+        messages.success(request, "Venta anulada exitosamente, el inventario fue restaurado")
 
-    messages.success(request, "Venta eliminada exitosamente")
     return redirect('view_sales')
+
+
+@login_required
+@permission_required(SALES_MANAGE)
+def return_sale(request, id):
+    '''
+    Registra la devolución de unidades de una venta (returned_<id>) y las devuelve al inventario
+    '''
+    sale = get_object_or_404(Sale.objects.active().select_related('customer'), saleId=id)
+
+    if request.method == 'POST':
+        lines = {
+            int(key[len('returned_'):]): value.strip()
+            for key, value in request.POST.items()
+            if key.startswith('returned_') and key[len('returned_'):].isdigit() and value.strip()
+        }
+        try:
+            sale = return_items(sale.saleId, request.employee.id, lines)
+        except ReversalError as e:
+            for error in e.errors:
+                messages.error(request, error)
+            return redirect('return_sale', id=id)
+
+        if sale is None:
+            messages.success(request, "Se devolvieron todos los productos, la venta fue anulada")
+        else:
+            messages.success(request, "Devolución registrada exitosamente")
+        return redirect('view_sales')
+
+    return render(request, 'sales/return_sale.html', {
+        'sale': sale,
+        'details': SaleDetail.objects.filter(sale=sale).select_related('product'),
+    })
@@ -3,14 +3,23 @@ ASGI config for TechSolutionsProject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with an ASGI server, e.g. ``uvicorn TechSolutionsProject.asgi:application --workers 4``.
+With ``DEBUG`` enabled the static files are also served, as ``runserver`` does.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TechSolutionsProject.settings')
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
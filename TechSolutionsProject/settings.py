@@ -19,6 +19,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Tamaños (px) de las miniaturas WebP de productos y cantidad de hilos que las generan
+PRODUCT_THUMBNAIL_SIZES = (64, 160, 320)
+THUMBNAIL_WORKERS = 2
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -45,11 +49,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'TechSolutionsApp.middleware.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'TechSolutionsApp.middleware.EmployeeAuthMiddleware',
+    'TechSolutionsApp.middleware.ProfilingMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -71,6 +78,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'TechSolutionsProject.wsgi.application'
+ASGI_APPLICATION = 'TechSolutionsProject.asgi.application'
 
 
 # Database
@@ -125,6 +133,106 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 
+# Pagination
+# Tamaño de página por defecto y máximo permitido (?page_size=) en el listado de productos
+
+PRODUCTS_PAGE_SIZE = 25
+PRODUCTS_MAX_PAGE_SIZE = 100
+
+# Ventas por página en view_sales (paginación por cursor)
+SALES_PAGE_SIZE = 20
+
+# Clientes por página en el directorio de clientes (paginación por cursor)
+CUSTOMERS_PAGE_SIZE = 50
+
+# Coincidencias del autocompletado de clientes en los formularios de venta
+CUSTOMER_LOOKUP_LIMIT = 10
+
+# Máximo de productos listados en el formulario de venta (el resto se encuentra con la búsqueda)
+ADD_SALE_PRODUCTS_LIMIT = 50
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Caché local en memoria por defecto, válida solo con un proceso (runserver o un único worker).
+# Con varios procesos (--workers de uvicorn/gunicorn) se requiere un backend compartido, Redis o
+# Memcached: la invalidación del catálogo incrementa un contador de generación en la caché y con
+# LocMemCache cada proceso tiene el suyo, por lo que los demás seguirían mostrando datos anteriores
+# hasta CATALOG_CACHE_TIMEOUT. Ejemplo:
+#     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#     'LOCATION': 'redis://127.0.0.1:6379',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'techsolutions',
+    }
+}
+
+# Segundos que se conservan los listados del catálogo (se invalidan antes por señales).
+# Los listados no guardan stock: se lee de la base de datos en cada petición
+CATALOG_CACHE_TIMEOUT = 300
+
+# Caché en memoria de la búsqueda exacta por SKU (lectores de código de barras)
+# TTL en segundos: tiempo máximo que otro proceso puede mostrar un stock desactualizado
+
+SKU_CACHE_SIZE = 2048
+SKU_CACHE_TTL = 30
+
+# Caché en memoria del empleado autenticado y sus permisos (EmployeeAuthMiddleware)
+# TTL en segundos: tiempo máximo que otro proceso tarda en aplicar un cambio de rol o una desactivación
+
+AUTH_CACHE_SIZE = 1024
+AUTH_CACHE_TTL = 30
+
+
+# Movimientos de inventario (services/stock.py)
+# Antigüedad mínima en segundos de los movimientos que compact_stock_movements incorpora a la foto del inventario
+
+STOCK_COMPACTION_DELAY = 300
+
+# Segundos que un carrito en curso conserva apartadas sus unidades (se renuevan con cada cambio del carrito)
+CART_RESERVATION_TIMEOUT = 900
+
+# Reintentos de un cobro o reserva cuando la base de datos lo rechaza por un bloqueo (deadlock, tiempo de espera)
+STOCK_MAX_RETRIES = 5
+
+# Ventas y tamaño máximo del cuerpo (bytes) por petición al endpoint de registro por lotes de las
+# cajas sin conexión (sales/batch/)
+SALE_BATCH_MAX_RECORDS = 10000
+SALE_BATCH_MAX_BYTES = 20 * 1024 * 1024
+
+
+# Instrumentación SQL por petición (QueryInstrumentationMiddleware)
+# Agrega el encabezado Server-Timing y registra una línea JSON por petición en el logger TechSolutionsApp.sql;
+# se marca como posible N+1 la petición que ejecuta la misma consulta más de SQL_REPEATED_QUERY_THRESHOLD veces
+
+SQL_INSTRUMENTATION = DEBUG
+SQL_REPEATED_QUERY_THRESHOLD = 5
+SQL_INSTRUMENTATION_TOP = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'TechSolutionsApp.sql': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+
+# Perfilado por muestreo (ProfilingMiddleware): fracción de peticiones perfiladas por nombre de URL,
+# '*' para las demás vistas. Vacío lo desactiva. Ejemplo: {'add_sale': 0.05, '*': 0.001}
+# Los perfiles se guardan comprimidos en PROFILING_DIR (se conservan los PROFILING_MAX_FILES más recientes)
+# y se resumen con el comando profile_report. Las vistas asíncronas no se perfilan (cProfile no alcanza
+# el hilo del bucle de eventos)
+
+PROFILING_SAMPLE_RATES = {}
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_FILES = 500
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
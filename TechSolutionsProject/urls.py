@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import path
 from TechSolutionsProject import settings
 from django.conf.urls.static import static
-from TechSolutionsApp.views import customers, categories, products, authentication, sales, employees
+from TechSolutionsApp.views import customers, categories, products, authentication, sales, employees, reports
 
 
 urlpatterns = [
@@ -15,14 +15,21 @@ urlpatterns = [
     # Sales
     path('add_sale/', sales.add_sale, name='add_sale'),
     path('view_sales/', sales.view_sales, name='view_sales'),
+    path('sales/batch/', sales.ingest_sales, name='ingest_sales'),
     path('edit_sale/<int:id>/', sales.edit_sale, name='edit_sale'),
     path('delete_sale/<int:id>/', sales.delete_sale, name='delete_sale'),
+    path('return_sale/<int:id>/', sales.return_sale, name='return_sale'),
+    path('cart/', sales.cart_detail, name='cart_detail'),
+    path('cart/add/', sales.cart_add, name='cart_add'),
+    path('cart/update/', sales.cart_update, name='cart_update'),
+    path('cart/remove/', sales.cart_remove, name='cart_remove'),
     
     # Customers
     path('add_customer/', customers.add_customer, name='add_customer'),
     path('edit_customer/<int:id>/', customers.edit_customer, name='edit_customer'),
     path('delete_customer/<int:id>/', customers.delete_customer, name='delete_customer'),
     path('view_customers/', customers.view_customers, name='view_customers'),
+    path('customers/lookup/', customers.lookup_customer, name='lookup_customer'),
 
     #Employees
     path('employees/', employees.view_employees, name='view_employees'),
@@ -35,13 +42,20 @@ urlpatterns = [
     path('delete_product/<int:id>/', products.delete_product, name='delete_product'),
     path('view_products/', products.view_products, name='view_products'),
     path('add_product/', products.add_product, name='add_product'),
+    path('products/sku/<str:sku>/', products.lookup_sku, name='lookup_sku'),
+    path('import_products/', products.import_products, name='import_products'),
     
     # Categories
     path("add_category/", categories.add_category, name="add_category"),
     path('view_categories/', categories.view_categories, name='view_categories'),
     path('edit_category/<int:id>/', categories.edit_category, name='edit_category'),
 
-    path('delete_category/<int:id>', categories.delete_category, name='delete_category')
+    path('delete_category/<int:id>', categories.delete_category, name='delete_category'),
+
+    # Reports
+    path('reports/sales/', reports.sales_report, name='sales_report'),
+    path('reports/cache/', reports.cache_stats, name='cache_stats'),
+    path('reports/sales/export/', reports.export_sales, name='export_sales'),
 ]
 
 